@@ -1,20 +1,25 @@
 from __future__ import annotations
 
-from environment import AgentManager
+from typing import TYPE_CHECKING
 from abc import ABC, abstractmethod
 
+from relations import Relation, ALL_RELATIONS
+
+if TYPE_CHECKING:
+    from environment import AgentManager
+
 
 class Agent(ABC):
     _manager: AgentManager
     _unique_id: int
     _name: str
-    _registered: list
 
     def __init__(self, manager: AgentManager, unique_id: int, name: str, registered: list = None):
         self._manager = manager
         self._unique_id = unique_id
         self._name = name
-        self._registered = list(registered) if registered else []
+        for related_id in registered or ():
+            self.register(related_id)
 
     @property
     def unique_id(self) -> int:
@@ -26,19 +31,28 @@ class Agent(ABC):
         """Returns the agents key."""
         return self._name
 
-    def register(self, unique_id: int) -> None:
-        if unique_id not in self._registered:
-            self._registered.append(unique_id)
+    @property
+    def registered(self) -> list[int]:
+        """Returns the ids of the agents this agent is related to."""
+        return self._manager.relations.related(self._unique_id)
+
+    def register(self, unique_id: int, relation: Relation = Relation.Generic) -> None:
+        self._manager.relations.register(self._unique_id, unique_id, relation)
 
-    def deregister(self, unique_id: int) -> None:
-        if unique_id in self._registered:
-            self._registered.remove(unique_id)
+    def deregister(self, unique_id: int, relation: Relation = ALL_RELATIONS) -> None:
+        self._manager.relations.deregister(self._unique_id, unique_id, relation)
+
+    def on_create(self) -> None:
+        """Called by the manager once the agent has been built and added to the instance."""
+        pass
 
     def on_kill(self) -> None:
-        for unique_id in self._registered:
-            agent = self._manager.get_agent_by_id(unique_id)
-            if agent:
-                agent.deregister(self.unique_id)
+        """Called by the manager before the agent and its relations are removed."""
+        pass
+
+    def on_relation_killed(self, unique_id: int, relation: Relation) -> None:
+        """Called by the manager when a related agent is destroyed, after the relation has been removed."""
+        pass
 
     @abstractmethod
     def step(self, **kwargs) -> None:
@@ -65,9 +79,13 @@ class AgentFactory:
             raise KeyError(f"Agent type '{name}' already registered")
         self._builders[name] = builder
 
-    def create(self, name: str, **kwargs) -> Agent:
-        """Builds an agent based on the key (if the key exists)."""
+    def builder(self, name: str) -> AgentBuilder:
+        """Returns the builder registered for the key (if the key exists)."""
         builder = self._builders.get(name)
         if not builder:
             raise ValueError(name)
-        return builder(**kwargs)
+        return builder
+
+    def create(self, name: str, **kwargs) -> Agent:
+        """Builds an agent based on the key (if the key exists)."""
+        return self.builder(name)(**kwargs)
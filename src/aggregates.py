@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import numpy as np
+
+from kernels import SPECIALISATIONS, SPECIALISATION_CODES
+from sketches import HistogramSketch
+from skills import Skill, Specialisation
+
+
+SERVICE_KEY = 'aggregates'
+
+
+def _skill_index(skill: Skill | None) -> int:
+    """Index of a skill group, with 0 for workers without a skill level."""
+    return int(skill) if skill is not None else 0
+
+
+class MarketAggregates:
+    """Running market statistics updated by agents in O(1) at each state transition.
+
+    Counts, wage sums and wage sketches are held per ``Skill`` and vacancy counts per ``Specialisation``, so
+    headline statistics can be read at any step without a pass over the population. All sketches share the same
+    bins and can be merged across skill groups or runs.
+    """
+    _workers: np.ndarray
+    _employed: np.ndarray
+    _training: np.ndarray
+    _wage_sum: np.ndarray
+    _wages: dict[Skill, HistogramSketch]
+    _reservation_sum: float
+    _vacancies: np.ndarray
+
+    def __init__(self):
+        size = max(Skill) + 1
+        self._workers = np.zeros(size, dtype=np.int64)
+        self._employed = np.zeros(size, dtype=np.int64)
+        self._training = np.zeros(size, dtype=np.int64)
+        self._wage_sum = np.zeros(size, dtype=np.float64)
+        self._wages = {skill: HistogramSketch() for skill in Skill}
+        self._reservation_sum = 0.0
+        self._vacancies = np.zeros(len(SPECIALISATIONS), dtype=np.int64)
+
+    def clear(self) -> None:
+        self.__init__()
+
+    @property
+    def worker_count(self) -> int:
+        return int(self._workers.sum())
+
+    @property
+    def unemployment_rate(self) -> float:
+        total = self._workers.sum()
+        return float(total - self._employed.sum()) / total if total else 0.0
+
+    @property
+    def training_share(self) -> float:
+        total = self._workers.sum()
+        return float(self._training.sum()) / total if total else 0.0
+
+    @property
+    def mean_reservation_wage(self) -> float:
+        total = self._workers.sum()
+        return self._reservation_sum / total if total else float('nan')
+
+    @property
+    def vacancy_count(self) -> int:
+        return int(self._vacancies.sum())
+
+    @property
+    def wage_sketches(self) -> dict[Skill, HistogramSketch]:
+        return self._wages
+
+    def mean_wage(self, skill: Skill) -> float:
+        employed = self._employed[skill]
+        return float(self._wage_sum[skill] / employed) if employed else float('nan')
+
+    def vacancies(self, specialisation: Specialisation) -> int:
+        return int(self._vacancies[SPECIALISATION_CODES[specialisation]])
+
+    def add_worker(self, skill: Skill | None, employed: bool, wage: float | None, reservation_wage: float,
+                   training: bool, weight: int = 1) -> None:
+        """Add a worker to the statistics, or with a weight of -1 remove them."""
+        index = _skill_index(skill)
+        self._workers[index] += weight
+        self._training[index] += weight * training
+        self._reservation_sum += weight * reservation_wage
+        if employed:
+            self._employ(index, skill, wage, weight)
+
+    def remove_worker(self, skill: Skill | None, employed: bool, wage: float | None, reservation_wage: float,
+                      training: bool) -> None:
+        self.add_worker(skill, employed, wage, reservation_wage, training, weight=-1)
+
+    def employ(self, skill: Skill | None, wage: float) -> None:
+        self._employ(_skill_index(skill), skill, wage, 1)
+
+    def unemploy(self, skill: Skill | None, wage: float) -> None:
+        self._employ(_skill_index(skill), skill, wage, -1)
+
+    def start_training(self, skill: Skill | None) -> None:
+        self._training[_skill_index(skill)] += 1
+
+    def stop_training(self, skill: Skill | None) -> None:
+        self._training[_skill_index(skill)] -= 1
+
+    def reservation_wage_changed(self, old: float, new: float) -> None:
+        self._reservation_sum += new - old
+
+    def reskill(self, old: Skill | None, new: Skill | None, employed: bool, wage: float | None,
+                reservation_wage: float, training: bool) -> None:
+        """Move a worker between skill groups."""
+        if old != new:
+            self.remove_worker(old, employed, wage, reservation_wage, training)
+            self.add_worker(new, employed, wage, reservation_wage, training)
+
+    def post(self, specialisation: Specialisation | None, weight: int = 1) -> None:
+        if specialisation is not None:
+            self._vacancies[SPECIALISATION_CODES[specialisation]] += weight
+
+    def withdraw(self, specialisation: Specialisation | None) -> None:
+        self.post(specialisation, weight=-1)
+
+    def verify(self, workers: list, job_boards: list) -> None:
+        """Cross-check the running statistics against a full recomputation, raising on any mismatch."""
+        expected = MarketAggregates()
+        for worker in workers:
+            expected.add_worker(
+                worker.skill, worker.employed, worker.wage, worker.reservation_wage, worker.is_training
+            )
+        for board in job_boards:
+            for specialisation in board.specialisations():
+                expected.post(specialisation)
+
+        for name in ('_workers', '_employed', '_training', '_vacancies'):
+            if not np.array_equal(getattr(self, name), getattr(expected, name)):
+                raise RuntimeError(f"Market aggregate '{name}' diverged from recomputation")
+        if not np.allclose(self._wage_sum, expected._wage_sum):
+            raise RuntimeError("Market aggregate '_wage_sum' diverged from recomputation")
+        if not np.isclose(self._reservation_sum, expected._reservation_sum):
+            raise RuntimeError("Market aggregate '_reservation_sum' diverged from recomputation")
+        for skill, sketch in self._wages.items():
+            if not np.array_equal(sketch.counts, expected._wages[skill].counts):
+                raise RuntimeError(f"Wage sketch of '{skill.name}' diverged from recomputation")
+
+    def _employ(self, index: int, skill: Skill | None, wage: float, weight: int) -> None:
+        self._employed[index] += weight
+        self._wage_sum[index] += weight * wage
+        if skill is not None:
+            self._wages[skill].add(wage, weight)
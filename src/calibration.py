@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Sequence
+import math
+import multiprocessing as mp
+import pickle
+import random
+
+import numpy as np
+
+from environment import Environment
+
+
+@dataclass(slots=True, frozen=True)
+class TargetMoment:
+    """An observed daily series and the ``MarketData`` series it is compared with.
+
+    The distance over a partial run is the weighted mean squared error between the simulated series and the same
+    prefix of the observed one, so candidates can be compared at any checkpoint.
+    """
+    name: str
+    series: str
+    observed: Sequence[float]
+    weight: float = 1.0
+
+    def distance(self, market_data, steps: int) -> float:
+        simulated = np.asarray(getattr(market_data, self.series))[:steps]
+        observed = np.asarray(self.observed, dtype=np.float64)[:len(simulated)]
+        if not len(observed):
+            return 0.0
+        return self.weight * float(np.mean((simulated[:len(observed)] - observed) ** 2))
+
+
+@dataclass(slots=True)
+class Candidate:
+    """A parameter set under calibration, with its distance at the last checkpoint it reached."""
+    parameters: dict
+    seed: int
+    steps: int = 0
+    distance: float = math.inf
+    distances: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class CalibrationResult:
+    ranking: list[Candidate]
+    steps_run: int
+    steps_full: int
+
+    @property
+    def best(self) -> Candidate:
+        return self.ranking[0]
+
+    @property
+    def saving(self) -> float:
+        """How many times fewer simulated steps were run than running every candidate to completion."""
+        return self.steps_full / self.steps_run if self.steps_run else math.inf
+
+
+def _advance(builder: Callable[[dict, int], Environment], candidate: Candidate, state: bytes | None, steps: int,
+             moments: Sequence[TargetMoment]) -> tuple[Candidate, bytes]:
+    """Worker entry point: build or restore a candidate's run, advance it to a checkpoint and score it."""
+    if state is None:
+        random.seed(candidate.seed)
+        model = builder(candidate.parameters, candidate.seed)
+    else:
+        model, random_state = pickle.loads(state)
+        random.setstate(random_state)
+
+    for _ in range(steps - candidate.steps):
+        model.step()
+
+    market_data = model.collect()
+    candidate.steps = steps
+    candidate.distances = {moment.name: moment.distance(market_data, steps) for moment in moments}
+    candidate.distance = sum(candidate.distances.values())
+    return candidate, pickle.dumps((model, random.getstate()), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+class SuccessiveHalving:
+    """Calibrates model parameters against target moments, stopping poor candidates early.
+
+    Every surviving candidate is run in parallel to the next checkpoint and scored on the partial run; only the
+    best 1/eta go on to the next checkpoint, resuming from their saved state. Most of the budget is therefore
+    spent on the candidates that still look plausible at the longest horizons.
+
+    The builder must be a picklable callable returning a loaded environment for a parameter set and seed.
+    """
+    _builder: Callable[[dict, int], Environment]
+    _moments: list[TargetMoment]
+    _checkpoints: list[int]
+    _eta: int
+    _processes: int | None
+    _context: mp.context.BaseContext
+
+    def __init__(self, builder: Callable[[dict, int], Environment], moments: list[TargetMoment],
+                 checkpoints: list[int], eta: int = 3, processes: int = None, start_method: str = None):
+        if eta < 2:
+            raise ValueError("eta must be at least 2")
+        self._builder = builder
+        self._moments = moments
+        self._checkpoints = sorted(checkpoints)
+        self._eta = eta
+        self._processes = processes
+        self._context = mp.get_context(start_method)
+
+    def run(self, candidates: list[Candidate]) -> CalibrationResult:
+        """Run the calibration and return every candidate ranked by the furthest checkpoint it reached."""
+        states: dict[int, bytes | None] = dict.fromkeys(range(len(candidates)))
+        survivors = list(enumerate(candidates))
+        finished = []
+        steps_run = 0
+
+        with ProcessPoolExecutor(self._processes, mp_context=self._context) as pool:
+            for rung, checkpoint in enumerate(self._checkpoints):
+                futures = [
+                    pool.submit(_advance, self._builder, candidate, states[index], checkpoint, self._moments)
+                    for index, candidate in survivors
+                ]
+                scored = []
+                for (index, original), future in zip(survivors, futures):
+                    candidate, state = future.result()
+                    steps_run += checkpoint - original.steps
+                    states[index] = state
+                    scored.append((index, candidate))
+
+                scored.sort(key=lambda entry: entry[1].distance)
+                if rung < len(self._checkpoints) - 1:
+                    keep = max(1, math.ceil(len(scored) / self._eta))
+                    survivors, stopped = scored[:keep], scored[keep:]
+                    for index, _ in stopped:
+                        del states[index]
+                    finished = [candidate for _, candidate in stopped] + finished
+                else:
+                    survivors = scored
+
+        steps_full = len(candidates) * self._checkpoints[-1]
+        return CalibrationResult([candidate for _, candidate in survivors] + finished, steps_run, steps_full)
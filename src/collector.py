@@ -1,7 +1,10 @@
 from __future__ import annotations
 
-from abc import ABC
+from abc import ABC, abstractmethod
 
 
 class Collector(ABC):
-    pass
+    @abstractmethod
+    def collect(self, *args, **kwargs) -> None:
+        """Record the state of the simulation at the current step."""
+        pass
@@ -0,0 +1,377 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable
+import multiprocessing as mp
+
+from igraph import Graph
+
+from agent import Agent
+from environment import AgentManager, Environment
+from jobs import SERVICE_KEY as VACANCIES, JobBoard
+
+
+@dataclass(slots=True, frozen=True)
+class Application:
+    """A job application addressed to a firm owned by another partition, from a worker owned by ``origin``."""
+    firm_id: int
+    job_id: int
+    worker_id: int
+    origin: int
+
+
+@dataclass(slots=True, frozen=True)
+class Offer:
+    """A job offered by a firm to a worker owned by another partition, which employs the worker if still free."""
+    worker_id: int
+    firm_id: int
+    job_id: int
+    wage: float
+
+
+@dataclass(slots=True, frozen=True)
+class Postings:
+    """Snapshot of the vacancies the firms of partition ``origin`` post on one job board, by board index.
+
+    Vacancies are sent as firm, job id, wage, specialisation and location, as for referrals.
+    """
+    origin: int
+    board: int
+    jobs: tuple
+
+
+@dataclass(slots=True, frozen=True)
+class Referral:
+    """Snapshot of the jobs known to a household's workers, shared with friends in other partitions.
+
+    Vacancy handles are local to a partition, so each job is sent as its firm, job id, wage and specialisation.
+    """
+    household_id: int
+    jobs: tuple
+
+
+@dataclass(slots=True)
+class Partition:
+    """The agents owned by one process and the remote agents it needs to reach, out of ``parts`` partitions."""
+    index: int
+    households: list[int]
+    parts: int = 1
+    remote_firms: dict[int, int] = field(default_factory=dict)
+    remote_households: dict[int, int] = field(default_factory=dict)
+    exports: dict[int, list[int]] = field(default_factory=dict)
+
+
+def partition_households(
+        friends: dict[int, list[int]],
+        parts: int,
+        regions: dict[int, object] = None
+) -> dict[int, int]:
+    """Assign each household to a partition, keeping social-network communities (or regions) together.
+
+    Communities are found with the multilevel modularity method, which keeps most friendship edges inside a
+    community, and are then packed largest first onto the least loaded partition to balance the work.
+    """
+    household_ids = list(friends)
+    if regions is not None:
+        groups = {}
+        for household_id in household_ids:
+            groups.setdefault(regions[household_id], []).append(household_id)
+        communities = list(groups.values())
+    else:
+        index = {household_id: i for i, household_id in enumerate(household_ids)}
+        edges = {
+            (min(index[a], index[b]), max(index[a], index[b]))
+            for a in household_ids for b in friends[a] if b in index and a != b
+        }
+        graph = Graph(n=len(household_ids), edges=list(edges))
+        membership = graph.community_multilevel().membership
+        groups = {}
+        for i, community in enumerate(membership):
+            groups.setdefault(community, []).append(household_ids[i])
+        communities = list(groups.values())
+
+    loads = [0] * parts
+    owner = {}
+    for community in sorted(communities, key=len, reverse=True):
+        target = loads.index(min(loads))
+        loads[target] += len(community)
+        for household_id in community:
+            owner[household_id] = target
+    return owner
+
+
+def build_partitions(
+        friends: dict[int, list[int]],
+        owner: dict[int, int],
+        firm_owner: dict[int, int],
+        parts: int
+) -> list[Partition]:
+    """Build the partition descriptions, including the remote agents each one must proxy."""
+    partitions = [Partition(index, [], parts) for index in range(parts)]
+    for household_id, part in owner.items():
+        partition = partitions[part]
+        partition.households.append(household_id)
+        for friend_id in friends[household_id]:
+            friend_part = owner.get(friend_id, part)
+            if friend_part != part:
+                partition.remote_households[friend_id] = friend_part
+                destinations = partitions[friend_part].exports.setdefault(friend_id, [])
+                if part not in destinations:
+                    destinations.append(part)
+
+    for partition in partitions:
+        partition.remote_firms = {
+            firm_id: part for firm_id, part in firm_owner.items() if part != partition.index
+        }
+    return partitions
+
+
+class Mailbox:
+    """Buffers outgoing messages by destination partition and delivers incoming batches at step boundaries.
+
+    Job boards are replicated: each partition sends the postings of its own firms on every board to the others,
+    which mirror them on their board of the same index, so workers see every posting and apply through the
+    firm's proxy. Offers to workers of other partitions go back to the worker's partition.
+    """
+    _partition: Partition
+    _manager: AgentManager
+    _boards: list[JobBoard]
+    _outbox: dict[int, list]
+    _exported: dict[int, tuple]
+    _replicas: dict[tuple[int, int], set[tuple[int, int]]]
+
+    def __init__(self, partition: Partition, manager: AgentManager, boards: list[JobBoard] = None):
+        self._partition = partition
+        self._manager = manager
+        self._boards = list(boards) if boards else []
+        self._outbox = {}
+        self._exported = {}
+        self._replicas = {}
+
+    @property
+    def partition(self) -> Partition:
+        return self._partition
+
+    def send(self, destination: int, message) -> None:
+        self._outbox.setdefault(destination, []).append(message)
+
+    def export_referrals(self) -> None:
+        """Queue the job memories of boundary households for every partition holding one of their friends."""
+        for household_id, destinations in self._partition.exports.items():
+            household = self._manager.get_agent_by_id(household_id)
+            if household is None:
+                continue
+            vacancies = self._manager.service(VACANCIES)
+            handles = dict.fromkeys(job for worker in household.workers for job in vacancies.live(worker.jobs))
+            referral = Referral(household_id, tuple(vacancies.describe(handles)))
+            for destination in destinations:
+                self.send(destination, referral)
+
+    def export_postings(self) -> None:
+        """Queue the postings of local firms on every board for the other partitions, when they have changed."""
+        vacancies = self._manager.service(VACANCIES)
+        remote_firms = self._partition.remote_firms
+        for index, board in enumerate(self._boards):
+            jobs = tuple(job for job in vacancies.describe(board.handles()) if job[0] not in remote_firms)
+            if self._exported.get(index) == jobs:
+                continue
+            self._exported[index] = jobs
+            postings = Postings(self._partition.index, index, jobs)
+            for destination in range(self._partition.parts):
+                if destination != self._partition.index:
+                    self.send(destination, postings)
+
+    def drain(self) -> dict[int, list]:
+        """Return and clear the outgoing batches."""
+        outbox, self._outbox = self._outbox, {}
+        return outbox
+
+    def deliver(self, messages: list) -> None:
+        """Apply a batch of incoming messages to the local agents and proxies."""
+        for message in messages:
+            if isinstance(message, Application):
+                firm = self._manager.get_agent_by_id(message.firm_id)
+                vacancy = self._manager.service(VACANCIES).handle(message.firm_id, message.job_id)
+                if firm is not None and vacancy is not None:
+                    if self._manager.get_agent_by_id(message.worker_id) is None:
+                        self._manager.add(RemoteWorker(self._manager, message.worker_id, self, message.origin))
+                    firm.apply(vacancy, message.worker_id)
+            elif isinstance(message, Offer):
+                worker = self._manager.get_agent_by_id(message.worker_id)
+                if worker is not None and not isinstance(worker, RemoteWorker):
+                    worker.employ(message.firm_id, message.job_id, message.wage)
+            elif isinstance(message, Postings):
+                self._mirror(message)
+            elif isinstance(message, Referral):
+                proxy = self._manager.get_agent_by_id(message.household_id)
+                if isinstance(proxy, RemoteHousehold):
+                    proxy.update(message.jobs)
+
+    def _mirror(self, postings: Postings) -> None:
+        """Replace the postings mirrored from a partition on a board with its latest snapshot."""
+        if postings.board >= len(self._boards):
+            return
+        board = self._boards[postings.board]
+        key = (postings.origin, postings.board)
+        current = {(job[0], job[1]) for job in postings.jobs}
+        for firm_id, job_id in self._replicas.get(key, set()) - current:
+            board.deregister(firm_id, job_id)
+        for job in postings.jobs:
+            board.register(*job)
+        self._replicas[key] = current
+
+
+class RemoteFirm(Agent):
+    """Local stand-in for a firm in another partition, forwarding applications as messages."""
+    _mailbox: Mailbox
+    _owner: int
+
+    def __init__(self, manager: AgentManager, unique_id: int, mailbox: Mailbox, owner: int):
+        super().__init__(manager, unique_id, 'RemoteFirm')
+        self._mailbox = mailbox
+        self._owner = owner
+
+    def step(self) -> None:
+        pass
+
+    def apply(self, vacancy: int, worker_id: int, cv=None):
+        job_id = self._manager.service(VACANCIES).job(vacancy)
+        self._mailbox.send(self._owner, Application(self.unique_id, job_id, worker_id, self._mailbox.partition.index))
+
+
+class RemoteWorker(Agent):
+    """Local stand-in for a worker in another partition that applied to a local firm, forwarding job offers."""
+    _mailbox: Mailbox
+    _owner: int
+
+    def __init__(self, manager: AgentManager, unique_id: int, mailbox: Mailbox, owner: int):
+        super().__init__(manager, unique_id, 'RemoteWorker')
+        self._mailbox = mailbox
+        self._owner = owner
+
+    @property
+    def employed(self) -> bool:
+        """Unknown locally; the worker's own partition ignores offers once the worker is employed."""
+        return False
+
+    def step(self) -> None:
+        pass
+
+    def employ(self, firm_id: int, job_id: int, wage: float) -> None:
+        self._mailbox.send(self._owner, Offer(self.unique_id, firm_id, job_id, wage))
+
+
+class _ReferredJobs:
+    """Exposes referred jobs through the same ``jobs`` mapping a worker offers to its network."""
+    __slots__ = ('jobs',)
+
+    def __init__(self, jobs: dict):
+        self.jobs = jobs
+
+
+class RemoteHousehold(Agent):
+    """Local stand-in for a household in another partition, holding the last referral received from it.
+
+    Referred jobs are interned in the local vacancy table and held until the next referral replaces them.
+    """
+    _workers: list[_ReferredJobs]
+
+    def __init__(self, manager: AgentManager, unique_id: int):
+        super().__init__(manager, unique_id, 'RemoteHousehold')
+        self._workers = [_ReferredJobs({})]
+
+    @property
+    def friends(self):
+        return []
+
+    @property
+    def workers(self):
+        return self._workers
+
+    def step(self) -> None:
+        pass
+
+    def update(self, jobs: tuple) -> None:
+        vacancies = self._manager.service(VACANCIES)
+        referred = self._workers[0]
+        held = referred.jobs
+        referred.jobs = {vacancies.acquire(*job): None for job in jobs}
+        for job in held:
+            vacancies.release(job)
+
+
+def install_proxies(manager: AgentManager, partition: Partition, mailbox: Mailbox) -> None:
+    """Add proxies for every remote firm and friend household to a partition's manager."""
+    for firm_id, owner in partition.remote_firms.items():
+        manager.add(RemoteFirm(manager, firm_id, mailbox, owner))
+    for household_id in partition.remote_households:
+        manager.add(RemoteHousehold(manager, household_id))
+
+
+def _run_partition(builder: Callable[[Partition], Environment], partition: Partition, steps: int, conn) -> None:
+    """Process entry point: exchange the initial postings, then step the local environment and exchange message
+    batches at every step boundary."""
+    environment = builder(partition)
+    mailbox = Mailbox(partition, environment.manager, getattr(environment, 'job_boards', None))
+    install_proxies(environment.manager, partition, mailbox)
+
+    mailbox.export_postings()
+    conn.send(mailbox.drain())
+    mailbox.deliver(conn.recv())
+    for _ in range(steps):
+        environment.step()
+        mailbox.export_referrals()
+        mailbox.export_postings()
+        conn.send(mailbox.drain())
+        mailbox.deliver(conn.recv())
+
+    conn.send(environment.collect())
+    conn.close()
+
+
+class PartitionRuntime:
+    """Runs each partition in its own process, routing batched messages between them before the first step and
+    once per step.
+
+    The builder must be a picklable callable that constructs the local environment for a partition, creating
+    its agents under their global unique ids with ``AgentManager.create(name, unique_id=...)``. Job boards of an
+    environment with ``job_boards`` are replicated, and must be created in the same order in every partition.
+    """
+    _builder: Callable[[Partition], Environment]
+    _partitions: list[Partition]
+    _context: mp.context.BaseContext
+
+    def __init__(self, builder: Callable[[Partition], Environment], partitions: list[Partition], start_method: str = None):
+        self._builder = builder
+        self._partitions = partitions
+        self._context = mp.get_context(start_method)
+
+    def run(self, steps: int) -> list:
+        """Run all partitions for a number of steps and return the collected output of each."""
+        connections = []
+        processes = []
+        for partition in self._partitions:
+            parent, child = self._context.Pipe()
+            process = self._context.Process(target=_run_partition, args=(self._builder, partition, steps, child))
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+
+        try:
+            for _ in range(steps + 1):
+                inboxes = [[] for _ in connections]
+                for connection in connections:
+                    for destination, messages in connection.recv().items():
+                        inboxes[destination].extend(messages)
+                for connection, inbox in zip(connections, inboxes):
+                    connection.send(inbox)
+            results = [connection.recv() for connection in connections]
+        except BaseException:
+            for process in processes:
+                process.terminate()
+            raise
+        finally:
+            for process in processes:
+                process.join()
+        return results
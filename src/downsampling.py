@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets downsampling, returning the indices of the points to keep.
+
+    The first and last points are always kept, and from every bucket in between the point forming the largest
+    triangle with the previously kept point and the mean of the next bucket is chosen, which preserves the
+    visual shape of the series.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        following_x = x[stop:following_stop].mean()
+        following_y = y[stop:following_stop].mean()
+
+        areas = np.abs(
+            (x[previous] - following_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (following_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def minmax(y: np.ndarray, threshold: int) -> np.ndarray:
+    """Min/max bucket downsampling, returning the sorted indices of the extremes of every bucket."""
+    n = len(y)
+    buckets = threshold // 2
+    if buckets < 1 or threshold >= n:
+        return np.arange(n)
+
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    lows = np.minimum.reduceat(y, starts)
+    highs = np.maximum.reduceat(y, starts)
+    selected = []
+    for bucket, (start, stop) in enumerate(zip(starts, edges[1:])):
+        segment = y[start:stop]
+        selected.append(start + int(np.argmax(segment == lows[bucket])))
+        selected.append(start + int(np.argmax(segment == highs[bucket])))
+    return np.unique(selected)
+
+
+def envelope(lower: np.ndarray, upper: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Downsample a band to bucket-wise minimum of the lower and maximum of the upper bound.
+
+    Returns the first index of every bucket with the lower and upper envelope of the band over that bucket.
+    """
+    n = len(lower)
+    if threshold >= n:
+        return np.arange(n), lower, upper
+    starts = np.linspace(0, n, threshold + 1).astype(np.int64)[:-1]
+    starts = np.unique(starts)
+    return starts, np.minimum.reduceat(lower, starts), np.maximum.reduceat(upper, starts)
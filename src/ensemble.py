@@ -0,0 +1,807 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+
+from kernels import SPECIALISATIONS, SPECIALISATION_CODES, SKILL_BY_CODE
+from skills import YEARS_TO_SPECIALISE
+from sketches import Series
+from workers import AccessMethod
+
+
+# Columns of the uniform draws each worker receives every day.
+SEARCH, CHANNEL, BOARD, APPLY, TRAIN, TRAINING_CHOICE = range(6)
+DRAWS = 6
+
+# Marks an unused saved job slot.
+EMPTY = -1
+
+# Blocks of workers, in id order, each day is swept in by default.
+DEFAULT_BLOCKS = 32
+
+
+@dataclass(slots=True)
+class WorkerParameters:
+    """Per-worker hyperparameters, one entry per worker and shared by every replicate.
+
+    ``job_boards`` is a (worker, board) mask of the boards each worker searches.
+    """
+    alpha: np.ndarray
+    search_rate: np.ndarray
+    pi: np.ndarray
+    search_max: np.ndarray
+    application_rate: np.ndarray
+    application_max: np.ndarray
+    training_rate: np.ndarray
+    max_general_skill: np.ndarray
+    unemployment_limit: np.ndarray
+    ordered: np.ndarray
+    job_boards: np.ndarray
+
+
+@dataclass(slots=True)
+class Market:
+    """Market data shared by every replicate: the vacancies posted, their boards and the social network.
+
+    ``rank`` orders all vacancies from highest to lowest wage and ``board_members`` lists, in CSR form, the
+    vacancies of each board in that order. ``befriended`` marks the households with friends and ``contacts``
+    lists, in CSR form, the workers of each household's friends, whose saved jobs are the household's network.
+    """
+    wages: np.ndarray
+    codes: np.ndarray
+    boards: np.ndarray
+    popularity: np.ndarray
+    rank: np.ndarray
+    board_members: np.ndarray
+    board_indptr: np.ndarray
+    household: np.ndarray
+    befriended: np.ndarray
+    contacts: np.ndarray
+    contact_indptr: np.ndarray
+    days_to_specialise: np.ndarray
+
+    @property
+    def vacancy_count(self) -> int:
+        return len(self.wages)
+
+    @property
+    def board_count(self) -> int:
+        return len(self.popularity)
+
+
+@dataclass(slots=True)
+class WorkerState:
+    """Mutable worker state as columns with a leading row axis.
+
+    Rows are (replicate, worker) pairs in replicate-major order, so row ``i`` holds worker ``i % N``. Saved jobs
+    are a table of slots per row holding vacancy columns in the order they were saved, EMPTY when unused; the
+    table widens when a row saves more jobs than it has slots. Search histories are counts per specialisation
+    code.
+    """
+    employed: np.ndarray
+    wage: np.ndarray
+    reservation_wage: np.ndarray
+    skill: np.ndarray
+    training: np.ndarray
+    time_training: np.ndarray
+    time_unemployed: np.ndarray
+    training_code: np.ndarray
+    specialisations: np.ndarray
+    search_history: np.ndarray
+    saved: np.ndarray
+
+    def __len__(self):
+        return len(self.employed)
+
+    @property
+    def capacity(self) -> int:
+        """Saved job slots per row."""
+        return self.saved.shape[1]
+
+    def tile(self, replicates: int) -> WorkerState:
+        """Copies of this state for each replicate, stacked along the row axis."""
+        return WorkerState(*(
+            np.tile(column, (replicates,) + (1,) * (column.ndim - 1)) for column in
+            (getattr(self, name) for name in self.__slots__)
+        ))
+
+
+class Openings:
+    """Which vacancies of the market are still open in each replicate, once some have been withdrawn.
+
+    Open vacancies are counted cumulatively along ``board_members`` for every replicate, so the number of open
+    vacancies on a board, and the k-th of them in wage order, are found without a pass over the board.
+    """
+    _open: np.ndarray
+    _cumulative: np.ndarray | None
+
+    def __init__(self, replicates: int, vacancies: int):
+        self._open = np.ones((replicates, vacancies), dtype=np.bool_)
+        self._cumulative = None
+
+    def withdraw(self, replicates: np.ndarray, vacancies: np.ndarray) -> None:
+        self._open[replicates, vacancies] = False
+        self._cumulative = None
+
+    def is_open(self, replicates: np.ndarray, vacancies: np.ndarray) -> np.ndarray:
+        """Whether vacancies are open in the given replicates, broadcasting the two."""
+        return self._open[replicates, vacancies]
+
+    def sizes(self, market: Market, replicates: np.ndarray, boards: np.ndarray) -> np.ndarray:
+        """Open vacancies on a board in a replicate, for each pair."""
+        cumulative = self._counts(market)
+        starts, stops = market.board_indptr[boards], market.board_indptr[boards + 1]
+        return cumulative[replicates, stops] - cumulative[replicates, starts]
+
+    def members(self, market: Market, replicates: np.ndarray, boards: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """The open vacancy at each position, counted in wage order among the open vacancies of the row's board
+        in the row's replicate. ``positions`` has a row per (replicate, board) pair; positions beyond a board's
+        size give an arbitrary vacancy."""
+        cumulative = self._counts(market)
+        stride = cumulative.shape[1]
+        offsets = (replicates * stride)[:, None]
+        targets = cumulative[replicates, market.board_indptr[boards]][:, None] + positions + 1
+        found = np.searchsorted(cumulative.ravel(), offsets + targets, side='left') - offsets - 1
+        return market.board_members[np.clip(found, 0, max(market.vacancy_count - 1, 0))]
+
+    def _counts(self, market: Market) -> np.ndarray:
+        if self._cumulative is None:
+            counts = np.cumsum(self._open[:, market.board_members], axis=1)
+            self._cumulative = np.hstack((np.zeros((len(self._open), 1), dtype=counts.dtype), counts))
+        return self._cumulative
+
+
+def saved_capacity(search_max: np.ndarray) -> int:
+    """Initial number of saved job slots per row: the jobs found by two searches."""
+    return max(2 * int(search_max.max(initial=0)), 1)
+
+
+def block_bounds(rows: int, blocks: int) -> list[tuple[int, int]]:
+    """Contiguous, near-equal ranges splitting a number of rows into at most a number of blocks."""
+    bounds = np.linspace(0, rows, min(max(blocks, 1), max(rows, 1)) + 1).astype(np.int64).tolist()
+    return [(start, stop) for start, stop in zip(bounds, bounds[1:]) if stop > start]
+
+
+def _smallest(priority: np.ndarray, count: int) -> np.ndarray:
+    """Column indices of the count smallest priorities of each row, in increasing order."""
+    if count < priority.shape[1]:
+        columns = np.argpartition(priority, count, axis=1)[:, :count]
+        order = np.argsort(np.take_along_axis(priority, columns, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(columns, order, axis=1)
+    return np.argsort(priority, axis=1, kind='stable')
+
+
+def decay_reservation_wages(state: WorkerState, rows: np.ndarray, alpha: np.ndarray) -> None:
+    """Lower the reservation wages of unemployed workers by their weekly decay, stopping at zero."""
+    state.reservation_wage[rows] = np.maximum(state.reservation_wage[rows] - alpha, 0.0)
+
+
+def advance_training(state: WorkerState, rows: np.ndarray, days_to_specialise: np.ndarray) -> np.ndarray:
+    """Count a day of training, completing the training of workers that have trained long enough.
+
+    Returns the rows that completed their training.
+    """
+    codes = state.training_code[rows]
+    continuing = state.time_training[rows] < days_to_specialise[codes]
+    state.time_training[rows[continuing]] += 1
+
+    completed, codes = rows[~continuing], codes[~continuing]
+    state.specialisations[completed, codes] = True
+    state.skill[completed] = np.maximum(state.skill[completed], SKILL_BY_CODE[codes])
+    state.training[completed] = False
+    return completed
+
+
+def start_training(state: WorkerState, rows: np.ndarray, training_rate: np.ndarray, draw: np.ndarray,
+                   choice: np.ndarray) -> np.ndarray:
+    """Start training long-term unemployed workers with a search history, choosing the specialisation in
+    proportion to how often it was seen. Returns the rows that started training."""
+    history = state.search_history[rows]
+    totals = history.sum(axis=1)
+    starting = (totals > 0) & (draw < training_rate)
+    rows, history, totals, choice = rows[starting], history[starting], totals[starting], choice[starting]
+
+    cumulative = np.cumsum(history, axis=1)
+    state.training_code[rows] = (cumulative <= (choice * totals)[:, None]).sum(axis=1)
+    state.search_history[rows] = 0
+    state.training[rows] = True
+    state.time_training[rows] = 0
+    state.time_unemployed[rows] = 0
+    return rows
+
+
+def save(state: WorkerState, rows: np.ndarray, owner: np.ndarray, vacancies: np.ndarray) -> None:
+    """Add vacancies to the saved jobs of rows, ``owner`` giving the row of each by its index in ``rows``.
+
+    Jobs already saved are skipped and the others appended in the order given, widening the table of saved job
+    slots if a row needs more.
+    """
+    if not len(owner):
+        return
+    counts = np.bincount(owner, minlength=len(rows))
+    order = np.argsort(owner, kind='stable')
+    owner, vacancies = owner[order], vacancies[order]
+    found = np.full((len(rows), int(counts.max())), EMPTY, dtype=np.int64)
+    found[owner, np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)] = vacancies
+
+    table = _distinct(np.hstack((state.saved[rows], found)))
+    if table.shape[1] > state.capacity:
+        state.saved = np.hstack((
+            state.saved, np.full((len(state), table.shape[1] - state.capacity), EMPTY, dtype=np.int64)
+        ))
+    state.saved[rows] = np.hstack((
+        table, np.full((len(rows), state.capacity - table.shape[1]), EMPTY, dtype=np.int64)
+    ))
+
+
+def _distinct(table: np.ndarray) -> np.ndarray:
+    """The first occurrence of each vacancy in every row of a table, packed to the left and cut to the longest
+    row."""
+    order = np.argsort(table, axis=1, kind='stable')
+    ordered = np.take_along_axis(table, order, axis=1)
+    first = ordered != EMPTY
+    first[:, 1:] &= ordered[:, 1:] != ordered[:, :-1]
+    kept = np.empty_like(first)
+    np.put_along_axis(kept, order, first, axis=1)
+
+    width = int(kept.sum(axis=1).max(initial=0))
+    packed = np.argsort(np.where(kept, np.arange(table.shape[1]), table.shape[1]), axis=1, kind='stable')[:, :width]
+    return np.where(np.take_along_axis(kept, packed, axis=1), np.take_along_axis(table, packed, axis=1), EMPTY)
+
+
+def _choose(priority: np.ndarray, limits: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Up to the limit of entries with the smallest finite priorities in each row, as (row, column) indices."""
+    chosen = _smallest(priority, int(limits.max(initial=0)))
+    within = np.arange(chosen.shape[1]) < limits[:, None]
+    within &= np.isfinite(np.take_along_axis(priority, chosen, axis=1))
+    selected = np.nonzero(within)
+    return selected[0], chosen[selected]
+
+
+def screen(state: WorkerState, rows: np.ndarray, owner: np.ndarray, vacancies: np.ndarray, wages: np.ndarray) -> None:
+    """Save the vacancies considered by rows, as (index in rows, vacancy) pairs in the order considered, that pay
+    at least the reservation wage."""
+    paying = wages[vacancies] >= state.reservation_wage[rows[owner]]
+    save(state, rows, owner[paying], vacancies[paying])
+
+
+def sample_positions(sizes: np.ndarray, counts: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+    """Distinct uniform positions below each row's size, as many as its count, EMPTY padded.
+
+    Floyd's algorithm draws the sample from one uniform per position, so its cost is independent of the size.
+    """
+    sample = np.full(uniforms.shape, EMPTY, dtype=np.int64)
+    for step in range(int(counts.max(initial=0))):
+        limit = sizes - counts + step
+        draw = np.minimum((uniforms[:, step] * (limit + 1)).astype(np.int64), limit)
+        drawn = (sample[:, :step] == draw[:, None]).any(axis=1)
+        sample[:, step] = np.where(step < counts, np.where(drawn, limit, draw), EMPTY)
+    return sample
+
+
+def board_candidates(market: Market, boards: np.ndarray, search_max: np.ndarray, ordered: np.ndarray,
+                     uniforms: np.ndarray, openings: Openings = None, replicates: np.ndarray = None) -> np.ndarray:
+    """The vacancies each row considers on its board, EMPTY padded: the search_max best paid for ordered
+    search and a uniform sample of search_max otherwise. ``uniforms`` holds a draw per position for each
+    row searching in random order. With ``openings``, only the vacancies open in each row's replicate are
+    searched."""
+    starts = market.board_indptr[boards]
+    if openings is None:
+        sizes = market.board_indptr[boards + 1] - starts
+    else:
+        sizes = openings.sizes(market, replicates, boards)
+    counts = np.minimum(search_max, sizes)
+    width = int(counts.max(initial=0))
+    positions = np.broadcast_to(np.arange(width), (len(boards), width))
+    if (~ordered).any():
+        positions = positions.copy()
+        positions[~ordered] = sample_positions(sizes[~ordered], counts[~ordered], uniforms[:, :width])
+    within = positions != EMPTY
+    within &= np.arange(positions.shape[1]) < counts[:, None]
+    positions = np.where(within, positions, 0)
+    if openings is None:
+        members = market.board_members[starts[:, None] + positions]
+    else:
+        members = openings.members(market, replicates, boards, positions)
+    return np.where(within, members, EMPTY)
+
+
+def walk_referrals(owner: np.ndarray, group: np.ndarray, priority: np.ndarray, search_max: np.ndarray) -> np.ndarray:
+    """Indices of the referrals each row considers, in the order considered.
+
+    Referrals are the saved jobs of a row's contacts, one entry per (contact, job): ``owner`` gives the row of
+    each and ``group`` numbers its contact, both non-decreasing. As in the model, a row walks its contacts in
+    turn, each contact's jobs in priority order, until it has considered its search_max jobs, counting jobs it
+    has seen before.
+    """
+    order = np.lexsort((priority, group))
+    counts = np.bincount(owner, minlength=len(search_max))
+    positions = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[positions < search_max[owner[order]]]
+
+
+def applicable(state: WorkerState, rows: np.ndarray, max_general_skill: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Whether each row can apply to jobs of the given codes, one row of codes per row: one of its
+    specialisations or within its general skill."""
+    own = np.take_along_axis(state.specialisations[rows], codes, axis=1)
+    return own | (SKILL_BY_CODE[codes] <= max_general_skill[:, None])
+
+
+def apply_to_jobs(state: WorkerState, rows: np.ndarray, mask: np.ndarray, priority: np.ndarray,
+                  application_max: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Apply to up to application_max saved, applicable jobs per row in priority order and forget them.
+
+    ``mask`` and ``priority`` have an entry per saved job slot. Returns the applying rows and the vacancies
+    applied to.
+    """
+    if not len(rows):
+        return rows, rows
+    saved = state.saved[rows]
+    owner, slot = _choose(np.where(mask & (saved != EMPTY), priority, np.inf), application_max)
+    applicants, vacancies = rows[owner], saved[owner, slot]
+    state.saved[applicants, slot] = EMPTY
+    return applicants, vacancies
+
+
+def record_training_opportunities(state: WorkerState, rows: np.ndarray, mask: np.ndarray, codes: np.ndarray) -> None:
+    """Count saved jobs outside a row's skills, given a mask and the codes of its saved job slots, in its
+    search history and forget them."""
+    saved = state.saved[rows]
+    row, slot = np.nonzero((saved != EMPTY) & ~mask)
+    specialisations = len(SPECIALISATIONS)
+    counts = np.bincount(row * specialisations + codes[row, slot], minlength=len(rows) * specialisations)
+    state.search_history[rows] += counts.reshape(len(rows), specialisations)
+    saved[row, slot] = EMPTY
+    state.saved[rows] = saved
+
+
+def choose_boards(market: Market, job_boards: np.ndarray, draw: np.ndarray) -> np.ndarray:
+    """The board each row searches among its own, given as a (row, board) mask, chosen in proportion to board
+    popularity, or uniformly if none of its boards is popular."""
+    weights = np.where(job_boards, market.popularity, 0.0)
+    weights = np.where((weights.sum(axis=1) > 0)[:, None], weights, job_boards)
+    cumulative = np.cumsum(weights, axis=1)
+    return (cumulative <= (draw * cumulative[:, -1])[:, None]).sum(axis=1)
+
+
+def contacts_of(market: Market, households: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """The workers of each household's friends, concatenated, and how many belong to each household."""
+    counts = np.diff(market.contact_indptr)[households]
+    ends = np.cumsum(counts)
+    if not len(ends):
+        return np.zeros(0, dtype=np.int64), counts
+    positions = np.arange(ends[-1]) - np.repeat(ends - counts - market.contact_indptr[households], counts)
+    return market.contacts[positions], counts
+
+
+def worker_day(state: WorkerState, parameters: WorkerParameters, worker: np.ndarray, household: np.ndarray,
+               market: Market, draws: np.ndarray, week: bool, uniforms: Callable[[np.ndarray], np.ndarray],
+               referred: Callable[[np.ndarray], tuple[np.ndarray, np.ndarray, np.ndarray]], rows: np.ndarray = None,
+               openings: Openings = None, replicate: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    """Run one day of the worker rules over some rows of a state, by default all of them.
+
+    ``worker`` maps each row to its entry in the parameters, ``household`` to its household and ``replicate``,
+    needed with ``openings``, to its replicate. ``uniforms`` returns a uniform draw for each entry of a sorted
+    array of rows, used by rows that search in random order, and ``referred`` the saved jobs of the contacts of
+    rows searching their network, as (index in rows, contact number, vacancy) arrays in contact order. Returns
+    the applying rows and the vacancies applied to.
+    """
+    rows = np.arange(len(state)) if rows is None else rows
+    unemployed = rows[~state.employed[rows]]
+    if week:
+        decay_reservation_wages(state, unemployed, parameters.alpha[worker[unemployed]])
+
+    training = state.training[unemployed]
+    advance_training(state, unemployed[training], market.days_to_specialise)
+
+    idle = unemployed[~training]
+    limited = state.time_unemployed[idle] >= parameters.unemployment_limit[worker[idle]]
+    starting = idle[limited]
+    start_training(
+        state, starting, parameters.training_rate[worker[starting]],
+        draws[starting, TRAIN], draws[starting, TRAINING_CHOICE]
+    )
+
+    active = idle[~limited]
+    _search(state, parameters, worker, household, market, active, draws, uniforms, referred, openings, replicate)
+    applicants, vacancies = _apply(state, parameters, worker, market, active, draws, uniforms, openings, replicate)
+    state.time_unemployed[active] += 1
+    return applicants, vacancies
+
+
+def _priority(parameters: WorkerParameters, worker: np.ndarray, market: Market, rows: np.ndarray,
+              columns: np.ndarray, uniforms: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    """Order in which rows consider a table of vacancies: by wage for ordered search, random otherwise.
+    EMPTY entries come last."""
+    priority = market.rank[np.where(columns == EMPTY, 0, columns)].astype(np.float64)
+    shuffled = ~parameters.ordered[worker[rows]]
+    if shuffled.any():
+        width = columns.shape[1]
+        priority[shuffled] = uniforms(np.repeat(rows[shuffled], width)).reshape(-1, width)
+    priority[columns == EMPTY] = np.inf
+    return priority
+
+
+def _search(state: WorkerState, parameters: WorkerParameters, worker: np.ndarray, household: np.ndarray,
+            market: Market, rows: np.ndarray, draws: np.ndarray, uniforms: Callable[[np.ndarray], np.ndarray],
+            referred: Callable[[np.ndarray], tuple[np.ndarray, np.ndarray, np.ndarray]], openings: Openings | None,
+            replicate: np.ndarray | None) -> None:
+    """Search the network, then the boards. Network search goes first so that the contacts a row shares a call
+    with are seen as they started the day."""
+    job_boards = parameters.job_boards[worker[rows]]
+    has_boards = job_boards.any(axis=1)
+    has_friends = market.befriended[household[rows]]
+    searching = (has_boards | has_friends) & (draws[rows, SEARCH] < parameters.search_rate[worker[rows]])
+    rows, job_boards, has_boards, has_friends = (
+        rows[searching], job_boards[searching], has_boards[searching], has_friends[searching]
+    )
+    on_board = has_boards & (~has_friends | (draws[rows, CHANNEL] < parameters.pi[worker[rows]]))
+
+    network_rows = rows[~on_board]
+    if len(network_rows):
+        owner, group, vacancies = referred(network_rows)
+        ordered = parameters.ordered[worker[network_rows]][owner]
+        priority = market.rank[vacancies].astype(np.float64)
+        priority[~ordered] = uniforms(network_rows[owner[~ordered]])
+        considered = walk_referrals(owner, group, priority, parameters.search_max[worker[network_rows]])
+        screen(state, network_rows, owner[considered], vacancies[considered], market.wages)
+
+    board_rows = rows[on_board]
+    if len(board_rows):
+        search_max, ordered = parameters.search_max[worker[board_rows]], parameters.ordered[worker[board_rows]]
+        shuffled = board_rows[~ordered]
+        width = int(search_max.max(initial=0))
+        candidates = board_candidates(
+            market, choose_boards(market, job_boards[on_board], draws[board_rows, BOARD]), search_max, ordered,
+            uniforms(np.repeat(shuffled, width)).reshape(-1, width), openings,
+            replicate[board_rows] if replicate is not None else None
+        )
+        owner, slot = np.nonzero(candidates != EMPTY)
+        screen(state, board_rows, owner, candidates[owner, slot], market.wages)
+
+
+def _apply(state: WorkerState, parameters: WorkerParameters, worker: np.ndarray, market: Market, rows: np.ndarray,
+           draws: np.ndarray, uniforms: Callable[[np.ndarray], np.ndarray], openings: Openings | None,
+           replicate: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+    saved = state.saved[rows]
+    held = saved != EMPTY
+    if openings is not None:
+        closed = held & ~openings.is_open(replicate[rows][:, None], np.where(held, saved, 0))
+        if closed.any():
+            saved[closed] = EMPTY
+            state.saved[rows] = saved
+            held &= ~closed
+    with_jobs = rows[held.any(axis=1)]
+    saved = state.saved[with_jobs]
+    codes = market.codes[np.where(saved == EMPTY, 0, saved)]
+    mask = applicable(state, with_jobs, parameters.max_general_skill[worker[with_jobs]], codes)
+
+    applying = draws[with_jobs, APPLY] < parameters.application_rate[worker[with_jobs]]
+    applicants, vacancies = apply_to_jobs(
+        state, with_jobs[applying], mask[applying],
+        _priority(parameters, worker, market, with_jobs[applying], saved[applying], uniforms),
+        parameters.application_max[worker[with_jobs[applying]]]
+    )
+    record_training_opportunities(state, with_jobs, mask, codes)
+    return applicants, vacancies
+
+
+def hire(state: WorkerState, market: Market, applicants: np.ndarray, vacancies: np.ndarray, accepted: np.ndarray,
+         replicates: np.ndarray = None) -> tuple[np.ndarray, np.ndarray]:
+    """Employ each row at the wage of the first of its applications accepted, returning the rows hired and
+    their vacancies.
+
+    Given the replicate of each application, every vacancy is filled at most once per replicate, by the first
+    application accepted for it.
+    """
+    applicants, vacancies = applicants[accepted], vacancies[accepted]
+    if replicates is not None:
+        _, first = np.unique(replicates[accepted] * market.vacancy_count + vacancies, return_index=True)
+        first.sort()
+        applicants, vacancies = applicants[first], vacancies[first]
+    applicants, first = np.unique(applicants, return_index=True)
+    state.employed[applicants] = True
+    state.wage[applicants] = market.wages[vacancies[first]]
+    return applicants, vacancies[first]
+
+
+class EnsembleData:
+    """Per-step market statistics of every replicate, as (step, replicate) arrays."""
+    NAMES = ('unemployment_rate', 'training_share', 'reservation_wage', 'applications')
+
+    _series: dict[str, Series]
+
+    def __init__(self, replicates: int):
+        self._series = {name: Series(width=replicates) for name in self.NAMES}
+
+    def __len__(self):
+        return len(self._series['unemployment_rate'])
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._series[name].values
+
+    def record(self, **statistics: np.ndarray) -> None:
+        for name, values in statistics.items():
+            self._series[name].append(values)
+
+    def bands(self, name: str, quantiles=(0.1, 0.5, 0.9)) -> np.ndarray:
+        """Quantiles across replicates of a statistic at each step, as a (quantile, step) array."""
+        return np.quantile(self[name], quantiles, axis=1)
+
+
+class Ensemble:
+    """Runs replicates of one labour market configuration in lock step, with a leading replicate axis.
+
+    Every worker state column holds all replicates, and each day's reservation wage decay, training, search and
+    application run as whole-array kernels over every replicate at once. The vacancies, network and worker
+    parameters are held once and shared. Each replicate draws its randomness from its own stream, spawned from a
+    single seed, so replicates are independent and the ensemble is reproducible.
+
+    The ensemble follows the model's daily worker rules, reproducing them statistically rather than draw for draw.
+    Workers search only their own boards, walk their friends' saved jobs one friend's worker at a time with a
+    shared budget, and keep every job they save. The model steps workers in id order, so a worker sees the saved
+    jobs of friends stepped before it as they ended the day; the ensemble sweeps each day in ``blocks`` of
+    workers in id order, and friends in the same block are seen as they started it.
+
+    Applications are resolved after each block by the hiring rule, which receives the applying rows, the
+    vacancies and a uniform draw per application and returns which applications are accepted. With ``fill``,
+    each vacancy is filled by the first accepted application and withdrawn in its replicate, as when firms close
+    a posting on hiring; vacancies can also be withdrawn directly. Without a hiring rule applications are only
+    counted, as firms do not hire yet. Vacancies posted after the ensemble is built are not seen.
+    """
+    _replicates: int
+    _parameters: WorkerParameters
+    _market: Market
+    _state: WorkerState
+    _generators: list[np.random.Generator]
+    _hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] | None
+    _fill: bool
+    _blocks: list[tuple[int, int]]
+    _openings: Openings | None
+    _withdrawn: bool
+    _day: int
+    _data: EnsembleData
+
+    def __init__(self, parameters: WorkerParameters, market: Market, state: WorkerState, replicates: int,
+                 seed: int = None, hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] = None,
+                 fill: bool = False, blocks: int = DEFAULT_BLOCKS):
+        if replicates < 1:
+            raise ValueError("An ensemble needs at least one replicate")
+        self._replicates = replicates
+        self._parameters = parameters
+        self._market = market
+        self._state = state.tile(replicates)
+        self._generators = [np.random.default_rng(stream) for stream in np.random.SeedSequence(seed).spawn(replicates)]
+        self._hiring = hiring
+        self._fill = fill
+        self._blocks = block_bounds(len(state), blocks)
+        self._openings = None
+        self._withdrawn = False
+        self._day = 0
+        self._data = EnsembleData(replicates)
+
+    @classmethod
+    def from_model(cls, model, replicates: int, seed: int = None,
+                   hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] = None,
+                   capacity: int = None, **kwargs) -> Ensemble:
+        """Build an ensemble from the workers, households and job boards of a loaded ``LabourABM``."""
+        parameters, market, state = extract(model, capacity)
+        return cls(parameters, market, state, replicates, seed, hiring, **kwargs)
+
+    @property
+    def replicates(self) -> int:
+        return self._replicates
+
+    @property
+    def workers(self) -> int:
+        return len(self._state) // self._replicates
+
+    @property
+    def day(self) -> int:
+        return self._day
+
+    @property
+    def state(self) -> WorkerState:
+        return self._state
+
+    @property
+    def market(self) -> Market:
+        return self._market
+
+    @property
+    def data(self) -> EnsembleData:
+        return self._data
+
+    def replicate(self, rows: np.ndarray) -> np.ndarray:
+        return rows // self.workers
+
+    def run(self, steps: int) -> EnsembleData:
+        for _ in range(steps):
+            self.step()
+        return self._data
+
+    def withdraw(self, replicates: np.ndarray, vacancies: np.ndarray) -> None:
+        """Close vacancies in some replicates, given as pairs: they leave the boards, and saved jobs and
+        referrals by the end of the day."""
+        if self._openings is None:
+            self._openings = Openings(self._replicates, self._market.vacancy_count)
+        self._openings.withdraw(replicates, vacancies)
+        self._withdrawn = True
+
+    def step(self) -> None:
+        """Advance every replicate by one day, block by block, and record its statistics."""
+        state, market, workers = self._state, self._market, self.workers
+        every = np.arange(len(state))
+        worker, replicate = every % workers, every // workers
+        household = market.household[worker]
+        draws = self._uniforms(DRAWS)
+        week = (self._day + 1) % 7 == 0
+
+        applications = []
+        for start, stop in self._blocks:
+            rows = (np.arange(self._replicates)[:, None] * workers + np.arange(start, stop)).ravel()
+            applicants, vacancies = worker_day(
+                state, self._parameters, worker, household, market, draws, week, self._uniforms_for,
+                self._referrals, rows, self._openings, replicate
+            )
+            applications.append(applicants)
+            if self._hiring is not None and len(applicants):
+                accepted = self._hiring(applicants, vacancies, self._uniforms_for(applicants))
+                hired, filled = hire(
+                    state, market, applicants, vacancies, accepted, replicate[applicants] if self._fill else None
+                )
+                if self._fill and len(hired):
+                    self.withdraw(replicate[hired], filled)
+        if self._withdrawn:
+            self._forget_withdrawn()
+
+        self._day += 1
+        self._record(np.concatenate(applications) if applications else np.zeros(0, dtype=np.int64))
+
+    def _forget_withdrawn(self) -> None:
+        """Remove withdrawn vacancies from every saved job table."""
+        saved = self._state.saved
+        held = saved != EMPTY
+        replicates = self.replicate(np.arange(len(saved)))[:, None]
+        saved[held & ~self._openings.is_open(replicates, np.where(held, saved, 0))] = EMPTY
+        self._withdrawn = False
+
+    def _referrals(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The jobs saved by the workers of each row's friendly households in the row's replicate, as
+        (index in rows, contact number, vacancy) arrays in contact order."""
+        contacts, counts = contacts_of(self._market, self._market.household[rows % self.workers])
+        contacts = contacts + np.repeat(self.replicate(rows) * self.workers, counts)
+        saved = self._state.saved[contacts]
+        held = saved != EMPTY
+        if self._openings is not None:
+            held &= self._openings.is_open(self.replicate(contacts)[:, None], np.where(held, saved, 0))
+        width = saved.shape[1]
+        owner = np.repeat(np.repeat(np.arange(len(rows)), counts), width).reshape(saved.shape)
+        group = np.repeat(np.arange(len(contacts)), width).reshape(saved.shape)
+        return owner[held], group[held], saved[held]
+
+    def _uniforms(self, columns: int) -> np.ndarray:
+        """A row of uniform draws for every (replicate, worker) row, each replicate from its own stream."""
+        return np.concatenate([generator.random((self.workers, columns)) for generator in self._generators])
+
+    def _uniforms_for(self, rows: np.ndarray) -> np.ndarray:
+        """One uniform draw per row, taken from the stream of the row's replicate; rows must be sorted."""
+        counts = np.bincount(self.replicate(rows), minlength=self._replicates)
+        return np.concatenate([generator.random(count) for generator, count in zip(self._generators, counts)])
+
+    def _record(self, applicants: np.ndarray) -> None:
+        state, shape = self._state, (self._replicates, self.workers)
+        self._data.record(
+            unemployment_rate=1.0 - state.employed.reshape(shape).mean(axis=1),
+            training_share=state.training.reshape(shape).mean(axis=1),
+            reservation_wage=state.reservation_wage.reshape(shape).mean(axis=1),
+            applications=np.bincount(self.replicate(applicants), minlength=self._replicates).astype(np.float64)
+        )
+
+
+def extract(model, capacity: int = None) -> tuple[WorkerParameters, Market, WorkerState]:
+    """Read the worker parameters, market and worker state of a loaded ``LabourABM`` into columns.
+
+    Workers get at least ``capacity`` saved job slots, by default ``saved_capacity`` of their search limits.
+    Commuting is not modelled, so workers with a location and a commuting radius or cost are rejected.
+    """
+    manager = model.manager
+    workers = sorted(manager.get_agents_by_name('Worker'), key=lambda agent: agent.unique_id)
+    households = sorted(manager.get_agents_by_name('Household'), key=lambda agent: agent.unique_id)
+    household_index = {household.unique_id: index for index, household in enumerate(households)}
+    hyperparameters = [worker.hyperparameters() for worker in workers]
+    for worker, parameters in zip(workers, hyperparameters):
+        commuting = parameters['commuting_radius'] is not None or parameters['commuting_cost']
+        if commuting and worker.location is not None:
+            raise ValueError(f"Worker '{worker.unique_id}' commutes, which the ensemble does not model")
+
+    handles, boards = [], []
+    for index, board in enumerate(model.job_boards):
+        board_handles = board.handles().tolist()
+        handles.extend(board_handles)
+        boards.extend([index] * len(board_handles))
+    vacancies = model.vacancies
+    wages = vacancies.wages(handles) if handles else np.zeros(0, dtype=np.float64)
+    codes = vacancies.codes(handles) if handles else np.zeros(0, dtype=np.int64)
+    column = {handle: index for index, handle in enumerate(handles)}
+    by_wage = np.argsort(-wages, kind='stable')
+    rank = np.empty(len(handles), dtype=np.int64)
+    rank[by_wage] = np.arange(len(handles))
+    boards = np.array(boards, dtype=np.int64)
+    board_members = by_wage[np.argsort(boards[by_wage], kind='stable')]
+    board_indptr = np.concatenate(([0], np.cumsum(np.bincount(boards, minlength=len(model.job_boards)))))
+
+    household = np.array([household_index[worker.household.unique_id] for worker in workers], dtype=np.int64)
+    members = [[] for _ in households]
+    for row, index in enumerate(household.tolist()):
+        members[index].append(row)
+    friends = [[friend for friend in household_.friends if friend in household_index] for household_ in households]
+    contact_lists = [
+        [row for friend in friend_list for row in members[household_index[friend]]] for friend_list in friends
+    ]
+    contacts = np.array([row for contact_list in contact_lists for row in contact_list], dtype=np.int64)
+    contact_indptr = np.concatenate(([0], np.cumsum([len(contact_list) for contact_list in contact_lists])))
+
+    market = Market(
+        wages=wages, codes=codes, boards=boards,
+        popularity=np.array([board.popularity or 0 for board in model.job_boards], dtype=np.float64),
+        rank=rank, board_members=board_members, board_indptr=board_indptr.astype(np.int64),
+        household=household,
+        befriended=np.array([bool(friend_list) for friend_list in friends], dtype=np.bool_),
+        contacts=contacts, contact_indptr=contact_indptr.astype(np.int64),
+        days_to_specialise=np.array([YEARS_TO_SPECIALISE[specialisation] * 365 for specialisation in SPECIALISATIONS])
+    )
+
+    def column_of(values, dtype):
+        return np.array(list(values), dtype=dtype)
+
+    def parameter(name, dtype):
+        return column_of((parameters[name] for parameters in hyperparameters), dtype)
+
+    board_index = {id(board): index for index, board in enumerate(model.job_boards)}
+    job_boards = np.zeros((len(workers), len(model.job_boards)), dtype=np.bool_)
+    for row, worker in enumerate(workers):
+        job_boards[row, [board_index[id(board)] for board in worker.job_boards if id(board) in board_index]] = True
+
+    parameters = WorkerParameters(
+        alpha=parameter('alpha', np.float64),
+        search_rate=parameter('search_rate', np.float64),
+        pi=parameter('pi', np.float64),
+        search_max=parameter('search_max', np.int64),
+        application_rate=parameter('application_rate', np.float64),
+        application_max=parameter('application_max', np.int64),
+        training_rate=parameter('training_rate', np.float64),
+        max_general_skill=parameter('max_general_skill', np.int64),
+        unemployment_limit=parameter('unemployment_limit', np.int64),
+        ordered=column_of((parameters['search_method'] is AccessMethod.Ordered for parameters in hyperparameters),
+                          np.bool_),
+        job_boards=job_boards
+    )
+
+    saved = [[column[job] for job in worker.jobs if job in column] for worker in workers]
+    width = max([capacity or saved_capacity(parameters.search_max)] + [len(jobs) for jobs in saved])
+    rows, specialisations = len(workers), len(SPECIALISATIONS)
+    state = WorkerState(
+        employed=column_of((worker.employed for worker in workers), np.bool_),
+        wage=column_of((np.nan if worker.wage is None else worker.wage for worker in workers), np.float64),
+        reservation_wage=column_of((worker.reservation_wage for worker in workers), np.float64),
+        skill=column_of((worker.skill for worker in workers), np.int64),
+        training=column_of((worker.is_training for worker in workers), np.bool_),
+        time_training=column_of((worker.time_training for worker in workers), np.int64),
+        time_unemployed=column_of((worker.time_unemployed for worker in workers), np.int64),
+        training_code=column_of(
+            (SPECIALISATION_CODES.get(worker.training_specialisation, 0) for worker in workers), np.int64
+        ),
+        specialisations=np.zeros((rows, specialisations), dtype=np.bool_),
+        search_history=np.zeros((rows, specialisations), dtype=np.int64),
+        saved=np.full((rows, width), EMPTY, dtype=np.int64)
+    )
+    for row, worker in enumerate(workers):
+        for specialisation in worker.specialisations:
+            state.specialisations[row, SPECIALISATION_CODES[specialisation]] = True
+        for specialisation, seen in worker.search_history.items():
+            state.search_history[row, SPECIALISATION_CODES[specialisation]] = seen
+        state.saved[row, :len(saved[row])] = saved[row]
+    return parameters, market, state
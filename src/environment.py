@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from typing import TypeVar
+from typing import TypeVar, Callable
 from collections import deque
-import itertools
+from dataclasses import dataclass
+from enum import IntEnum
 
 from agent import AgentFactory, Agent
+from relations import RelationshipStore
 from abc import ABC, abstractmethod
 
 
@@ -13,19 +15,30 @@ U = TypeVar('U', bound='AgentScheduler')
 
 
 class AgentManager:
-    _id_generator = itertools.count()
-    _id_bank = deque([])
-
+    _id_counter: int
+    _id_bank: deque[int]
+    _reserved: set[int]
     _factory: AgentFactory
     _agents: dict[int, Agent]
     _agents_by_name: dict[str, set[int]]
+    _loaded: dict[str, list[int]]
+    _relations: RelationshipStore
+    _services: dict[str, object]
+    _revision: int
     _config: list[dict]
 
     def __init__(self, build_dict: dict, config: list):
         self._factory = AgentFactory()
         self._register(build_dict)
+        self._id_counter = 0
+        self._id_bank = deque()
+        self._reserved = set()
         self._agents = {}
         self._agents_by_name = {}
+        self._loaded = {}
+        self._relations = RelationshipStore()
+        self._services = {}
+        self._revision = 0
         self.config = config
         if config:
             self.reload()
@@ -43,6 +56,16 @@ class AgentManager:
         """Register a new agent configuration."""
         self._config = config
 
+    @property
+    def relations(self) -> RelationshipStore:
+        """Get the relationship store shared by all agents of the instance."""
+        return self._relations
+
+    @property
+    def revision(self) -> int:
+        """Counter that changes whenever agents are created or destroyed."""
+        return self._revision
+
     @property
     def agent_ids(self):
         return list(self._agents.keys())
@@ -51,6 +74,12 @@ class AgentManager:
         """Load the agents into memory based on the build configuration."""
         self._agents.clear()
         self._agents_by_name.clear()
+        self._loaded.clear()
+        self._relations.clear()
+        self._id_counter = 0
+        self._id_bank.clear()
+        self._reserved.clear()
+        self._revision += 1
 
         if self._config:
             for agent_details in self._config:
@@ -59,33 +88,102 @@ class AgentManager:
             self._agents = {}
             self._agents_by_name = {}
 
-    def create(self, name: str, **kwargs) -> Agent:
-        """Build a new agent based on a specific set of attributes using the agent factory."""
-        unique_id = self._next_id()
+    def create(self, name: str, unique_id: int = None, **kwargs) -> Agent:
+        """Build a new agent based on a specific set of attributes using the agent factory.
+
+        An agent is given the next free id unless a unique id is given, as when partitions build their agents under
+        their global ids.
+        """
+        if unique_id is None:
+            unique_id = self._next_id()
+        else:
+            self._reserve(unique_id)
         agent = self._factory.create(name, manager=self, unique_id=unique_id, **kwargs)
         self._agents[unique_id] = agent
         self._agents_by_name.setdefault(name, set()).add(unique_id)
+        self._revision += 1
+        agent.on_create()
         return agent
 
+    def create_many(self, name: str, columns: dict, **kwargs) -> list[int]:
+        """Build a batch of agents, taking per-agent attributes from equal-length columns and shared ones from kwargs."""
+        builder = self._factory.builder(name)
+        keys = list(columns)
+        values = [column.tolist() if hasattr(column, 'tolist') else list(column) for column in columns.values()]
+        count = len(values[0]) if values else 0
+        unique_ids = self._next_ids(count)
+
+        agents = self._agents
+        for unique_id, row in zip(unique_ids, zip(*values)):
+            attributes = dict(kwargs)
+            attributes.update(zip(keys, row))
+            self._check_free(unique_id)
+            agent = builder(manager=self, unique_id=unique_id, **attributes)
+            agents[unique_id] = agent
+            agent.on_create()
+        self._agents_by_name.setdefault(name, set()).update(unique_ids)
+        self._revision += 1
+        return unique_ids
+
     def destroy(self, unique_id: int) -> None:
         """Destroy an agent with a specific unique id and recover that id for later assignment."""
-        agent = self._agents.pop(unique_id, None)
+        agent = self._detach(unique_id)
         if agent is None:
             return
 
-        bucket = self._agents_by_name.get(agent.name)
-        if bucket is not None:
-            bucket.discard(unique_id)
-            if not bucket:
-                del self._agents_by_name[agent.name]
-
-        agent.on_kill()
+        for other_id, relation in self._relations.remove(unique_id).items():
+            other = self._agents.get(other_id)
+            if other is not None:
+                other.on_relation_killed(unique_id, relation)
         self._recover_id(unique_id)
 
+    def destroy_many(self, unique_ids) -> None:
+        """Destroy a batch of agents, removing all of their relations in one cascade."""
+        destroyed = [unique_id for unique_id in unique_ids if self._detach(unique_id) is not None]
+
+        for other_id, removed in self._relations.remove_many(destroyed).items():
+            other = self._agents.get(other_id)
+            if other is not None:
+                for unique_id, relation in removed:
+                    other.on_relation_killed(unique_id, relation)
+        for unique_id in destroyed:
+            self._recover_id(unique_id)
+
+    def add(self, agent: Agent) -> None:
+        """Register an agent constructed outside the factory under its existing unique id."""
+        self._reserve(agent.unique_id)
+        self._agents[agent.unique_id] = agent
+        self._agents_by_name.setdefault(agent.name, set()).add(agent.unique_id)
+        self._revision += 1
+        agent.on_create()
+
+    def attach(self, key: str, service: object) -> None:
+        """Attach a shared service (e.g. statistics or logging) that agents can look up by key."""
+        self._services[key] = service
+
+    def detach(self, key: str) -> None:
+        self._services.pop(key, None)
+
+    def service(self, key: str):
+        """Retrieve an attached service, or None if no service is attached under the key."""
+        return self._services.get(key)
+
     def get_agent_by_id(self, unique_id: int) -> T | None:
         """Retrieve a single agent based on their unique id."""
         return self._agents.get(unique_id)
 
+    def get_agents_by_name(self, name: str) -> list[T]:
+        """Retrieve all agents of a type."""
+        return [self._agents[unique_id] for unique_id in self._agents_by_name.get(name, ())]
+
+    def get_ids_by_name(self, name: str) -> set[int]:
+        """Retrieve the ids of all agents of a type."""
+        return self._agents_by_name.get(name, set())
+
+    def loaded_ids(self, name: str) -> list[int]:
+        """Retrieve the ids of the agents of a type created from the configuration, in creation order."""
+        return self._loaded.get(name, [])
+
     def get_agents_by_attr(self, **kwargs) -> list[T]:
         """Retrieve multiple agents based on matching attributes."""
         agents = []
@@ -100,19 +198,66 @@ class AgentManager:
             self._factory.register(key, builder)
 
     def _next_id(self) -> int:
-        """Get the next unique id for an agent from an updated count or from past deleted agents."""
+        """Get the next unique id for an agent from past deleted agents or from an updated count, skipping the ids
+        claimed explicitly."""
         if self._id_bank:
             return self._id_bank.popleft()
-        return next(self._id_generator)
+        while self._id_counter in self._reserved:
+            self._id_counter += 1
+        self._id_counter += 1
+        return self._id_counter - 1
+
+    def _reserve(self, unique_id: int) -> None:
+        """Claim a given unique id, which must not be in use, so it is not assigned to another agent."""
+        self._check_free(unique_id)
+        if unique_id in self._id_bank:
+            self._id_bank.remove(unique_id)
+        self._reserved.add(unique_id)
+
+    def _detach(self, unique_id: int) -> Agent | None:
+        """Remove an agent from the indexes of the instance, leaving its relations in place."""
+        agent = self._agents.pop(unique_id, None)
+        if agent is None:
+            return None
+
+        bucket = self._agents_by_name.get(agent.name)
+        if bucket is not None:
+            bucket.discard(unique_id)
+            if not bucket:
+                del self._agents_by_name[agent.name]
+
+        self._revision += 1
+        agent.on_kill()
+        return agent
+
+    def _check_free(self, unique_id: int) -> None:
+        if unique_id in self._agents:
+            raise KeyError(f"Agent id '{unique_id}' already in use")
+
+    def _next_ids(self, count: int) -> list[int]:
+        """Reserve a batch of unique ids, drawing on past deleted agents first."""
+        return [self._next_id() for _ in range(count)]
 
     def _recover_id(self, unique_id: int) -> None:
         """Save a unique id from a deleted agent for later assignment to a new agent ."""
         self._id_bank.append(unique_id)
 
     def _create_agents(self, agent_details: dict):
-        """Loop through the config dict and create each agent based on the agent's specification."""
-        for _ in range(agent_details['Count']):
-            self.create(agent_details['Name'], **agent_details['Parameters'])
+        """Loop through the config dict and create each agent based on the agent's specification.
+
+        If the specification provides a 'Columns' source, per-agent attributes are streamed from it in chunks and
+        built through the bulk construction path.
+        """
+        name = agent_details['Name']
+        parameters = agent_details.get('Parameters', {})
+        loaded = self._loaded.setdefault(name, [])
+        columns = agent_details.get('Columns')
+        if columns is None:
+            for _ in range(agent_details['Count']):
+                loaded.append(self.create(name, **parameters).unique_id)
+        else:
+            for chunk in columns.chunks(agent_details['Count'], self):
+                loaded.extend(self.create_many(name, chunk, **parameters))
 
     @staticmethod
     def _match(agent: Agent, **query) -> bool:
@@ -163,6 +308,95 @@ class AgentScheduler(ABC):
         pass
 
 
+class Cadence(IntEnum):
+    Daily = 1
+    Weekly = 7
+    Monthly = 30
+
+
+@dataclass(slots=True)
+class Phase:
+    """An action taken by every agent of a type, every cadence days, at a fixed position within the day.
+
+    A per-agent action is called as ``action(agent, day)``, a batch action once as ``action(agents, day)``.
+    """
+    name: str
+    agent_name: str
+    action: Callable
+    cadence: int = Cadence.Daily
+    order: int = 0
+    offset: int = 0
+    batch: bool = False
+
+    def due(self, day: int) -> bool:
+        return (day - self.offset) % self.cadence == 0
+
+
+class PhaseScheduler(AgentScheduler):
+    """Runs registered phases in their intra-day order, each dispatched once over the agents of its type.
+
+    Agents are looked up by type rather than checked one by one, and a phase that is not due costs nothing, so
+    agents acting weekly or monthly are not visited on other days.
+    """
+    _phases: list[Phase]
+    _day: int
+    _members: dict[str, tuple[int, list[Agent]]]
+
+    def __init__(self, manager: AgentManager, order: list[int] = None):
+        super().__init__(manager, order or [])
+        self._phases = []
+        self._day = 0
+        self._members = {}
+
+    @property
+    def day(self) -> int:
+        return self._day
+
+    @day.setter
+    def day(self, day: int) -> None:
+        self._day = day
+
+    @property
+    def phases(self) -> list[Phase]:
+        return list(self._phases)
+
+    def add_phase(self, name: str, agent_name: str, action: Callable, cadence: int = Cadence.Daily,
+                  order: int = 0, offset: int = 0, batch: bool = False) -> None:
+        """Register a phase; phases with equal order run in registration order."""
+        self._phases.append(Phase(name, agent_name, action, cadence, order, offset, batch))
+        self._phases.sort(key=lambda phase: phase.order)
+
+    def step(self) -> None:
+        day = self._day
+        for phase in self._phases:
+            if not phase.due(day):
+                continue
+            agents = self._agents_of(phase.agent_name)
+            if phase.batch:
+                phase.action(agents, day)
+            else:
+                action = phase.action
+                for agent in agents:
+                    action(agent, day)
+        self._day += 1
+
+    def refresh(self) -> None:
+        """Agent lists are rebuilt lazily once the manager reports creations or destructions."""
+        pass
+
+    def _reorder(self) -> None:
+        self._members.clear()
+
+    def _agents_of(self, agent_name: str) -> list[Agent]:
+        """Agents of a type in id order, cached until the manager's population changes."""
+        revision, agents = self._members.get(agent_name, (None, None))
+        if revision != self._manager.revision:
+            agents = [self._manager.get_agent_by_id(unique_id)
+                      for unique_id in sorted(self._manager.get_ids_by_name(agent_name))]
+            self._members[agent_name] = (self._manager.revision, agents)
+        return agents
+
+
 class Environment(ABC):
     _manager: AgentManager
     _scheduler: AgentScheduler
@@ -173,10 +407,18 @@ class Environment(ABC):
         self._scheduler = scheduler
         self._iterations = iterations
 
+    @property
+    def manager(self) -> AgentManager:
+        return self._manager
+
     def run(self) -> None:
         for _ in range(self._iterations):
-            self._scheduler.step()
-            self._scheduler.refresh()
+            self.step()
+
+    def step(self) -> None:
+        """Advance the simulation by a single time step."""
+        self._scheduler.step()
+        self._scheduler.refresh()
 
     @abstractmethod
     def load(self, configuration: dict) -> None:
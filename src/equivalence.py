@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Callable
+import random
+import time
+
+import numpy as np
+
+import kernels
+from ensemble import EMPTY, Ensemble, WorkerState, extract
+from labourmarket import LabourABM
+from storage import OutOfCoreMarket
+
+
+COLUMNS = ('employed', 'wage', 'reservation_wage', 'saved', 'training', 'time_training', 'training_code')
+
+
+class Engine(ABC):
+    """An execution path of the labour market, observed after each day as worker state columns.
+
+    Rows of the state are workers in ``agents`` order, which is creation order. Engines that draw from the global
+    ``random`` module must keep their own random state, so that two engines can be advanced in lock step.
+    """
+    name: str
+
+    @property
+    @abstractmethod
+    def agents(self) -> np.ndarray:
+        """Unique ids of the workers, one per state row."""
+        pass
+
+    @abstractmethod
+    def step(self) -> None:
+        pass
+
+    @abstractmethod
+    def state(self) -> WorkerState:
+        pass
+
+
+class ModelEngine(Engine):
+    """A ``LabourABM`` stepped object by object, with its search loop on a given kernel backend.
+
+    With the 'python' backend this is the reference behaviour of ``Worker.step``.
+    """
+    _model: LabourABM
+    _backend: str
+    _random_state: object
+    _agents: np.ndarray
+
+    def __init__(self, model: LabourABM, backend: str = 'python'):
+        self.name = f'model[{backend}]'
+        self._model = model
+        self._backend = backend
+        self._random_state = random.getstate()
+        self._agents = np.array(sorted(
+            worker.unique_id for worker in model.manager.get_agents_by_name('Worker')
+        ), dtype=np.int64)
+
+    @property
+    def agents(self) -> np.ndarray:
+        return self._agents
+
+    @property
+    def model(self) -> LabourABM:
+        return self._model
+
+    def step(self) -> None:
+        previous = kernels.backend()
+        kernels.set_backend(self._backend)
+        random.setstate(self._random_state)
+        try:
+            self._model.step()
+        finally:
+            self._random_state = random.getstate()
+            kernels.set_backend(previous)
+
+    def state(self) -> WorkerState:
+        return extract(self._model)[2]
+
+
+class EnsembleEngine(Engine):
+    """A single-replicate ``Ensemble`` built from a loaded model."""
+    _ensemble: Ensemble
+    _agents: np.ndarray
+
+    def __init__(self, model: LabourABM, seed: int = None,
+                 hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] = None, **kwargs):
+        self.name = 'ensemble'
+        self._ensemble = Ensemble.from_model(model, 1, seed, hiring, **kwargs)
+        self._agents = np.array(sorted(
+            worker.unique_id for worker in model.manager.get_agents_by_name('Worker')
+        ), dtype=np.int64)
+
+    @property
+    def agents(self) -> np.ndarray:
+        return self._agents
+
+    def step(self) -> None:
+        self._ensemble.step()
+
+    def state(self) -> WorkerState:
+        return self._ensemble.state
+
+
+class OutOfCoreEngine(Engine):
+    """An ``OutOfCoreMarket`` written to a directory from a loaded model."""
+    _market: OutOfCoreMarket
+    _agents: np.ndarray
+
+    def __init__(self, model: LabourABM, directory: str, memory_budget: int = 1 << 30, seed: int = None,
+                 hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] = None, **kwargs):
+        self.name = 'out-of-core'
+        parameters, market, state = extract(model)
+        self._market = OutOfCoreMarket.from_state(
+            directory, parameters, market, state, memory_budget=memory_budget, seed=seed, hiring=hiring, **kwargs
+        )
+        self._agents = np.array(sorted(
+            worker.unique_id for worker in model.manager.get_agents_by_name('Worker')
+        ), dtype=np.int64)
+
+    @property
+    def agents(self) -> np.ndarray:
+        return self._agents
+
+    def step(self) -> None:
+        self._market.step()
+
+    def state(self) -> WorkerState:
+        return self._market.block(0, len(self._market.store))
+
+
+@dataclass(slots=True, frozen=True)
+class Tolerance:
+    """How closely a state column of the alternative engine must follow the reference.
+
+    Per agent, values must agree within ``atol + rtol * |reference|`` (exactly, by default). With ``aggregate``
+    only the population mean of each day is compared, for engines that reproduce the reference statistically
+    rather than draw for draw; saved jobs are then compared by the mean number saved, and a column without any
+    value on either side, such as the wages of a population without employed workers, agrees.
+    """
+    atol: float = 0.0
+    rtol: float = 0.0
+    aggregate: bool = False
+
+
+EXACT = Tolerance()
+
+
+def statistical(atol: float, rtol: float = 0.0) -> dict[str, Tolerance]:
+    """The same aggregate tolerance for every compared column."""
+    return {column: Tolerance(atol, rtol, aggregate=True) for column in COLUMNS}
+
+
+@dataclass(slots=True)
+class Divergence:
+    """The first disagreement found: the day, the column, the worker (None for an aggregate) and both values."""
+    step: int
+    column: str
+    agent: int | None
+    reference: object
+    alternative: object
+
+
+@dataclass(slots=True)
+class EquivalenceReport:
+    reference: str
+    alternative: str
+    steps: int
+    reference_seconds: float
+    alternative_seconds: float
+    divergence: Divergence | None = None
+    columns: tuple[str, ...] = field(default=COLUMNS)
+
+    @property
+    def equivalent(self) -> bool:
+        return self.divergence is None
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster the alternative stepped than the reference."""
+        return self.reference_seconds / self.alternative_seconds if self.alternative_seconds else float('inf')
+
+    def __str__(self):
+        verdict = 'equivalent' if self.equivalent else (
+            f'diverged at step {self.divergence.step} in {self.divergence.column} '
+            f'(agent {self.divergence.agent}: {self.divergence.reference} != {self.divergence.alternative})'
+        )
+        return f'{self.alternative} vs {self.reference} over {self.steps} steps: {verdict}, {self.speedup:.2f}x'
+
+
+def _column(state: WorkerState, name: str) -> np.ndarray:
+    values = getattr(state, name)
+    if name == 'training_code':
+        return np.where(state.training, values, -1)
+    if name == 'wage':
+        return np.where(state.employed, values, np.nan)
+    if name == 'saved':
+        return -np.sort(-values, axis=1)
+    return values
+
+
+def _mean(values: np.ndarray) -> float:
+    """Population mean of a column, ignoring NaN, or of the number of saved jobs. NaN when no value is set, as
+    for the wages of a population without employed workers."""
+    if values.ndim > 1:
+        values = (values != EMPTY).sum(axis=1)
+    values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+    return float(values.mean()) if len(values) else float('nan')
+
+
+def _compare(step: int, name: str, agents: np.ndarray, reference: WorkerState, alternative: WorkerState,
+             tolerance: Tolerance) -> Divergence | None:
+    expected, actual = _column(reference, name), _column(alternative, name)
+    if tolerance.aggregate:
+        expected, actual = _mean(expected), _mean(actual)
+        if np.isnan(expected) and np.isnan(actual):
+            return None
+        if abs(expected - actual) <= tolerance.atol + tolerance.rtol * abs(expected):
+            return None
+        return Divergence(step, name, None, expected, actual)
+
+    if expected.shape != actual.shape:
+        return Divergence(step, name, None, expected.shape, actual.shape)
+    close = np.isclose(
+        expected.astype(np.float64), actual.astype(np.float64), rtol=tolerance.rtol, atol=tolerance.atol,
+        equal_nan=True
+    )
+    if close.ndim > 1:
+        close = close.all(axis=1)
+    if close.all():
+        return None
+    row = int(np.argmin(close))
+    if expected.ndim > 1:
+        return Divergence(
+            step, name, int(agents[row]), expected[row][expected[row] != EMPTY].tolist(),
+            actual[row][actual[row] != EMPTY].tolist()
+        )
+    return Divergence(step, name, int(agents[row]), expected[row].item(), actual[row].item())
+
+
+class GoldenRun:
+    """Checks an alternative engine against the reference, from identical seeds and populations.
+
+    The builder returns a loaded ``LabourABM`` for a seed; it is called once per engine with the global ``random``
+    and ``numpy.random`` states seeded, so both engines start from the same population. Workers are matched by
+    creation order and reported by their id in the reference engine. Engines are stepped in lock step and their
+    worker state compared after every day, column by column, exactly unless a tolerance is declared.
+    Time spent stepping each engine is recorded; extracting and comparing state is not.
+    """
+    _builder: Callable[[int], LabourABM]
+    _seed: int
+    _tolerances: dict[str, Tolerance]
+
+    def __init__(self, builder: Callable[[int], LabourABM], seed: int, tolerances: dict[str, Tolerance] = None):
+        self._builder = builder
+        self._seed = seed
+        self._tolerances = {column: EXACT for column in COLUMNS}
+        self._tolerances.update(tolerances or {})
+
+    def engine(self, factory: Callable[[LabourABM], Engine]) -> Engine:
+        random.seed(self._seed)
+        np.random.seed(self._seed)
+        return factory(self._builder(self._seed))
+
+    def compare(self, steps: int, alternative: Callable[[LabourABM], Engine],
+                reference: Callable[[LabourABM], Engine] = ModelEngine, stop: bool = False) -> EquivalenceReport:
+        """Run both engines for a number of days and report the first divergence and the speedup.
+
+        With ``stop`` the run ends at the first divergence, and timings cover the days run up to it.
+        """
+        expected, actual = self.engine(reference), self.engine(alternative)
+        if len(expected.agents) != len(actual.agents):
+            raise ValueError("The engines were not built with the same number of workers")
+        report = EquivalenceReport(expected.name, actual.name, 0, 0.0, 0.0, columns=tuple(self._tolerances))
+
+        for step in range(1, steps + 1):
+            start = time.perf_counter()
+            expected.step()
+            report.reference_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            actual.step()
+            report.alternative_seconds += time.perf_counter() - start
+            report.steps = step
+
+            if report.divergence is None:
+                states = expected.state(), actual.state()
+                for name, tolerance in self._tolerances.items():
+                    report.divergence = _compare(step, name, expected.agents, *states, tolerance)
+                    if report.divergence is not None:
+                        break
+            if stop and report.divergence is not None:
+                break
+        return report
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+from enum import IntEnum
+import os
+
+import numpy as np
+
+from kernels import SPECIALISATION_CODES
+from skills import Specialisation
+
+
+SERVICE_KEY = 'events'
+NO_ID = -1
+NO_SPECIALISATION = -1
+
+RECORD = np.dtype([
+    ('step', '<u4'),
+    ('event', 'u1'),
+    ('specialisation', '<i2'),
+    ('worker', '<i8'),
+    ('firm', '<i8'),
+    ('job', '<i8'),
+    ('wage', '<f8'),
+])
+
+
+class EventType(IntEnum):
+    Application = 1
+    Hire = 2
+    Separation = 3
+    TrainingStart = 4
+    TrainingComplete = 5
+
+
+class EventLog:
+    """Append-only log of fixed-width binary event records, written to disk in buffered chunks."""
+    _path: str
+    _buffer: np.ndarray
+    _size: int
+    _step: int
+
+    def __init__(self, path: str, chunk_size: int = 65536, append: bool = False):
+        self._path = path
+        self._buffer = np.empty(chunk_size, dtype=RECORD)
+        self._size = 0
+        self._step = 0
+        if not append:
+            open(path, 'wb').close()
+            remove_index(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def step(self) -> int:
+        return self._step
+
+    @step.setter
+    def step(self, step: int) -> None:
+        self._step = step
+
+    def advance(self) -> None:
+        """Move the log on to the next simulation step."""
+        self._step += 1
+
+    def log(self, event: EventType, worker: int = NO_ID, firm: int = NO_ID, job: int = NO_ID,
+            wage: float = None, specialisation: Specialisation = None) -> None:
+        """Append a record, writing the buffer to disk whenever it fills."""
+        code = SPECIALISATION_CODES[specialisation] if specialisation is not None else NO_SPECIALISATION
+        self._buffer[self._size] = (
+            self._step, event, code, worker,
+            NO_ID if firm is None else firm, NO_ID if job is None else job,
+            np.nan if wage is None else wage
+        )
+        self._size += 1
+        if self._size == len(self._buffer):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._size:
+            with open(self._path, 'ab') as file:
+                self._buffer[:self._size].tofile(file)
+            self._size = 0
+
+
+INDEXED_FIELDS = ('worker', 'firm', 'event')
+
+
+class _Index:
+    """Sorted keys with the positions of their records, for range lookups by binary search."""
+    __slots__ = ('keys', 'order')
+
+    def __init__(self, keys: np.ndarray, order: np.ndarray):
+        self.keys = keys
+        self.order = order
+
+    def lookup(self, key: int) -> np.ndarray:
+        start = np.searchsorted(self.keys, key, side='left')
+        stop = np.searchsorted(self.keys, key, side='right')
+        return np.sort(self.order[start:stop])
+
+
+def _open_records(path: str) -> np.ndarray:
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=RECORD)
+    return np.memmap(path, dtype=RECORD, mode='r')
+
+
+def _stamp(path: str) -> np.ndarray:
+    """Size and modification time of a log, which identify the version of it that an index was built from."""
+    status = os.stat(path)
+    return np.array([status.st_size, status.st_mtime_ns], dtype=np.int64)
+
+
+def _index_files(path: str) -> list[str]:
+    return [path + '.index.npy'] + [
+        f'{path}.{field}.{part}.npy' for field in INDEXED_FIELDS for part in ('order', 'keys')
+    ]
+
+
+def build_index(path: str) -> None:
+    """Write the side indexes of an event log, sorting record positions by worker, firm and event type."""
+    stamp = _stamp(path)
+    records = _open_records(path)
+    for field in INDEXED_FIELDS:
+        order = np.argsort(records[field], kind='stable')
+        np.save(f'{path}.{field}.order.npy', order)
+        np.save(f'{path}.{field}.keys.npy', np.asarray(records[field])[order])
+    np.save(path + '.index.npy', stamp)
+
+
+def remove_index(path: str) -> None:
+    """Delete the side indexes of an event log, if any."""
+    for index_path in _index_files(path):
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+
+class EventLogReader:
+    """Memory-mapped query access to an event log and its side indexes.
+
+    Indexes are (re)built on opening if missing or built from another version of the log, as told by its size and
+    modification time. Steps are written in non-decreasing order,
+    so step ranges are found by binary search on the log itself.
+    """
+    _records: np.ndarray
+    _indexes: dict[str, _Index]
+
+    def __init__(self, path: str):
+        self._records = _open_records(path)
+        index_path = path + '.index.npy'
+        if not os.path.exists(index_path) or not np.array_equal(np.load(index_path), _stamp(path)):
+            build_index(path)
+        self._indexes = {
+            field: _Index(
+                np.load(f'{path}.{field}.keys.npy', mmap_mode='r'),
+                np.load(f'{path}.{field}.order.npy', mmap_mode='r')
+            )
+            for field in INDEXED_FIELDS
+        }
+
+    def __len__(self):
+        return len(self._records)
+
+    @property
+    def records(self) -> np.ndarray:
+        return self._records
+
+    def worker_history(self, worker_id: int, events: list[EventType] = None) -> np.ndarray:
+        """All records of a worker in step order, optionally of specific event types."""
+        return self._filter(self._records[self._indexes['worker'].lookup(worker_id)], events)
+
+    def firm_history(self, firm_id: int, events: list[EventType] = None) -> np.ndarray:
+        """All records of a firm in step order, optionally of specific event types."""
+        return self._filter(self._records[self._indexes['firm'].lookup(firm_id)], events)
+
+    def events(self, event: EventType) -> np.ndarray:
+        """All records of an event type in step order."""
+        return self._records[self._indexes['event'].lookup(event)]
+
+    def between(self, first_step: int, last_step: int, events: list[EventType] = None) -> np.ndarray:
+        """All records from the first to the last step inclusive."""
+        steps = self._records['step']
+        start = np.searchsorted(steps, first_step, side='left')
+        stop = np.searchsorted(steps, last_step, side='right')
+        return self._filter(self._records[start:stop], events)
+
+    def hires_after_training(self, firm_id: int = None) -> np.ndarray:
+        """Hires of workers that had completed training before being hired, optionally only by one firm."""
+        hires = self.firm_history(firm_id, [EventType.Hire]) if firm_id is not None else self.events(EventType.Hire)
+        completions = self.events(EventType.TrainingComplete)
+        if not len(hires) or not len(completions):
+            return hires[:0]
+
+        workers, first = np.unique(completions['worker'], return_index=True)
+        completed = np.searchsorted(workers, hires['worker'])
+        completed = np.clip(completed, 0, len(workers) - 1)
+        trained = workers[completed] == hires['worker']
+        trained &= completions['step'][first][completed] <= hires['step']
+        return hires[trained]
+
+    @staticmethod
+    def _filter(records: np.ndarray, events: list[EventType] = None) -> np.ndarray:
+        if events is None:
+            return np.asarray(records)
+        return np.asarray(records[np.isin(records['event'], [int(event) for event in events])])
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 
 from agent import Agent, AgentBuilder
 from environment import AgentManager
+from spatial import Location
 from workers import Skill
 
 
@@ -16,18 +17,32 @@ class JobPosting:
 
 class Firm(Agent):  # TODO: implement
     _job_postings: dict[int, JobPosting]
+    _location: Location | None
 
     def __init__(
             self,
             manager: AgentManager,
-            unique_id: int
+            unique_id: int,
+            location: Location = None
     ):
-        super().__init__(manager, unique_id, 'Worker')
+        super().__init__(manager, unique_id, 'Firm')
+        self._location = tuple(location) if location is not None else None
+
+    @property
+    def location(self) -> Location | None:
+        """Where the firm's vacancies are, for posting on spatially indexed job boards."""
+        return self._location
 
     def step(self) -> None:
         pass
 
-    def apply(self, job_id, worker_id, cv=None):
+    def apply(self, vacancy: int, worker_id: int, cv=None):
+        """Receive an application for a vacancy, given by its handle in the manager's vacancy table, to be settled
+        in the hire phase."""
+        pass
+
+    def hire(self) -> None:
+        """Settle the applications received since the last hire phase."""
         pass
 
 
@@ -1,18 +1,51 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
+import numpy as np
+
 from agent import Agent, AgentBuilder
 from environment import AgentManager
 from network import SocialNetwork
-from workers import Worker
+from relations import Relation
+from spatial import Location
+from wages import SERVICE_KEY as WAGES, WageColumn
+
+if TYPE_CHECKING:
+    from workers import BaseWorker as Worker
+
+
+def consumption_rule(income, savings, size, subsistence: float, consumption_rate: float):
+    """Consume the subsistence cost of the household plus a share of any surplus income, limited by resources.
+
+    Works element-wise, so the same rule serves a single household and the batched kernel.
+    """
+    need = subsistence * size
+    desired = need + consumption_rate * np.maximum(income - need, 0.0)
+    return np.minimum(desired, np.maximum(income + savings, 0.0))
+
+
+def worker_wages(workers, wages: WageColumn = None) -> np.ndarray:
+    """Collect the current wage of each worker, zero if unemployed, from the wage column if there is one."""
+    if wages is not None:
+        return wages.of(worker.unique_id for worker in workers)
+    return np.fromiter((worker.wage if worker.employed else 0.0 for worker in workers), dtype=np.float64)
 
 
 class Household(Agent):  # TODO: implement
     _size: int
     _social_network: SocialNetwork
-    _friends: list[int]
+    _location: Location | None
 
     _workers: list[Worker]
     _savings: float
+    _income: float
+    _consumption: float
+
+    # Hyperparameters
+    _subsistence: float
+    _consumption_rate: float
+    _poverty_line: float
 
     def __init__(
             self,
@@ -20,31 +53,212 @@ class Household(Agent):  # TODO: implement
             unique_id: int,
             size: int,
             workers: list[Worker],
-            savings: float
+            savings: float,
+            friends: list[int] = None,
+            subsistence: float = 0.0,
+            consumption_rate: float = 1.0,
+            poverty_line: float = 0.0,
+            location: Location = None
     ):
         super().__init__(manager, unique_id, 'Household')
 
         self._size = size
+        for friend_id in friends or ():
+            self.befriend(friend_id)
+        self._location = tuple(location) if location is not None else None
 
         self._workers = workers
         self._savings = savings
+        self._income = 0.0
+        self._consumption = 0.0
+
+        self._subsistence = subsistence
+        self._consumption_rate = consumption_rate
+        self._poverty_line = poverty_line
 
     @property
-    def friends(self):
-        return self._friends
+    def friends(self) -> list[int]:
+        """Ids of the households this household counts as friends, held as relations in the manager's store."""
+        return self._manager.relations.related(self.unique_id, Relation.Friend)
 
     @property
     def workers(self):
         return self._workers
 
+    @property
+    def location(self) -> Location | None:
+        return self._location
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def savings(self) -> float:
+        return self._savings
+
+    @property
+    def income(self) -> float:
+        return self._income
+
+    @property
+    def consumption(self) -> float:
+        return self._consumption
+
+    @property
+    def subsistence(self) -> float:
+        return self._subsistence
+
+    @property
+    def consumption_rate(self) -> float:
+        return self._consumption_rate
+
+    @property
+    def poverty_line(self) -> float:
+        return self._poverty_line
+
+    @property
+    def poor(self) -> bool:
+        """Returns True if the per capita income of the household is below the poverty line."""
+        return self._income / max(self._size, 1) < self._poverty_line
+
     def step(self) -> None:
-        pass
+        self.consume()
+
+    def befriend(self, unique_id: int) -> None:
+        self.register(unique_id, Relation.Friend)
+
+    def unfriend(self, unique_id: int) -> None:
+        self.deregister(unique_id, Relation.Friend)
+
+    def on_relation_killed(self, unique_id: int, relation: Relation) -> None:
+        """Drops destroyed workers and friends from the household."""
+        if relation & Relation.HouseholdMember:
+            self._workers = [worker for worker in self._workers if worker.unique_id != unique_id]
+        if relation & Relation.Friend:
+            self.unfriend(unique_id)
 
     def consume(self) -> None:
-        pass
+        """Total the wages of the household's workers, consume, and save what remains."""
+        self._income = float(worker_wages(self._workers, self._manager.service(WAGES)).sum())
+        self._consumption = float(consumption_rule(
+            self._income, self._savings, self._size, self._subsistence, self._consumption_rate
+        ))
+        self._savings += self._income - self._consumption
+
+
+class HouseholdBudget:
+    """Batched household income, consumption and savings kernel.
+
+    Household membership is held as a CSR index over worker slots, so household incomes are a single segment
+    sum of the worker wage column and every rule is applied to all households in one pass. Hyperparameters are
+    shared scalars or one value per household.
+    """
+    _offsets: np.ndarray
+    _members: np.ndarray
+    _owners: np.ndarray
+    _size: np.ndarray
+    _savings: np.ndarray
+    _income: np.ndarray
+    _consumption: np.ndarray
+    _poor: np.ndarray
+
+    # Hyperparameters
+    _subsistence: float | np.ndarray
+    _consumption_rate: float | np.ndarray
+    _poverty_line: float | np.ndarray
+
+    def __init__(
+            self,
+            offsets: np.ndarray,
+            members: np.ndarray,
+            size: np.ndarray,
+            savings: np.ndarray,
+            subsistence: float | np.ndarray = 0.0,
+            consumption_rate: float | np.ndarray = 1.0,
+            poverty_line: float | np.ndarray = 0.0
+    ):
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+        self._members = np.asarray(members, dtype=np.int64)
+        counts = np.diff(self._offsets)
+        self._owners = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+
+        self._size = np.asarray(size, dtype=np.float64)
+        self._savings = np.array(savings, dtype=np.float64)
+        self._income = np.zeros(len(counts), dtype=np.float64)
+        self._consumption = np.zeros(len(counts), dtype=np.float64)
+        self._poor = np.zeros(len(counts), dtype=bool)
+
+        self._subsistence = subsistence
+        self._consumption_rate = consumption_rate
+        self._poverty_line = poverty_line
+
+    def __len__(self):
+        return len(self._size)
+
+    @classmethod
+    def from_households(cls, households: list[Household], worker_index: dict[int, int], **kwargs) -> HouseholdBudget:
+        """Build the kernel from household agents, mapping each worker id to its slot in the wage column.
+
+        Hyperparameters not given are taken from each household.
+        """
+        counts = np.fromiter((len(household.workers) for household in households), dtype=np.int64)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        members = np.fromiter(
+            (worker_index[worker.unique_id] for household in households for worker in household.workers),
+            dtype=np.int64, count=int(offsets[-1])
+        )
+        size = np.fromiter((household.size for household in households), dtype=np.float64)
+        savings = np.fromiter((household.savings for household in households), dtype=np.float64)
+        for name in ('subsistence', 'consumption_rate', 'poverty_line'):
+            if name not in kwargs:
+                kwargs[name] = np.fromiter((getattr(household, name) for household in households), dtype=np.float64)
+        return cls(offsets, members, size, savings, **kwargs)
+
+    @property
+    def savings(self) -> np.ndarray:
+        return self._savings
+
+    @property
+    def income(self) -> np.ndarray:
+        return self._income
+
+    @property
+    def consumption(self) -> np.ndarray:
+        return self._consumption
+
+    @property
+    def poor(self) -> np.ndarray:
+        return self._poor
+
+    @property
+    def poverty_rate(self) -> float:
+        return float(self._poor.mean()) if len(self._poor) else 0.0
+
+    def members(self, household: int) -> np.ndarray:
+        """Returns the worker slots belonging to a household."""
+        return self._members[self._offsets[household]:self._offsets[household + 1]]
+
+    def step(self, wages: np.ndarray) -> None:
+        """Update income, consumption, savings and poverty flags of every household from the worker wage column."""
+        np.copyto(self._income, np.bincount(self._owners, weights=wages[self._members], minlength=len(self._size)))
+        np.copyto(self._consumption, consumption_rule(
+            self._income, self._savings, self._size, self._subsistence, self._consumption_rate
+        ))
+        self._savings += self._income - self._consumption
+        np.less(self._income / np.maximum(self._size, 1.0), self._poverty_line, out=self._poor)
+
+    def write_back(self, households: list[Household]) -> None:
+        """Copy the kernel state onto the household agents it was built from."""
+        for index, household in enumerate(households):
+            household._savings = float(self._savings[index])
+            household._income = float(self._income[index])
+            household._consumption = float(self._consumption[index])
 
 
-class HouseholdBuilder(AgentBuilder):  # TODO: implement
+class HouseholdBuilder(AgentBuilder):
     def __call__(self, manager: AgentManager, unique_id: int, **kwargs):
-        """Creates and returns a household agent."""
-        pass
+        """Creates and returns a household agent, with no workers unless given."""
+        kwargs.setdefault('workers', [])
+        return Household(manager, unique_id, **kwargs)
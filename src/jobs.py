@@ -1,45 +1,233 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import math
+
+import numpy as np
+
+from aggregates import MarketAggregates
+import kernels
+from kernels import SPECIALISATIONS, SPECIALISATION_CODES
 from skills import Specialisation
+from spatial import GridIndex, Location, distances
+
+
+SERVICE_KEY = 'vacancies'
+NO_SPECIALISATION = -1
+
+_SLOT_BITS = 32
+_SLOT_MASK = (1 << _SLOT_BITS) - 1
+
+
+class VacancyTable:
+    """Central table of open vacancies, identified by interned integer handles.
+
+    Firm, job id, wage, specialisation code and location (NaN where a vacancy has none) are held in parallel
+    arrays indexed by the low bits of a handle, so boards and worker memories store plain ints and read job details
+    a whole array at a time. A vacancy stays in the table while any holder (a job board or a referral) has acquired
+    it. Released slots are reused under a new generation in the high bits of the handle, so handles kept by workers
+    after a vacancy closes never alias a later one and are recognised as stale by ``in``.
+    """
+    _firms: np.ndarray
+    _jobs: np.ndarray
+    _wages: np.ndarray
+    _codes: np.ndarray
+    _xs: np.ndarray
+    _ys: np.ndarray
+    _generations: np.ndarray
+    _holders: np.ndarray
+    _free: list[int]
+    _size: int
+    _handles: dict[tuple[int, int], int]
+    _live: set[int]
+    _revision: int
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(capacity, 1)
+        self._firms = np.zeros(capacity, dtype=np.int64)
+        self._jobs = np.zeros(capacity, dtype=np.int64)
+        self._wages = np.zeros(capacity, dtype=np.float64)
+        self._codes = np.full(capacity, NO_SPECIALISATION, dtype=np.int64)
+        self._xs = np.full(capacity, np.nan, dtype=np.float64)
+        self._ys = np.full(capacity, np.nan, dtype=np.float64)
+        self._generations = np.zeros(capacity, dtype=np.int64)
+        self._holders = np.zeros(capacity, dtype=np.int64)
+        self._free = []
+        self._size = 0
+        self._handles = {}
+        self._live = set()
+        self._revision = 0
+
+    def __len__(self):
+        return len(self._live)
+
+    def __contains__(self, handle: int) -> bool:
+        return handle in self._live
+
+    def __iter__(self):
+        return iter(self._live)
+
+    @property
+    def revision(self) -> int:
+        """Counter that changes whenever a vacancy is acquired, updated or released."""
+        return self._revision
+
+    def handle(self, firm_id: int, job_id: int) -> int | None:
+        """The handle of a firm's open vacancy, or None if it is not in the table."""
+        return self._handles.get((firm_id, job_id))
+
+    def acquire(self, firm_id: int, job_id: int, wage: float, specialisation: Specialisation | None,
+                location: Location = None) -> int:
+        """Intern a vacancy for a new holder, updating its details if it is already open, and return its handle."""
+        key = (firm_id, job_id)
+        handle = self._handles.get(key)
+        if handle is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._size
+                if slot == len(self._firms):
+                    self._grow()
+                self._size += 1
+            handle = slot | int(self._generations[slot]) << _SLOT_BITS
+            self._firms[slot] = firm_id
+            self._jobs[slot] = job_id
+            self._handles[key] = handle
+            self._live.add(handle)
+        else:
+            slot = handle & _SLOT_MASK
+        self._wages[slot] = wage
+        self._codes[slot] = SPECIALISATION_CODES[specialisation] if specialisation is not None else NO_SPECIALISATION
+        self._xs[slot], self._ys[slot] = location if location is not None else (np.nan, np.nan)
+        self._holders[slot] += 1
+        self._revision += 1
+        return handle
+
+    def release(self, handle: int) -> None:
+        """Drop a holder of a vacancy, closing it and retiring its handle once no holder remains."""
+        if handle not in self._live:
+            return
+        slot = handle & _SLOT_MASK
+        self._holders[slot] -= 1
+        self._revision += 1
+        if self._holders[slot] > 0:
+            return
+        self._live.discard(handle)
+        del self._handles[(int(self._firms[slot]), int(self._jobs[slot]))]
+        self._generations[slot] += 1
+        self._free.append(slot)
+
+    def live(self, handles) -> list[int]:
+        """The handles still open, in their original order."""
+        live = self._live
+        return [handle for handle in handles if handle in live]
 
+    def slots(self, handles) -> np.ndarray:
+        if not isinstance(handles, np.ndarray):
+            handles = np.fromiter(handles, dtype=np.int64)
+        return handles & _SLOT_MASK
 
-@dataclass(slots=True, frozen=True)
-class JobReference:
-    """Lightweight, hashable reference to a unique vacancy."""
-    firm_id: int
-    job_id: int
+    def firm(self, handle: int) -> int:
+        return int(self._firms[handle & _SLOT_MASK])
 
+    def job(self, handle: int) -> int:
+        return int(self._jobs[handle & _SLOT_MASK])
 
-@dataclass(slots=True, frozen=True)
-class JobDetails:
-    """Stores the details of a job."""
-    satisficing_wage: float
-    specialisation: Specialisation | None = None
+    def wage(self, handle: int) -> float:
+        return float(self._wages[handle & _SLOT_MASK])
+
+    def specialisation(self, handle: int) -> Specialisation | None:
+        code = self._codes[handle & _SLOT_MASK]
+        return SPECIALISATIONS[code] if code != NO_SPECIALISATION else None
+
+    def location(self, handle: int) -> Location | None:
+        slot = handle & _SLOT_MASK
+        if np.isnan(self._xs[slot]):
+            return None
+        return float(self._xs[slot]), float(self._ys[slot])
+
+    def distances(self, handles, location: Location) -> np.ndarray:
+        """Distances from a location to each vacancy, zero for vacancies without a location."""
+        slots = self.slots(handles)
+        return np.nan_to_num(distances(self._xs[slots], self._ys[slots], location))
+
+    def wages(self, handles) -> np.ndarray:
+        return self._wages[self.slots(handles)]
+
+    def codes(self, handles) -> np.ndarray:
+        """Specialisation codes (see ``kernels.SPECIALISATION_CODES``) of the vacancies."""
+        return self._codes[self.slots(handles)]
+
+    def specialisations(self, handles) -> list[Specialisation | None]:
+        return [SPECIALISATIONS[code] if code != NO_SPECIALISATION else None for code in self.codes(handles).tolist()]
+
+    def describe(self, handles) -> list[tuple[int, int, float, Specialisation | None, Location | None]]:
+        """Firm, job id, wage, specialisation and location of each vacancy, in the argument order of ``acquire``."""
+        slots = self.slots(handles)
+        locations = [
+            None if math.isnan(x) else (x, y) for x, y in zip(self._xs[slots].tolist(), self._ys[slots].tolist())
+        ]
+        return list(zip(
+            self._firms[slots].tolist(), self._jobs[slots].tolist(),
+            self._wages[slots].tolist(), self.specialisations(handles), locations
+        ))
+
+    def _grow(self) -> None:
+        capacity = 2 * len(self._firms)
+        fills = {'_codes': NO_SPECIALISATION, '_xs': np.nan, '_ys': np.nan}
+        for name in ('_firms', '_jobs', '_wages', '_codes', '_xs', '_ys', '_generations', '_holders'):
+            array = getattr(self, name)
+            grown = np.full(capacity, fills.get(name, 0), dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
 
 
 class JobBoard:
-    _board: dict[JobReference, JobDetails]
+    """The vacancies posted on a board, held as handles into a shared ``VacancyTable``.
+
+    The table must be the one attached to the workers' manager as its 'vacancies' service, through which workers
+    resolve the handles they save.
+
+    Given a cell size, the board also indexes located vacancies on a uniform grid so searches within a commuting
+    radius only visit the vacancies nearby. Vacancies posted without a location are reachable from anywhere.
+    """
+    _board: dict[int, None]
+    _handles: np.ndarray | None
+    _columns: tuple[int, np.ndarray, np.ndarray] | None
+    _index: GridIndex | None
+    _unlocated: dict[int, None]
+    _vacancies: VacancyTable
     _popularity: int
+    _aggregates: MarketAggregates | None
 
-    def __init__(self, popularity: int = None):
+    def __init__(self, vacancies: VacancyTable, popularity: int = None, aggregates: MarketAggregates = None,
+                 cell_size: float = None):
+        if not isinstance(vacancies, VacancyTable):
+            raise TypeError("A job board needs the vacancy table shared with its workers")
         self._board = {}
+        self._handles = None
+        self._columns = None
+        self._index = GridIndex(cell_size) if cell_size is not None else None
+        self._unlocated = {}
+        self._vacancies = vacancies
         self._popularity = popularity
+        self._aggregates = aggregates
 
-    def __getitem__(self, name):
-        return self._board[name]
+    def __len__(self):
+        return len(self._board)
 
     def __iter__(self):
         return iter(self._board)
 
-    def keys(self):
-        return self._board.keys()
+    def __contains__(self, handle: int) -> bool:
+        return handle in self._board
 
-    def items(self):
-        return self._board.items()
+    @property
+    def vacancies(self) -> VacancyTable:
+        return self._vacancies
 
-    def values(self):
-        return self._board.values()
+    @property
+    def spatial(self) -> bool:
+        return self._index is not None
 
     @property
     def popularity(self):
@@ -49,10 +237,77 @@ class JobBoard:
     def popularity(self, popularity):
         self._popularity = popularity
 
-    def register(self, firm_id: int, job_id: int, wage_offered: float, specialisation: Specialisation) -> None:
-        job = JobReference(firm_id, job_id)
-        self._board[job] = JobDetails(wage_offered, specialisation)
+    def handles(self) -> np.ndarray:
+        """The handles of the posted vacancies in posting order, cached until the board changes."""
+        if self._handles is None:
+            self._handles = np.fromiter(self._board, dtype=np.int64, count=len(self._board))
+        return self._handles
+
+    def wages(self) -> np.ndarray:
+        """Wages of the posted vacancies in posting order."""
+        return self._wage_columns()[1]
+
+    def wage_order(self) -> np.ndarray:
+        """Positions of the posted vacancies from highest to lowest wage, keeping posting order for equal wages."""
+        return self._wage_columns()[2]
+
+    def specialisations(self) -> list[Specialisation | None]:
+        return self._vacancies.specialisations(self._board)
+
+    def within(self, location: Location, radius: float) -> np.ndarray:
+        """The handles of the vacancies within a radius of a location, and of those posted without a location."""
+        if self._index is None:
+            handles = self.handles()
+            return handles[self._vacancies.distances(handles, location) <= radius]
+        nearby = self._index.query(location, radius)
+        if not self._unlocated:
+            return nearby
+        return np.concatenate((nearby, np.fromiter(self._unlocated, dtype=np.int64, count=len(self._unlocated))))
+
+    def register(self, firm_id: int, job_id: int, wage_offered: float, specialisation: Specialisation,
+                 location: Location = None) -> int:
+        """Post a vacancy, or update the details of one already posted, and return its handle."""
+        handle = self._vacancies.handle(firm_id, job_id)
+        if handle is not None and handle in self._board:
+            if self._aggregates is not None:
+                self._aggregates.withdraw(self._vacancies.specialisation(handle))
+                self._aggregates.post(specialisation)
+            self._vacancies.acquire(firm_id, job_id, wage_offered, specialisation, location)
+            self._vacancies.release(handle)
+        else:
+            handle = self._vacancies.acquire(firm_id, job_id, wage_offered, specialisation, location)
+            self._board[handle] = None
+            self._handles = None
+            if self._aggregates is not None:
+                self._aggregates.post(specialisation)
+
+        if self._index is not None:
+            if location is None:
+                self._index.remove(handle)
+                self._unlocated[handle] = None
+            else:
+                self._unlocated.pop(handle, None)
+                self._index.insert(handle, location)
+        return handle
 
     def deregister(self, firm_id: int, job_id: int) -> None:
-        job = JobReference(firm_id, job_id)
-        self._board.pop(job, None)
+        handle = self._vacancies.handle(firm_id, job_id)
+        if handle is None or handle not in self._board:
+            return
+        del self._board[handle]
+        self._handles = None
+        if self._index is not None:
+            self._index.remove(handle)
+            self._unlocated.pop(handle, None)
+        if self._aggregates is not None:
+            self._aggregates.withdraw(self._vacancies.specialisation(handle))
+        self._vacancies.release(handle)
+
+    def _wage_columns(self) -> tuple[int, np.ndarray, np.ndarray]:
+        """Wages and wage order of the board, computed once for every worker searching it until the vacancy table,
+        and so the board, changes."""
+        revision = self._vacancies.revision
+        if self._columns is None or self._columns[0] != revision:
+            wages = self._vacancies.wages(self.handles())
+            self._columns = (revision, wages, kernels.order_by_wage(wages))
+        return self._columns
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+from skills import Specialisation, SPECIALISATION_TO_SKILL
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+SPECIALISATIONS = list(Specialisation)
+SPECIALISATION_CODES = {specialisation: code for code, specialisation in enumerate(SPECIALISATIONS)}
+SKILL_BY_CODE = np.array([int(SPECIALISATION_TO_SKILL[specialisation]) for specialisation in SPECIALISATIONS])
+
+_BACKENDS = ('python', 'numpy', 'numba')
+_backend = os.environ.get('SYREN_KERNELS', 'python')
+
+
+def _jit(function):
+    """Compile a loop kernel with numba, caching the machine code on disk (see NUMBA_CACHE_DIR)."""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+def set_backend(name: str) -> str:
+    """Select the kernel backend used by the job search loop.
+
+    'python' keeps the reference object loops, 'numpy' uses the vectorised kernels, 'numba' the compiled ones and
+    'auto' picks numba when it is installed and numpy otherwise. Returns the backend selected.
+
+    'python' is the default. The kernels pay off for ordered search over large boards, whose wage order is computed
+    once per board and shared by every worker (about 2.6x faster over 2000 vacancies and 500 workers). With random
+    search order the per-worker ``random.sample`` draws that keep results identical dominate, and the kernels run
+    at about the speed of the python path; with small boards (around 150 vacancies) the gain is marginal.
+    """
+    global _backend
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'numpy'
+    if name not in _BACKENDS:
+        raise ValueError(name)
+    if name == 'numba' and numba is None:
+        raise ImportError("The numba backend requires numba to be installed")
+    _backend = name
+    return name
+
+
+def backend() -> str:
+    return _backend
+
+
+def active() -> bool:
+    """Returns True if the job search loop should run through the kernels."""
+    return _backend != 'python'
+
+
+def specialisation_codes(specialisations) -> np.ndarray:
+    return np.fromiter((SPECIALISATION_CODES[specialisation] for specialisation in specialisations), dtype=np.int64)
+
+
+def specialisation_mask(specialisations) -> np.ndarray:
+    """Returns a boolean lookup over specialisation codes, True for the specialisations given."""
+    mask = np.zeros(len(SPECIALISATIONS), dtype=np.bool_)
+    for specialisation in specialisations:
+        mask[SPECIALISATION_CODES[specialisation]] = True
+    return mask
+
+
+@_jit
+def _order_by_wage_loop(wages):
+    return np.argsort(-wages, kind='mergesort')
+
+
+@_jit
+def _order_within_loop(wages, lengths):
+    perm = np.empty(len(wages), dtype=np.int64)
+    start = 0
+    for length in lengths:
+        perm[start:start + length] = start + np.argsort(-wages[start:start + length], kind='mergesort')
+        start += length
+    return perm
+
+
+@_jit
+def _screen_loop(perm, wages, reservation_wage, count, maximum):
+    selected = np.empty(len(perm), dtype=np.int64)
+    found = 0
+    for index in perm:
+        if count >= maximum:
+            break
+        if wages[index] >= reservation_wage:
+            selected[found] = index
+            found += 1
+        count += 1
+    return selected[:found], count
+
+
+@_jit
+def _applicable_loop(codes, own, skill_by_code, max_general_skill):
+    mask = np.empty(len(codes), dtype=np.bool_)
+    for index in range(len(codes)):
+        code = codes[index]
+        mask[index] = own[code] or skill_by_code[code] <= max_general_skill
+    return mask
+
+
+def _order_by_wage_numpy(wages):
+    return np.argsort(-wages, kind='stable')
+
+
+def _order_within_numpy(wages, lengths):
+    return np.lexsort((-wages, np.repeat(np.arange(len(lengths)), lengths)))
+
+
+def _screen_numpy(perm, wages, reservation_wage, count, maximum):
+    considered = perm[:max(maximum - count, 0)]
+    return considered[wages[considered] >= reservation_wage], count + len(considered)
+
+
+def _applicable_numpy(codes, own, skill_by_code, max_general_skill):
+    return own[codes] | (skill_by_code[codes] <= max_general_skill)
+
+
+def order_by_wage(wages: np.ndarray) -> np.ndarray:
+    """Indices of the wages from highest to lowest, keeping the original order of equal wages."""
+    if _backend == 'numba':
+        return _order_by_wage_loop(wages)
+    return _order_by_wage_numpy(wages)
+
+
+def order_within(wages: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Indices of consecutive groups of wages, of the given lengths, each from highest to lowest wage and keeping
+    the original order of equal wages."""
+    if _backend == 'numba':
+        return _order_within_loop(wages, lengths)
+    return _order_within_numpy(wages, lengths)
+
+
+def screen(perm: np.ndarray, wages: np.ndarray, reservation_wage: float, count: int, maximum: int):
+    """Walk the permutation until the search budget is spent, keeping jobs paying at least the reservation wage.
+
+    Returns the kept indices and the updated search count.
+    """
+    if _backend == 'numba':
+        selected, count = _screen_loop(perm, wages, reservation_wage, count, maximum)
+        return selected, int(count)
+    return _screen_numpy(perm, wages, reservation_wage, count, maximum)
+
+
+def applicable(codes: np.ndarray, own: np.ndarray, max_general_skill: int) -> np.ndarray:
+    """Mask of jobs a worker can apply to: one of their specialisations or within their general skill."""
+    if _backend == 'numba':
+        return _applicable_loop(codes, own, SKILL_BY_CODE, max_general_skill)
+    return _applicable_numpy(codes, own, SKILL_BY_CODE, max_general_skill)
+
+
+def warmup() -> None:
+    """Compile (or load from the disk cache) every numba kernel ahead of the first simulation step."""
+    if numba is None:
+        return
+    wages = np.zeros(1, dtype=np.float64)
+    perm = np.zeros(1, dtype=np.int64)
+    _order_by_wage_loop(wages)
+    _order_within_loop(wages, np.ones(1, dtype=np.int64))
+    _screen_loop(perm, wages, 0.0, 0, 1)
+    _applicable_loop(perm, np.zeros(len(SPECIALISATIONS), dtype=np.bool_), SKILL_BY_CODE, 0)
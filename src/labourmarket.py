@@ -1,10 +1,20 @@
 from __future__ import annotations
 
-from environment import Environment, AgentManager, AgentScheduler
+import numpy as np
+
+from environment import Environment, AgentManager, PhaseScheduler, Cadence
 from collector import Collector
 from agent import AgentBuilder
+from households import HouseholdBudget, HouseholdBuilder
+from jobs import JobBoard, VacancyTable, SERVICE_KEY as VACANCIES
+from relations import Relation
 from workers import SpecialisingWorker
-from skills import YEARS_TO_SPECIALISE
+from skills import Skill, YEARS_TO_SPECIALISE
+from aggregates import MarketAggregates, SERVICE_KEY as AGGREGATES
+from eventlog import EventLog, SERVICE_KEY as EVENTS
+from sketches import Series, RollingMean, HistogramSketch
+from downsampling import lttb, minmax, envelope
+from wages import WageColumn, SERVICE_KEY as WAGES
 
 
 class Worker(SpecialisingWorker):
@@ -12,14 +22,14 @@ class Worker(SpecialisingWorker):
         """Workers daily and weekly activities."""
         if not self._employed:
             if week:
-                self._reservation_wage = max(self._reservation_wage - self._alpha, 0.0)
+                self._set_reservation_wage(max(self._reservation_wage - self._alpha, 0.0))
 
             if self._is_training:
                 if self._time_training < YEARS_TO_SPECIALISE[self._training_specialisation] * 365:
                     self._time_training += 1
                 else:
                     self.train(self._training_specialisation)
-                    self._is_training = False
+                    self.stop_training()
                 return
 
             if self._time_unemployed >= self._unemployment_limit:
@@ -33,49 +43,270 @@ class Worker(SpecialisingWorker):
             self._time_unemployed += 1
 
 
-class WorkerBuilder(AgentBuilder):  # TODO: implement
+class WorkerBuilder(AgentBuilder):
     def __call__(self, manager: AgentManager, unique_id: int, **kwargs):
-        """Creates and returns a worker agent."""
-        pass
+        """Creates and returns a worker agent, adding it to the workers of its household."""
+        worker = Worker(manager, unique_id, **kwargs)
+        household = kwargs.get('household')
+        if household is not None:
+            household.workers.append(worker)
+            worker.register(household.unique_id, Relation.HouseholdMember)
+        return worker
 
 
-class DayScheduler(AgentScheduler):
-    def __init__(self, manager: AgentManager, order: list[int]):
-        super().__init__(manager, order)
+def _firm_day(firm, day: int) -> None:
+    firm.step()
 
-    def step(self) -> None:
-        pass
 
-    def _reorder(self) -> None:
-        pass
+def _firm_hire(firm, day: int) -> None:
+    firm.hire()
+
+
+def _worker_day(worker: Worker, day: int) -> None:
+    worker.step(week=(day + 1) % 7 == 0)
+
+
+class DayScheduler(PhaseScheduler):
+    """Daily labour market schedule: firms post vacancies at the start of each week, workers search and apply daily,
+    firms settle the week's applications in a hire phase on its last day, and households consume monthly.
+
+    Consumption is a batched phase: one ``HouseholdBudget`` is built over every household from the manager's wage
+    column, stepped, and written back.
+    """
+    def __init__(self, manager: AgentManager, order: list[int] = None):
+        super().__init__(manager, order)
+        self.add_phase('post_vacancies', 'Firm', _firm_day, Cadence.Weekly, order=0)
+        self.add_phase('search_and_apply', 'Worker', _worker_day, Cadence.Daily, order=1)
+        self.add_phase('hire', 'Firm', _firm_hire, Cadence.Weekly, order=2, offset=Cadence.Weekly - 1)
+        self.add_phase('consume', 'Household', self._consume, Cadence.Monthly, order=3, offset=Cadence.Monthly - 1,
+                       batch=True)
+
+    def _consume(self, households: list, day: int) -> None:
+        if not households:
+            return
+        wages = self._manager.service(WAGES)
+        if wages is None:
+            for household in households:
+                household.step()
+            return
+        budget = HouseholdBudget.from_households(households, wages.slots)
+        budget.step(wages.values)
+        budget.write_back(households)
 
 
 class MarketData:
-    pass
+    """Market history kept as per-step series, with wage quantiles by skill taken from sketches of each step."""
+    QUANTILES = (0.1, 0.5, 0.9)
+
+    _unemployment_rate: Series
+    _rolling_unemployment: Series
+    _rolling: RollingMean
+    _vacancies: Series
+    _training_share: Series
+    _reservation_wage: Series
+    _wage_quantiles: dict[Skill, list[Series]]
+
+    def __init__(self, window: int = 30):
+        self._unemployment_rate = Series()
+        self._rolling_unemployment = Series()
+        self._rolling = RollingMean(window)
+        self._vacancies = Series()
+        self._training_share = Series()
+        self._reservation_wage = Series()
+        self._wage_quantiles = {skill: [Series() for _ in self.QUANTILES] for skill in Skill}
+
+    def __len__(self):
+        return len(self._unemployment_rate)
+
+    @property
+    def unemployment_rate(self) -> np.ndarray:
+        return self._unemployment_rate.values
+
+    @property
+    def rolling_unemployment(self) -> np.ndarray:
+        return self._rolling_unemployment.values
+
+    @property
+    def vacancies(self) -> np.ndarray:
+        return self._vacancies.values
+
+    @property
+    def training_share(self) -> np.ndarray:
+        return self._training_share.values
+
+    @property
+    def reservation_wage(self) -> np.ndarray:
+        return self._reservation_wage.values
+
+    def wage_quantiles(self, skill: Skill) -> np.ndarray:
+        """Returns the wage quantiles of a skill group as a (quantile, step) array."""
+        return np.vstack([series.values for series in self._wage_quantiles[skill]])
+
+    def record(self, unemployment_rate: float, vacancies: int, training_share: float, reservation_wage: float,
+               wages: dict[Skill, HistogramSketch]) -> None:
+        """Append the statistics of one step."""
+        self._unemployment_rate.append(unemployment_rate)
+        self._rolling_unemployment.append(self._rolling.update(unemployment_rate))
+        self._vacancies.append(vacancies)
+        self._training_share.append(training_share)
+        self._reservation_wage.append(reservation_wage)
+        for skill, series in self._wage_quantiles.items():
+            sketch = wages.get(skill)
+            values = sketch.quantiles(self.QUANTILES) if sketch is not None else [np.nan] * len(self.QUANTILES)
+            for quantile, value in zip(series, values):
+                quantile.append(value)
 
 
 class MarketCollector(Collector):
-    pass
+    """Records market statistics from the running aggregates, without a pass over the population.
+
+    In debug mode the aggregates are cross-checked against a full recomputation at every collection.
+    """
+    _aggregates: MarketAggregates
+    _data: MarketData
+    _debug: bool
+
+    def __init__(self, aggregates: MarketAggregates, data: MarketData = None, debug: bool = False):
+        self._aggregates = aggregates
+        self._data = data if data is not None else MarketData()
+        self._debug = debug
+
+    @property
+    def data(self) -> MarketData:
+        return self._data
+
+    def collect(self, manager: AgentManager, job_boards: list[JobBoard]) -> None:
+        if self._debug:
+            self._aggregates.verify(manager.get_agents_by_name('Worker'), job_boards)
+
+        self._data.record(
+            unemployment_rate=self._aggregates.unemployment_rate,
+            vacancies=self._aggregates.vacancy_count,
+            training_share=self._aggregates.training_share,
+            reservation_wage=self._aggregates.mean_reservation_wage,
+            wages=self._aggregates.wage_sketches
+        )
 
 
 class LabourABM(Environment):
-    def __init__(self, configuration, iterations: int):
-        manager = AgentManager({}, configuration)
-        scheduler = AgentScheduler(manager, [])
+    _job_boards: list[JobBoard]
+    _vacancies: VacancyTable
+    _aggregates: MarketAggregates
+    _wages: WageColumn
+    _collector: MarketCollector
+
+    def __init__(self, configuration, iterations: int, debug: bool = False):
+        manager = AgentManager({'Household': HouseholdBuilder(), 'Worker': WorkerBuilder()}, None)
+        scheduler = DayScheduler(manager, [])
         super().__init__(manager, scheduler, iterations)
+        self._job_boards = []
+        self._vacancies = VacancyTable()
+        self._manager.attach(VACANCIES, self._vacancies)
+        self._aggregates = MarketAggregates()
+        self._manager.attach(AGGREGATES, self._aggregates)
+        self._wages = WageColumn()
+        self._manager.attach(WAGES, self._wages)
+        self._collector = MarketCollector(self._aggregates, debug=debug)
+        self.load(configuration)
+
+    @property
+    def job_boards(self) -> list[JobBoard]:
+        return self._job_boards
+
+    @property
+    def vacancies(self) -> VacancyTable:
+        return self._vacancies
+
+    @property
+    def aggregates(self) -> MarketAggregates:
+        return self._aggregates
+
+    @property
+    def wages(self) -> WageColumn:
+        return self._wages
+
+    def create_job_board(self, popularity: int = None, cell_size: float = None) -> JobBoard:
+        """Create a job board whose vacancies are counted in the market aggregates, spatially indexed on a grid of
+        the given cell size if one is given."""
+        board = JobBoard(self._vacancies, popularity, self._aggregates, cell_size)
+        self._job_boards.append(board)
+        return board
+
+    def log_events(self, path: str, chunk_size: int = 65536) -> EventLog:
+        """Record applications, hires, separations and training events to a binary event log."""
+        events = EventLog(path, chunk_size)
+        self._manager.attach(EVENTS, events)
+        return events
+
+    def run(self) -> None:
+        super().run()
+        events = self._manager.service(EVENTS)
+        if events is not None:
+            events.flush()
+
+    def step(self) -> None:
+        super().step()
+        self._collector.collect(self._manager, self._job_boards)
+        events = self._manager.service(EVENTS)
+        if events is not None:
+            events.advance()
 
     def load(self, configuration) -> None:
-        pass
+        self._aggregates.clear()
+        self._wages.clear()
+        for board in self._job_boards:
+            for specialisation in board.specialisations():
+                self._aggregates.post(specialisation)
+        self._manager.config = configuration
+        self._manager.reload()
 
     def reset(self) -> None:
         pass
 
-    def collect(self):
-        pass
+    def collect(self) -> MarketData:
+        return self._collector.data
 
     def render(self):
-        pass
+        return plot_history(self._collector.data)
+
+
+def plot_history(market_data: MarketData, max_points: int = 2000, method: str = 'lttb',
+                 skills: list[Skill] = None, **kwargs):
+    """Plot the market history, downsampling every series to at most max_points whatever the run length.
+
+    Series are reduced with Largest-Triangle-Three-Buckets ('lttb') or min/max buckets ('minmax'), and wage
+    quantile bands by their bucket-wise envelope. Extra keyword arguments are passed to ``plt.subplots``.
+    """
+    import matplotlib.pyplot as plt
+
+    downsample = {'lttb': lambda x, y: lttb(x, y, max_points), 'minmax': lambda x, y: minmax(y, max_points)}[method]
+    steps = np.arange(len(market_data), dtype=np.float64)
+    kwargs.setdefault('figsize', (10, 9))
+    figure, (unemployment, vacancies, wages) = plt.subplots(3, 1, sharex=True, **kwargs)
 
+    for axis, series, label in (
+            (unemployment, market_data.unemployment_rate, 'Unemployment rate'),
+            (unemployment, market_data.rolling_unemployment, 'Rolling mean'),
+            (unemployment, market_data.training_share, 'Share in training'),
+            (vacancies, market_data.vacancies, 'Vacancies'),
+    ):
+        keep = downsample(steps, series)
+        axis.plot(steps[keep], series[keep], label=label)
+    unemployment.legend()
+    vacancies.set_ylabel('Vacancies')
 
-def plot_history(market_data: MarketData, **kwargs):
-    pass
+    drawn = False
+    for skill in skills or list(Skill):
+        low, median, high = market_data.wage_quantiles(skill)
+        if np.isnan(median).all():
+            continue
+        keep = downsample(steps, np.nan_to_num(median))
+        line, = wages.plot(steps[keep], median[keep], label=skill.name)
+        starts, lower, upper = envelope(low, high, max_points)
+        wages.fill_between(steps[starts], lower, upper, color=line.get_color(), alpha=0.2)
+        drawn = True
+    wages.set_ylabel('Wage')
+    wages.set_xlabel('Day')
+    if drawn:
+        wages.legend(fontsize='small')
+    return figure
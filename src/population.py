@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from enum import Enum
+from itertools import zip_longest
+from typing import Iterator
+import csv
+import os
+
+import numpy as np
+
+from environment import AgentManager
+from skills import Skill, Specialisation
+from workers import AccessMethod
+
+
+DEFAULT_CHUNK_SIZE = 65536
+
+ENUM_COLUMNS = {
+    'skill': Skill,
+    'max_general_skill': Skill,
+    'specialisation': Specialisation,
+    'search_method': AccessMethod,
+    'application_method': AccessMethod,
+}
+
+
+def to_enum(column: np.ndarray, enum: type[Enum]) -> np.ndarray:
+    """Convert a column of enum values or member names to an object column of enum members."""
+    values, inverse = np.unique(column, return_inverse=True)
+    members = np.empty(len(values), dtype=object)
+    for index, value in enumerate(values.tolist()):
+        members[index] = enum[value] if isinstance(value, str) and value in enum.__members__ else enum(value)
+    return members[inverse]
+
+
+def _parse_column(values: list[str]) -> np.ndarray:
+    """Parse a column of CSV strings as integers, then floats, falling back to strings."""
+    for dtype in (np.int64, np.float64):
+        try:
+            return np.array(values, dtype=dtype)
+        except ValueError:
+            continue
+    return np.array(values, dtype=object)
+
+
+class ColumnSource(ABC):
+    @abstractmethod
+    def chunks(self, count: int, chunk_size: int) -> Iterator[dict[str, np.ndarray]]:
+        """Yield up to count rows of per-agent parameters as dictionaries of equal-length column chunks."""
+        pass
+
+
+class CsvColumns(ColumnSource):
+    """Streams parameter columns from a CSV file with a header row, reading one chunk of rows at a time."""
+    _path: str
+    _columns: list[str] | None
+
+    def __init__(self, path: str, columns: list[str] = None):
+        self._path = path
+        self._columns = columns
+
+    def chunks(self, count: int, chunk_size: int) -> Iterator[dict[str, np.ndarray]]:
+        with open(self._path, newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            wanted = [header.index(column) for column in self._columns] if self._columns else range(len(header))
+            remaining = count
+            while remaining > 0:
+                rows = [row for _, row in zip(range(min(chunk_size, remaining)), reader)]
+                if not rows:
+                    break
+                remaining -= len(rows)
+                yield {header[i]: _parse_column([row[i] for row in rows]) for i in wanted}
+
+
+class NpyColumns(ColumnSource):
+    """Streams parameter columns from ``.npy`` files, memory-mapped so only the current chunk is read.
+
+    Accepts a mapping of column name to ``.npy`` path, or a directory whose ``.npy`` files are the columns, named
+    by file stem. ``.npz`` archives cannot be memory-mapped and are rejected; save each column with ``np.save``.
+    """
+    _paths: dict[str, str]
+
+    def __init__(self, paths: dict[str, str] | str):
+        if isinstance(paths, str):
+            if not os.path.isdir(paths):
+                raise ValueError(f"'{paths}' is not a directory of .npy columns; .npz archives are not supported")
+            paths = {
+                name[:-len('.npy')]: os.path.join(paths, name)
+                for name in sorted(os.listdir(paths)) if name.endswith('.npy')
+            }
+        for name, path in paths.items():
+            if not path.endswith('.npy'):
+                raise ValueError(f"Column '{name}' must be a .npy file, got '{path}'")
+        self._paths = paths
+
+    def chunks(self, count: int, chunk_size: int) -> Iterator[dict[str, np.ndarray]]:
+        columns = {name: np.load(path, mmap_mode='r') for name, path in self._paths.items()}
+        total = min([count] + [len(column) for column in columns.values()])
+        for start in range(0, total, chunk_size):
+            stop = min(start + chunk_size, total)
+            yield {name: np.array(column[start:stop]) for name, column in columns.items()}
+
+
+class SampledColumns(ColumnSource):
+    """Samples parameter columns from declared distributions.
+
+    Each column is declared as ``{'Distribution': name, **parameters}``, where the name is any method of
+    ``numpy.random.Generator`` (e.g. ``'normal'``, ``'lognormal'``, ``'choice'``) and the parameters are its
+    keyword arguments.
+    """
+    _distributions: dict[str, dict]
+    _seed: int | None
+
+    def __init__(self, distributions: dict[str, dict], seed: int = None):
+        self._distributions = distributions
+        self._seed = seed
+
+    def chunks(self, count: int, chunk_size: int) -> Iterator[dict[str, np.ndarray]]:
+        rng = np.random.default_rng(self._seed)
+        samplers = {}
+        for name, declaration in self._distributions.items():
+            parameters = dict(declaration)
+            samplers[name] = (getattr(rng, parameters.pop('Distribution')), parameters)
+
+        for start in range(0, count, chunk_size):
+            size = min(chunk_size, count - start)
+            yield {name: sampler(size=size, **parameters) for name, (sampler, parameters) in samplers.items()}
+
+
+class Population:
+    """Per-agent parameter columns for an ``AgentManager`` configuration entry, used as its 'Columns' source.
+
+    Columns from all sources are streamed together in chunks, enum columns are converted to members, and
+    reference columns holding row indices into another configured agent type are resolved to those agents. Every
+    source must provide the requested number of rows; a source that runs out first raises ``ValueError``.
+    """
+    _sources: list[ColumnSource]
+    _chunk_size: int
+    _references: dict[str, str]
+    _enums: dict[str, type[Enum]]
+
+    def __init__(
+            self,
+            *sources: ColumnSource,
+            chunk_size: int = DEFAULT_CHUNK_SIZE,
+            references: dict[str, str] = None,
+            enums: dict[str, type[Enum]] = None
+    ):
+        self._sources = list(sources)
+        self._chunk_size = chunk_size
+        self._references = references or {}
+        self._enums = ENUM_COLUMNS if enums is None else enums
+
+    def chunks(self, count: int, manager: AgentManager) -> Iterator[dict[str, np.ndarray]]:
+        streams = [source.chunks(count, self._chunk_size) for source in self._sources]
+        rows = 0
+        for parts in zip_longest(*streams):
+            size = min(self._chunk_size, count - rows)
+            chunk = {}
+            for source, part in zip(self._sources, parts):
+                if part is None or any(len(column) != size for column in part.values()):
+                    raise ValueError(f"{type(source).__name__} source ran out before {count} rows")
+                chunk.update(part)
+            rows += size
+            yield self._convert(chunk, manager)
+        if self._sources and rows < count:
+            raise ValueError(f"Population sources ran out after {rows} of {count} rows")
+
+    def _convert(self, chunk: dict[str, np.ndarray], manager: AgentManager) -> dict[str, np.ndarray]:
+        """Convert enum and reference columns of a chunk in place."""
+        for name, column in chunk.items():
+            if name in self._references:
+                unique_ids = np.asarray(manager.loaded_ids(self._references[name]))
+                agents = np.empty(len(column), dtype=object)
+                agents[:] = [manager.get_agent_by_id(unique_id) for unique_id in unique_ids[column].tolist()]
+                chunk[name] = agents
+            elif name in self._enums:
+                chunk[name] = to_enum(column, self._enums[name])
+        return chunk
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from enum import IntFlag
+
+
+class Relation(IntFlag):
+    Generic = 1
+    Employer = 2
+    HouseholdMember = 4
+    Friend = 8
+
+
+ALL_RELATIONS = Relation.Generic | Relation.Employer | Relation.HouseholdMember | Relation.Friend
+
+
+class RelationshipStore:
+    """Sparse, typed adjacency between agents with a reverse index.
+
+    Each directed edge carries a bit set of relation types. The forward index maps an agent to the agents it has
+    registered and the reverse index maps an agent to the agents that registered it, so registering, deregistering
+    and removing every edge of an agent are all O(1) per edge.
+    """
+    _forward: dict[int, dict[int, int]]
+    _reverse: dict[int, dict[int, int]]
+
+    def __init__(self):
+        self._forward = {}
+        self._reverse = {}
+
+    def __len__(self):
+        return sum(len(related) for related in self._forward.values())
+
+    def clear(self) -> None:
+        self._forward.clear()
+        self._reverse.clear()
+
+    def register(self, agent_id: int, related_id: int, relation: Relation = Relation.Generic) -> None:
+        """Record that an agent is related to another agent."""
+        related = self._forward.setdefault(agent_id, {})
+        related[related_id] = related.get(related_id, 0) | relation
+        dependants = self._reverse.setdefault(related_id, {})
+        dependants[agent_id] = dependants.get(agent_id, 0) | relation
+
+    def deregister(self, agent_id: int, related_id: int, relation: Relation = ALL_RELATIONS) -> None:
+        """Remove relation types (all by default) between an agent and a related agent."""
+        related = self._forward.get(agent_id)
+        if not related or related_id not in related:
+            return
+        remaining = related[related_id] & ~relation
+        dependants = self._reverse[related_id]
+        if remaining:
+            related[related_id] = remaining
+            dependants[agent_id] = remaining
+        else:
+            del related[related_id]
+            del dependants[agent_id]
+            if not related:
+                del self._forward[agent_id]
+            if not dependants:
+                del self._reverse[related_id]
+
+    def has(self, agent_id: int, related_id: int, relation: Relation = ALL_RELATIONS) -> bool:
+        return bool(self._forward.get(agent_id, {}).get(related_id, 0) & relation)
+
+    def related(self, agent_id: int, relation: Relation = ALL_RELATIONS) -> list[int]:
+        """Retrieve the agents an agent has registered, optionally of a specific relation type."""
+        return [other for other, flags in self._forward.get(agent_id, {}).items() if flags & relation]
+
+    def dependants(self, agent_id: int, relation: Relation = ALL_RELATIONS) -> list[int]:
+        """Retrieve the agents that have registered an agent, optionally of a specific relation type."""
+        return [other for other, flags in self._reverse.get(agent_id, {}).items() if flags & relation]
+
+    def remove(self, agent_id: int) -> dict[int, Relation]:
+        """Remove every edge to and from an agent, returning the other agents and the relation types removed."""
+        touched = {}
+        for other, flags in self._forward.pop(agent_id, {}).items():
+            dependants = self._reverse.get(other)
+            if dependants is not None:
+                dependants.pop(agent_id, None)
+                if not dependants:
+                    del self._reverse[other]
+            touched[other] = flags
+        for other, flags in self._reverse.pop(agent_id, {}).items():
+            related = self._forward.get(other)
+            if related is not None:
+                related.pop(agent_id, None)
+                if not related:
+                    del self._forward[other]
+            touched[other] = touched.get(other, 0) | flags
+        return {other: Relation(flags) for other, flags in touched.items()}
+
+    def remove_many(self, agent_ids) -> dict[int, list[tuple[int, Relation]]]:
+        """Remove every edge of a batch of agents, returning for each surviving agent the removed relations."""
+        removed = set(agent_ids)
+        touched = {}
+        for agent_id in removed:
+            for other, relation in self.remove(agent_id).items():
+                if other not in removed:
+                    touched.setdefault(other, []).append((agent_id, relation))
+        return touched
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, is_dataclass
+from enum import Enum
+from typing import Callable
+import hashlib
+import json
+import os
+import pickle
+import random
+
+import numpy as np
+
+from environment import Environment
+
+
+INDEX_FILE = 'index.json'
+
+
+def normalise(value):
+    """A JSON-serialisable form of a configuration that is identical for equal configurations.
+
+    Mappings are keyed by strings and sorted when dumped, sets are sorted, tuples become lists, enums are named by
+    type and member and numpy values become Python ones. Objects without a stable form raise TypeError, since their
+    representation would not identify the run.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Enum):
+        return f'{type(value).__name__}.{value.name}'
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {json.dumps(normalise(key)) if not isinstance(key, str) else key: normalise(item)
+                for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalise(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((normalise(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+    if is_dataclass(value) and not isinstance(value, type):
+        return {'type': type(value).__name__, 'fields': normalise(asdict(value))}
+    raise TypeError(f"Cannot normalise a configuration value of type '{type(value).__name__}'")
+
+
+def code_version(directory: str = None) -> str:
+    """Digest of the model's Python sources, so cached runs are invalidated when the code changes."""
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.py'):
+            digest.update(name.encode())
+            with open(os.path.join(directory, name), 'rb') as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    """A cached run. ``family`` is shared by the runs of any length of one configuration and seed, and ``used``
+    orders entries from least to most recently used."""
+    key: str
+    family: str
+    iterations: int
+    size: int
+    digests: dict[str, str]
+    used: int
+
+
+class RunCache:
+    """Local, content-addressed cache of simulation runs.
+
+    A run is keyed by a digest of the normalised configuration, the seed, the number of iterations and the version
+    of the model code. Its ``collect()`` output is stored, and optionally a checkpoint of the model and random
+    states, so an identical request is answered from disk and a longer run of the same configuration and seed
+    resumes from the longest cached checkpoint instead of from day zero. Every file is verified against its digest
+    when read, and entries are evicted least recently used first to keep the cache within its size bound.
+
+    As in ``calibration``, the builder must return a loaded environment for a configuration and seed. It is called
+    after seeding ``random`` and ``numpy.random`` with the seed, and the run is advanced with ``step``.
+    """
+    _directory: str
+    _max_bytes: int
+    _checkpoints: bool
+    _code_version: str
+    _entries: dict[str, CacheEntry]
+    _clock: int
+    _statistics: dict[str, int]
+
+    def __init__(self, directory: str, max_bytes: int = 1 << 30, checkpoints: bool = True, version: str = None):
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._checkpoints = checkpoints
+        self._code_version = version if version is not None else code_version()
+        self._entries = {}
+        self._clock = 0
+        self._statistics = {'hits': 0, 'resumed': 0, 'misses': 0, 'corrupt': 0}
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    @property
+    def size(self) -> int:
+        """Bytes held by the cached runs."""
+        return sum(entry.size for entry in self._entries.values())
+
+    @property
+    def statistics(self) -> dict[str, int]:
+        """Counts of runs answered from the cache, resumed from a checkpoint, run from the start, and of
+        entries discarded because their files failed verification."""
+        return dict(self._statistics)
+
+    def family(self, configuration, seed: int) -> str:
+        return _digest(normalise(configuration), seed, self._code_version)
+
+    def key(self, configuration, seed: int, iterations: int) -> str:
+        return _digest(self.family(configuration, seed), iterations)
+
+    def get(self, configuration, seed: int, iterations: int):
+        """The cached output of a run, or None if it has not been cached (or failed verification)."""
+        key = self.key(configuration, seed, iterations)
+        if key not in self._entries:
+            return None
+        data = self._load(key, 'data')
+        if data is None:
+            return None
+        self._touch(key)
+        return data
+
+    def run(self, builder: Callable[[object, int], Environment], configuration, seed: int, iterations: int):
+        """The output of a run, from the cache, resumed from a shorter cached run, or simulated from the start."""
+        data = self.get(configuration, seed, iterations)
+        if data is not None:
+            self._statistics['hits'] += 1
+            return data
+
+        family = self.family(configuration, seed)
+        model, steps = self._resume(family, iterations)
+        if model is None:
+            self._statistics['misses'] += 1
+            random.seed(seed)
+            np.random.seed(seed)
+            model, steps = builder(configuration, seed), 0
+        else:
+            self._statistics['resumed'] += 1
+
+        for _ in range(iterations - steps):
+            model.step()
+        data = model.collect()
+
+        files = {'data': pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)}
+        if self._checkpoints:
+            files['checkpoint'] = pickle.dumps(
+                (model, random.getstate(), np.random.get_state()), protocol=pickle.HIGHEST_PROTOCOL
+            )
+        self._store(self.key(configuration, seed, iterations), family, iterations, files)
+        return data
+
+    def evict(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for name in entry.digests:
+            path = self._path(key, name)
+            if os.path.exists(path):
+                os.remove(path)
+        self._save_index()
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self.evict(key)
+
+    def _resume(self, family: str, iterations: int) -> tuple[Environment | None, int]:
+        """Restore the longest cached, shorter run of a configuration that has a valid checkpoint."""
+        shorter = sorted(
+            (entry for entry in self._entries.values()
+             if entry.family == family and entry.iterations < iterations and 'checkpoint' in entry.digests),
+            key=lambda entry: entry.iterations, reverse=True
+        )
+        for entry in shorter:
+            checkpoint = self._load(entry.key, 'checkpoint')
+            if checkpoint is None:
+                continue
+            model, random_state, numpy_state = checkpoint
+            random.setstate(random_state)
+            np.random.set_state(numpy_state)
+            self._touch(entry.key)
+            return model, entry.iterations
+        return None, 0
+
+    def _load_index(self) -> None:
+        """Read the entries of an existing cache, starting empty if the index is missing, truncated or corrupt."""
+        try:
+            with open(os.path.join(self._directory, INDEX_FILE)) as file:
+                entries = json.load(file)
+            self._entries = {key: CacheEntry(**entry) for key, entry in entries.items()}
+        except FileNotFoundError:
+            return
+        except (ValueError, TypeError, AttributeError):
+            self._statistics['corrupt'] += 1
+            self._entries = {}
+        self._clock = max((entry.used for entry in self._entries.values()), default=0)
+
+    def _load(self, key: str, name: str):
+        """Unpickle a stored file, evicting its entry if the file is missing or does not match its digest."""
+        path = self._path(key, name)
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+        except FileNotFoundError:
+            content = None
+        if content is None or hashlib.sha256(content).hexdigest() != self._entries[key].digests[name]:
+            self._statistics['corrupt'] += 1
+            self.evict(key)
+            return None
+        return pickle.loads(content)
+
+    def _store(self, key: str, family: str, iterations: int, files: dict[str, bytes]) -> None:
+        """Write a run's files and index it, evicting older entries as needed. Runs larger than the whole cache are
+        not stored."""
+        if sum(len(content) for content in files.values()) > self._max_bytes:
+            return
+        for name, content in files.items():
+            path = self._path(key, name)
+            with open(path + '.tmp', 'wb') as file:
+                file.write(content)
+            os.replace(path + '.tmp', path)
+
+        self._clock += 1
+        self._entries[key] = CacheEntry(
+            key, family, iterations, sum(len(content) for content in files.values()),
+            {name: hashlib.sha256(content).hexdigest() for name, content in files.items()}, self._clock
+        )
+        self._evict_to_bound(key)
+        self._save_index()
+
+    def _evict_to_bound(self, keep: str) -> None:
+        """Evict least recently used entries, other than the one just stored, until the cache is within bound."""
+        excess = self.size - self._max_bytes
+        for entry in sorted(self._entries.values(), key=lambda entry: entry.used):
+            if excess <= 0:
+                break
+            if entry.key == keep:
+                continue
+            excess -= entry.size
+            self.evict(entry.key)
+
+    def _touch(self, key: str) -> None:
+        self._clock += 1
+        self._entries[key].used = self._clock
+        self._save_index()
+
+    def _save_index(self) -> None:
+        path = os.path.join(self._directory, INDEX_FILE)
+        with open(path + '.tmp', 'w') as file:
+            json.dump({key: asdict(entry) for key, entry in self._entries.items()}, file)
+        os.replace(path + '.tmp', path)
+
+    def _path(self, key: str, name: str) -> str:
+        return os.path.join(self._directory, f'{key}.{name}')
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class Series:
+    """Growable float series with amortised O(1) appends and a zero-copy view of the values.
+
+    With a width, each value is a row of that many floats and the values form a (length, width) array.
+    """
+    _values: np.ndarray
+    _length: int
+
+    def __init__(self, capacity: int = 1024, width: int = None):
+        shape = (capacity,) if width is None else (capacity, width)
+        self._values = np.empty(shape, dtype=np.float64)
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self._length]
+
+    def append(self, value: float) -> None:
+        if self._length == len(self._values):
+            grown = np.empty((2 * len(self._values),) + self._values.shape[1:], dtype=np.float64)
+            grown[:self._length] = self._values
+            self._values = grown
+        self._values[self._length] = value
+        self._length += 1
+
+
+class RollingMean:
+    """Mean of the most recent values in a fixed window, updated in O(1)."""
+    _window: np.ndarray
+    _position: int
+    _count: int
+    _total: float
+
+    def __init__(self, window: int):
+        self._window = np.zeros(window, dtype=np.float64)
+        self._position = 0
+        self._count = 0
+        self._total = 0.0
+
+    @property
+    def value(self) -> float:
+        return float(self._total / self._count) if self._count else float('nan')
+
+    def update(self, value: float) -> float:
+        """Add a value to the window, dropping the oldest once full, and return the new mean."""
+        if self._count == len(self._window):
+            self._total -= self._window[self._position]
+        else:
+            self._count += 1
+        self._window[self._position] = value
+        self._total += value
+        self._position = (self._position + 1) % len(self._window)
+        return self.value
+
+
+class HistogramSketch:
+    """Fixed-bin histogram used as a mergeable quantile sketch.
+
+    Bins are log-spaced between the lower and upper bound, with values outside the bounds counted in the first
+    and last bins. Counts may be removed as well as added, so the sketch can follow a changing population.
+    """
+    _edges: np.ndarray
+    _counts: np.ndarray
+
+    def __init__(self, lower: float = 1.0, upper: float = 1e6, bins: int = 256):
+        self._edges = np.geomspace(lower, upper, bins + 1)
+        self._counts = np.zeros(bins, dtype=np.int64)
+
+    @property
+    def count(self) -> int:
+        return int(self._counts.sum())
+
+    @property
+    def counts(self) -> np.ndarray:
+        return self._counts
+
+    @property
+    def edges(self) -> np.ndarray:
+        return self._edges
+
+    def bin(self, values) -> np.ndarray:
+        """Returns the bin index of each value."""
+        return np.clip(np.searchsorted(self._edges, values, side='right') - 1, 0, len(self._counts) - 1)
+
+    def add(self, values, weight: int = 1) -> None:
+        """Add (or with a negative weight, remove) values from the sketch."""
+        if np.isscalar(values):
+            self._counts[self.bin(values)] += weight
+            return
+        bins = self.bin(np.asarray(values))
+        self._counts += weight * np.bincount(bins, minlength=len(self._counts))
+
+    def merge(self, other: HistogramSketch) -> None:
+        """Add the counts of a sketch with the same bins to this one."""
+        if not np.array_equal(self._edges, other._edges):
+            raise ValueError("Sketches must share the same bins to be merged")
+        self._counts += other._counts
+
+    def clear(self) -> None:
+        self._counts[:] = 0
+
+    def quantiles(self, qs) -> np.ndarray:
+        """Estimate quantiles by interpolating within bins, in log space."""
+        qs = np.atleast_1d(np.asarray(qs, dtype=np.float64))
+        total = self._counts.sum()
+        if total == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.concatenate(([0], np.cumsum(self._counts)))
+        targets = qs * total
+        bins = np.clip(np.searchsorted(cumulative, targets, side='left') - 1, 0, len(self._counts) - 1)
+        within = np.divide(
+            targets - cumulative[bins], self._counts[bins],
+            out=np.zeros(len(qs)), where=self._counts[bins] > 0
+        )
+        log_edges = np.log(self._edges)
+        return np.exp(log_edges[bins] + np.clip(within, 0.0, 1.0) * (log_edges[bins + 1] - log_edges[bins]))
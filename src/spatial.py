@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+
+
+Location = tuple[float, float]
+
+
+def distances(xs: np.ndarray, ys: np.ndarray, location: Location) -> np.ndarray:
+    """Euclidean distances from a location to each point, in the units of the (projected) coordinates."""
+    return np.hypot(xs - location[0], ys - location[1])
+
+
+class GridIndex:
+    """Uniform grid over keyed points in the plane, for radius queries in time proportional to the points nearby.
+
+    Every point within a radius of any location in a cell lies in the block of cells reaching ``radius`` beyond
+    it, so the candidates of that block are gathered once per (cell, radius) and cached until the index changes.
+    Each query then only filters the cached candidates by exact distance, and queries from the same cell share
+    one gather.
+    """
+    _cell_size: float
+    _cells: dict[tuple[int, int], dict[int, None]]
+    _points: dict[int, Location]
+    _cache: dict[tuple[tuple[int, int], float], tuple[np.ndarray, np.ndarray, np.ndarray]]
+
+    def __init__(self, cell_size: float):
+        if cell_size <= 0:
+            raise ValueError("The cell size must be positive")
+        self._cell_size = cell_size
+        self._cells = {}
+        self._points = {}
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._points
+
+    @property
+    def cell_size(self) -> float:
+        return self._cell_size
+
+    def cell(self, location: Location) -> tuple[int, int]:
+        return math.floor(location[0] / self._cell_size), math.floor(location[1] / self._cell_size)
+
+    def insert(self, key: int, location: Location) -> None:
+        """Add a point, moving it if the key is already indexed."""
+        if key in self._points:
+            self.remove(key)
+        self._points[key] = location
+        self._cells.setdefault(self.cell(location), {})[key] = None
+        self._cache.clear()
+
+    def remove(self, key: int) -> None:
+        location = self._points.pop(key, None)
+        if location is None:
+            return
+        cell = self.cell(location)
+        keys = self._cells[cell]
+        del keys[key]
+        if not keys:
+            del self._cells[cell]
+        self._cache.clear()
+
+    def candidates(self, cell: tuple[int, int], radius: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Keys and coordinates of every point that may lie within the radius of a location in the cell."""
+        cached = self._cache.get((cell, radius))
+        if cached is not None:
+            return cached
+
+        reach = math.ceil(radius / self._cell_size)
+        keys = []
+        for i in range(cell[0] - reach, cell[0] + reach + 1):
+            for j in range(cell[1] - reach, cell[1] + reach + 1):
+                block = self._cells.get((i, j))
+                if block:
+                    keys.extend(block)
+        points = self._points
+        cached = (
+            np.array(keys, dtype=np.int64),
+            np.fromiter((points[key][0] for key in keys), dtype=np.float64, count=len(keys)),
+            np.fromiter((points[key][1] for key in keys), dtype=np.float64, count=len(keys))
+        )
+        self._cache[(cell, radius)] = cached
+        return cached
+
+    def query(self, location: Location, radius: float) -> np.ndarray:
+        """Keys of the points within the radius of a location."""
+        keys, xs, ys = self.candidates(self.cell(location), radius)
+        return keys[distances(xs, ys, location) <= radius]
@@ -0,0 +1,516 @@
+from __future__ import annotations
+
+from dataclasses import fields, replace
+from typing import Callable, Iterable, Iterator
+import json
+import mmap
+import os
+
+import numpy as np
+
+from ensemble import (
+    DEFAULT_BLOCKS, DRAWS, EMPTY, EnsembleData, Market, Openings, WorkerParameters, WorkerState, block_bounds,
+    contacts_of, hire, saved_capacity, worker_day
+)
+from kernels import SPECIALISATIONS
+
+
+SCHEMA_FILE = 'schema.json'
+
+# Transient bytes per row and saved job slot of a block sweep: slot tables, float priorities, sort indices and the
+# referrals of a few friends.
+WORKING_BYTES_PER_SLOT = 256
+
+STATE_COLUMNS = tuple(field.name for field in fields(WorkerState) if field.name != 'saved')
+PARAMETER_COLUMNS = tuple(field.name for field in fields(WorkerParameters))
+
+# Social network arrays of the market, saved next to the store and mapped when it is opened.
+NETWORK_COLUMNS = ('befriended', 'contacts', 'contact_indptr')
+
+
+def worker_schema(boards: int = 1) -> dict[str, tuple[str, int | None]]:
+    """Column dtypes (and widths, for multi-valued columns) of out-of-core worker state and parameters, for a
+    market with a number of job boards."""
+    specialisations = len(SPECIALISATIONS)
+    return {
+        'household': ('i8', None),
+        'employed': ('?', None),
+        'wage': ('f8', None),
+        'reservation_wage': ('f8', None),
+        'skill': ('i1', None),
+        'training': ('?', None),
+        'time_training': ('i4', None),
+        'time_unemployed': ('i4', None),
+        'training_code': ('i2', None),
+        'specialisations': ('?', specialisations),
+        'search_history': ('i4', specialisations),
+        'alpha': ('f8', None),
+        'search_rate': ('f8', None),
+        'pi': ('f8', None),
+        'search_max': ('i4', None),
+        'application_rate': ('f8', None),
+        'application_max': ('i4', None),
+        'training_rate': ('f8', None),
+        'max_general_skill': ('i1', None),
+        'unemployment_limit': ('i4', None),
+        'ordered': ('?', None),
+        'job_boards': ('?', boards),
+    }
+
+
+def _map(path: str, dtype, shape: tuple, mode: str) -> tuple[np.ndarray, mmap.mmap | None]:
+    """An array over a mapped file, read-only or writable ('r' or 'r+'), and the map itself.
+
+    The OS is asked to read ahead through the file, where the platform supports it. An empty shape cannot be
+    mapped and gives a zeroed array without a map.
+    """
+    size = int(np.prod(shape))
+    if not size:
+        return np.zeros(shape, dtype=dtype), None
+    with open(path, 'r+b' if mode == 'r+' else 'rb') as file:
+        handle = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if mode == 'r+' else mmap.ACCESS_READ)
+    if hasattr(mmap, 'MADV_SEQUENTIAL'):
+        handle.madvise(mmap.MADV_SEQUENTIAL)
+    return np.frombuffer(handle, dtype=dtype, count=size).reshape(shape), handle
+
+
+def _gather(offsets: np.ndarray, values: np.ndarray, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Lengths and concatenated values of arbitrary rows of lists stored contiguously by row offsets."""
+    starts = np.asarray(offsets[rows])
+    lengths = np.asarray(offsets[rows + 1]) - starts
+    ends = np.cumsum(lengths)
+    if not len(ends) or not ends[-1]:
+        return lengths, np.zeros(0, dtype=np.int64)
+    positions = np.arange(ends[-1]) - np.repeat(ends - lengths - starts, lengths)
+    return lengths, np.asarray(values[positions])
+
+
+class ColumnStore:
+    """Fixed-width agent columns held in memory-mapped files, one file per column and one row per agent.
+
+    Only the pages touched are read and dirty pages are written back by the OS, so resident memory is bounded by
+    the page cache, not the population. Sweeping rows in id order reads each file sequentially.
+    """
+    _directory: str
+    _rows: int
+    _schema: dict[str, tuple[str, int | None]]
+    _columns: dict[str, np.ndarray]
+    _maps: list[mmap.mmap]
+
+    def __init__(self, directory: str, mode: str = 'r+'):
+        with open(os.path.join(directory, SCHEMA_FILE)) as file:
+            description = json.load(file)
+        self._directory = directory
+        self._rows = description['rows']
+        self._schema = {name: (dtype, width) for name, (dtype, width) in description['columns'].items()}
+        self._columns, self._maps = {}, []
+        for name, (dtype, width) in self._schema.items():
+            self._columns[name], handle = _map(self._path(name), dtype, self._shape(width), mode)
+            if handle is not None and mode == 'r+':
+                self._maps.append(handle)
+
+    @classmethod
+    def create(cls, directory: str, rows: int, schema: dict[str, tuple[str, int | None]]) -> ColumnStore:
+        """Create a store of zeroed columns. Files are created sparse, so no disk is used until rows are written."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, SCHEMA_FILE), 'w') as file:
+            json.dump({'rows': rows, 'columns': schema}, file)
+        for name, (dtype, width) in schema.items():
+            size = rows * np.dtype(dtype).itemsize * (width or 1)
+            with open(os.path.join(directory, name + '.col'), 'wb') as file:
+                file.truncate(size)
+        return cls(directory)
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._schema)
+
+    @property
+    def row_bytes(self) -> int:
+        return sum(np.dtype(dtype).itemsize * (width or 1) for dtype, width in self._schema.values())
+
+    def write(self, start: int, columns: dict[str, np.ndarray]) -> None:
+        """Write equal-length column chunks from a starting row."""
+        for name, values in columns.items():
+            self._columns[name][start:start + len(values)] = values
+
+    def write_chunks(self, chunks: Iterator[dict[str, np.ndarray]], start: int = 0) -> int:
+        """Stream chunks of columns, such as those of a ``population.ColumnSource``, into consecutive rows.
+
+        Returns the row after the last one written.
+        """
+        for chunk in chunks:
+            self.write(start, chunk)
+            start += len(next(iter(chunk.values())))
+        return start
+
+    def flush(self) -> None:
+        for handle in self._maps:
+            handle.flush()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self._directory, name + '.col')
+
+    def _shape(self, width: int | None) -> tuple:
+        return (self._rows,) if width is None else (self._rows, width)
+
+
+class PagedArena:
+    """Variable-length integer lists, one per row, held out of core and rewritten in row order on every sweep.
+
+    A generation stores the lists of all rows contiguously in row order, with row offsets in a mapped file, so
+    reading rows in id order is a sequential scan. A sweep appends the next generation through a buffer of one
+    page and the generations are swapped when it ends. The previous generation stays readable until then, and so
+    do the rows the sweep has already written.
+    """
+    _directory: str
+    _name: str
+    _rows: int
+    _generation: int
+    _offsets: np.ndarray
+    _values: np.ndarray
+    _page: np.ndarray
+    _filled: int
+    _written: int
+    _position: int
+    _next_offsets: np.ndarray | None
+    _file: object | None
+
+    def __init__(self, directory: str, name: str, rows: int, page_size: int = 1 << 16):
+        self._directory = directory
+        self._name = name
+        self._rows = rows
+        self._page = np.empty(page_size, dtype=np.int64)
+        self._next_offsets = None
+        self._file = None
+
+        state = self._path('json')
+        if not os.path.exists(state):
+            self._write_generation(0)
+            np.zeros(rows + 1, dtype=np.int64).tofile(self._path('0.offsets'))
+            open(self._path('0.values'), 'wb').close()
+        with open(state) as file:
+            self._generation = json.load(file)['generation']
+        self._open()
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def size(self) -> int:
+        """Total number of values stored in the current generation."""
+        return int(self._offsets[-1])
+
+    def read(self, start: int, stop: int) -> tuple[np.ndarray, np.ndarray]:
+        """Lengths and concatenated values of a range of rows."""
+        offsets = np.asarray(self._offsets[start:stop + 1])
+        return np.diff(offsets), np.asarray(self._values[offsets[0]:offsets[-1]])
+
+    def gather(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Lengths and concatenated values of arbitrary rows."""
+        return _gather(self._offsets, self._values, rows)
+
+    def gather_written(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Lengths and concatenated values of arbitrary rows already written by the sweep in progress."""
+        if self._file is None:
+            raise RuntimeError("No sweep of the arena is in progress")
+        if len(rows) and int(rows.max()) >= self._position:
+            raise ValueError(f"Only the first {self._position} rows have been written by the sweep")
+        self._flush_page()
+        self._file.flush()
+        values, _ = _map(self._path(f'{1 - self._generation}.values'), np.int64, (self._written,), 'r')
+        return _gather(self._next_offsets, values, rows)
+
+    def begin(self) -> None:
+        """Start writing the next generation."""
+        if self._file is not None:
+            raise RuntimeError("A sweep of the arena is already in progress")
+        following = 1 - self._generation
+        self._next_offsets = np.memmap(
+            self._path(f'{following}.offsets'), dtype=np.int64, mode='w+', shape=(self._rows + 1,)
+        )
+        self._next_offsets[0] = 0
+        self._file = open(self._path(f'{following}.values'), 'wb')
+        self._filled = 0
+        self._written = 0
+        self._position = 0
+
+    def append(self, lengths: np.ndarray, values: np.ndarray) -> None:
+        """Write the lists of the next rows of the sweep."""
+        count = len(lengths)
+        self._next_offsets[self._position + 1:self._position + count + 1] = self._written + np.cumsum(lengths)
+        self._position += count
+        self._written += len(values)
+
+        while len(values):
+            taken = min(len(values), len(self._page) - self._filled)
+            self._page[self._filled:self._filled + taken] = values[:taken]
+            self._filled += taken
+            values = values[taken:]
+            if self._filled == len(self._page):
+                self._flush_page()
+
+    def commit(self) -> None:
+        """Finish the sweep and make the new generation current."""
+        if self._position != self._rows:
+            raise RuntimeError(f"The sweep wrote {self._position} of {self._rows} rows")
+        self._flush_page()
+        self._file.close()
+        self._file = None
+        self._next_offsets.flush()
+        self._next_offsets = None
+
+        following = 1 - self._generation
+        self._write_generation(following)
+        self._generation = following
+        self._open()
+
+    def _flush_page(self) -> None:
+        self._page[:self._filled].tofile(self._file)
+        self._filled = 0
+
+    def _open(self) -> None:
+        self._offsets = np.memmap(
+            self._path(f'{self._generation}.offsets'), dtype=np.int64, mode='r', shape=(self._rows + 1,)
+        )
+        self._values, _ = _map(self._path(f'{self._generation}.values'), np.int64, (int(self._offsets[-1]),), 'r')
+
+    def _write_generation(self, generation: int) -> None:
+        with open(self._path('json'), 'w') as file:
+            json.dump({'generation': generation}, file)
+
+    def _path(self, suffix: str) -> str:
+        return os.path.join(self._directory, f'{self._name}.{suffix}')
+
+
+class OutOfCoreMarket:
+    """Runs the daily worker rules over a population held out of core, one id-ordered block at a time.
+
+    Fixed-width worker state and parameters live in a ``ColumnStore`` and saved jobs, as lists of vacancy
+    columns, in a ``PagedArena``. Each day is a single sweep: a block of rows is mapped, its saved jobs expanded
+    to at least ``capacity`` slots per row, the ``ensemble`` kernels run over it, and its lists appended to the
+    arena's next generation. Blocks are those of an ``Ensemble`` with as many blocks, split further to fit the
+    memory budget, so memory use depends on the budget and the capacity, not on the population. The household
+    column and the contacts of the social network are mapped from the store's directory in place of the market's.
+
+    As in the model, network search sees contacts in earlier blocks as they ended the day so far, and the others
+    as they started it. With ``fill``, a hired vacancy closes, at the cost of a flag per vacancy in memory.
+    """
+    _store: ColumnStore
+    _jobs: PagedArena
+    _market: Market
+    _capacity: int
+    _memory_budget: int
+    _generator: np.random.Generator
+    _hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] | None
+    _fill: bool
+    _blocks: int
+    _openings: Openings | None
+    _day: int
+    _data: EnsembleData
+
+    def __init__(self, directory: str, market: Market, memory_budget: int = 1 << 30, seed: int = None,
+                 hiring: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray] = None, capacity: int = None,
+                 fill: bool = False, blocks: int = DEFAULT_BLOCKS):
+        self._store = ColumnStore(directory)
+        self._jobs = PagedArena(directory, 'jobs', len(self._store))
+        self._market = replace(market, household=self._store['household'], **{
+            name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r') for name in NETWORK_COLUMNS
+        })
+        self._capacity = capacity or saved_capacity(np.asarray(self._store['search_max']))
+        self._memory_budget = memory_budget
+        self._generator = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+        self._hiring = hiring
+        self._fill = fill
+        self._blocks = blocks
+        self._openings = Openings(1, market.vacancy_count) if fill else None
+        self._day = 0
+        self._data = EnsembleData(1)
+
+    @classmethod
+    def create(cls, directory: str, rows: int, market: Market, chunks: Iterable[dict[str, np.ndarray]],
+               **kwargs) -> OutOfCoreMarket:
+        """Stream a population into a new store, chunk by chunk, and open it.
+
+        Chunks hold consecutive rows of the ``worker_schema`` columns, such as those of a ``population.ColumnSource``,
+        and optionally their saved jobs as a 'saved' table of slots; columns left out stay zero. The market's
+        contacts are written next to the store, and may themselves be memory-mapped.
+        """
+        store = ColumnStore.create(directory, rows, worker_schema(market.board_count))
+        jobs = PagedArena(directory, 'jobs', rows)
+        jobs.begin()
+        start = 0
+        for chunk in chunks:
+            chunk = dict(chunk)
+            saved = chunk.pop('saved', None)
+            count = len(saved) if saved is not None else len(next(iter(chunk.values())))
+            store.write(start, chunk)
+            if saved is None:
+                jobs.append(np.zeros(count, dtype=np.int64), np.zeros(0, dtype=np.int64))
+            else:
+                jobs.append(*_to_lists(saved))
+            start += count
+        jobs.commit()
+        store.flush()
+        for name in NETWORK_COLUMNS:
+            np.save(os.path.join(directory, name + '.npy'), getattr(market, name))
+        return cls(directory, market, **kwargs)
+
+    @classmethod
+    def from_state(cls, directory: str, parameters: WorkerParameters, market: Market, state: WorkerState,
+                   chunk_rows: int = 1 << 16, **kwargs) -> OutOfCoreMarket:
+        """Write an in-memory population, such as one from ``ensemble.extract``, to a new store and open it."""
+        kwargs.setdefault('capacity', state.capacity)
+        return cls.create(directory, len(state), market, _state_chunks(parameters, market, state, chunk_rows), **kwargs)
+
+    @property
+    def store(self) -> ColumnStore:
+        return self._store
+
+    @property
+    def jobs(self) -> PagedArena:
+        return self._jobs
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def day(self) -> int:
+        return self._day
+
+    @property
+    def data(self) -> EnsembleData:
+        return self._data
+
+    @property
+    def block_rows(self) -> int:
+        """Rows per block that keep the mapped columns and the working arrays of a block within the budget."""
+        row_bytes = self._store.row_bytes + WORKING_BYTES_PER_SLOT * self._capacity
+        return max(1, self._memory_budget // row_bytes)
+
+    def run(self, steps: int) -> EnsembleData:
+        for _ in range(steps):
+            self.step()
+        return self._data
+
+    def step(self) -> None:
+        """Advance the population by one day in a single sweep over the blocks and record its statistics."""
+        store, market = self._store, self._market
+        week = (self._day + 1) % 7 == 0
+        totals = np.zeros(4, dtype=np.float64)
+
+        self._jobs.begin()
+        for start, stop in self._bounds():
+            state = self.block(start, stop)
+            parameters = WorkerParameters(*(store[name][start:stop] for name in PARAMETER_COLUMNS))
+            household = store['household'][start:stop]
+            replicate = np.zeros(stop - start, dtype=np.int64)
+
+            applicants, vacancies = worker_day(
+                state, parameters, np.arange(stop - start), household, market,
+                self._generator.random((stop - start, DRAWS)), week, self._uniforms,
+                lambda rows: self._referrals(household[rows], start), openings=self._openings, replicate=replicate
+            )
+            if self._hiring is not None and len(applicants):
+                accepted = self._hiring(applicants + start, vacancies, self._generator.random(len(applicants)))
+                hired, filled = hire(
+                    state, market, applicants, vacancies, accepted, replicate[applicants] if self._fill else None
+                )
+                if self._fill and len(hired):
+                    self._openings.withdraw(replicate[hired], filled)
+
+            self._jobs.append(*_to_lists(state.saved))
+            totals += (state.employed.sum(), state.training.sum(), state.reservation_wage.sum(), len(applicants))
+        self._jobs.commit()
+
+        self._day += 1
+        rows = max(len(store), 1)
+        self._data.record(
+            unemployment_rate=np.array([1.0 - totals[0] / rows]),
+            training_share=np.array([totals[1] / rows]),
+            reservation_wage=np.array([totals[2] / rows]),
+            applications=np.array([totals[3]])
+        )
+
+    def flush(self) -> None:
+        self._store.flush()
+
+    def block(self, start: int, stop: int) -> WorkerState:
+        """Views of a block of the mapped columns, with its saved jobs expanded to at least ``capacity`` slots per
+        row. Jobs whose vacancies have closed are left out."""
+        lengths, values = self._jobs.read(start, stop)
+        if self._openings is not None:
+            lengths, values = self._open_jobs(lengths, values)
+        return WorkerState(
+            *(self._store[name][start:stop] for name in STATE_COLUMNS), saved=_to_slots(lengths, values, self._capacity)
+        )
+
+    def _bounds(self) -> Iterator[tuple[int, int]]:
+        for start, stop in block_bounds(len(self._store), self._blocks):
+            for first in range(start, stop, self.block_rows):
+                yield first, min(first + self.block_rows, stop)
+
+    def _uniforms(self, rows: np.ndarray) -> np.ndarray:
+        return self._generator.random(len(rows))
+
+    def _referrals(self, households: np.ndarray, start: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """The open jobs saved by the workers of each household's friends, as (index in households, contact
+        number, vacancy) arrays in contact order: as written today for contacts before the block's start row,
+        and as the day started for the others."""
+        contacts, counts = contacts_of(self._market, households)
+        written = contacts < start
+        lengths = np.zeros(len(contacts), dtype=np.int64)
+        lengths[written], earlier = self._jobs.gather_written(contacts[written])
+        lengths[~written], later = self._jobs.gather(contacts[~written])
+        values = np.empty(lengths.sum(), dtype=np.int64)
+        held = np.repeat(written, lengths)
+        values[held], values[~held] = earlier, later
+        group = np.repeat(np.arange(len(contacts)), lengths)
+        if self._openings is not None:
+            kept = self._openings.is_open(0, values)
+            group, values = group[kept], values[kept]
+        return np.repeat(np.arange(len(households)), counts)[group], group, values
+
+    def _open_jobs(self, lengths: np.ndarray, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Row lengths and concatenated vacancies of lists with the closed vacancies removed."""
+        kept = self._openings.is_open(0, values)
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+        return np.bincount(rows[kept], minlength=len(lengths)), values[kept]
+
+
+def _state_chunks(parameters: WorkerParameters, market: Market, state: WorkerState,
+                  size: int) -> Iterator[dict[str, np.ndarray]]:
+    """Consecutive chunks of the columns of an in-memory population."""
+    for start in range(0, len(state), size):
+        chunk = {name: getattr(state, name)[start:start + size] for name in STATE_COLUMNS + ('saved',)}
+        chunk.update({name: getattr(parameters, name)[start:start + size] for name in PARAMETER_COLUMNS})
+        chunk['household'] = market.household[start:start + size]
+        yield chunk
+
+
+def _to_lists(saved: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Row lengths and concatenated vacancies of a table of saved job slots, in row order."""
+    held = saved != EMPTY
+    return held.sum(axis=1), saved[held].astype(np.int64)
+
+
+def _to_slots(lengths: np.ndarray, values: np.ndarray, capacity: int) -> np.ndarray:
+    """A table of saved job slots from row lengths and concatenated vacancies, at least capacity slots wide."""
+    slots = np.full((len(lengths), max(capacity, int(lengths.max(initial=0)))), EMPTY, dtype=np.int64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    slots[rows, np.arange(len(values)) - np.repeat(np.cumsum(lengths) - lengths, lengths)] = values
+    return slots
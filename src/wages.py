@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+SERVICE_KEY = 'wages'
+
+
+class WageColumn:
+    """The wage of every worker in one float column, zero while unemployed.
+
+    Workers claim a slot when created and keep their entry up to date at every hire and separation, so household
+    incomes and other wage totals are read a whole column at a time. Slots of destroyed workers are reused.
+    """
+    _values: np.ndarray
+    _slots: dict[int, int]
+    _free: list[int]
+    _size: int
+
+    def __init__(self, capacity: int = 1024):
+        self._values = np.zeros(max(capacity, 1), dtype=np.float64)
+        self._slots = {}
+        self._free = []
+        self._size = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, worker_id: int) -> bool:
+        return worker_id in self._slots
+
+    def clear(self) -> None:
+        self.__init__(len(self._values))
+
+    @property
+    def values(self) -> np.ndarray:
+        """The wage column, indexed by slot. Unused slots hold zero."""
+        return self._values
+
+    @property
+    def slots(self) -> dict[int, int]:
+        """The slot of each worker id."""
+        return self._slots
+
+    def add(self, worker_id: int, wage: float = 0.0) -> None:
+        if worker_id in self._slots:
+            raise KeyError(f"Worker '{worker_id}' already has a wage slot")
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = self._size
+            if slot == len(self._values):
+                self._values = np.concatenate((self._values, np.zeros(len(self._values))))
+            self._size += 1
+        self._slots[worker_id] = slot
+        self._values[slot] = wage
+
+    def remove(self, worker_id: int) -> None:
+        slot = self._slots.pop(worker_id, None)
+        if slot is not None:
+            self._values[slot] = 0.0
+            self._free.append(slot)
+
+    def set(self, worker_id: int, wage: float) -> None:
+        self._values[self._slots[worker_id]] = wage
+
+    def of(self, worker_ids) -> np.ndarray:
+        """The wages of a sequence of workers."""
+        slots = self._slots
+        return self._values[np.fromiter((slots[worker_id] for worker_id in worker_ids), dtype=np.int64)]
@@ -3,13 +3,22 @@ from __future__ import annotations
 from abc import ABC
 from dataclasses import dataclass
 from enum import Enum
+import itertools
 import random
 
+import numpy as np
+
+import kernels
+from aggregates import SERVICE_KEY as AGGREGATES
 from agent import Agent
+from eventlog import SERVICE_KEY as EVENTS, EventType
 from environment import AgentManager
 from households import Household
-from jobs import JobReference, JobDetails, JobBoard
+from relations import Relation
+from jobs import SERVICE_KEY as VACANCIES, JobBoard, VacancyTable
 from skills import Skill, Specialisation, SPECIALISATION_TO_SKILL
+from spatial import Location
+from wages import SERVICE_KEY as WAGES
 
 
 @dataclass(slots=True, frozen=True)
@@ -44,10 +53,46 @@ class BaseWorker(Agent, ABC):
         self._household = household
         self._reservation_wage = reservation_wage
 
+    @property
+    def household(self) -> Household:
+        return self._household
+
     @property
     def employed(self):
         return self._employed
 
+    @property
+    def wage(self):
+        return self._wage
+
+    @property
+    def reservation_wage(self):
+        return self._reservation_wage
+
+    @property
+    def skill(self) -> Skill | None:
+        return None
+
+    @property
+    def is_training(self) -> bool:
+        return False
+
+    def on_create(self) -> None:
+        aggregates = self._manager.service(AGGREGATES)
+        if aggregates is not None:
+            aggregates.add_worker(self.skill, self._employed, self._wage, self._reservation_wage, self.is_training)
+        wages = self._manager.service(WAGES)
+        if wages is not None:
+            wages.add(self._unique_id, self._wage if self._employed else 0.0)
+
+    def on_kill(self) -> None:
+        aggregates = self._manager.service(AGGREGATES)
+        if aggregates is not None:
+            aggregates.remove_worker(self.skill, self._employed, self._wage, self._reservation_wage, self.is_training)
+        wages = self._manager.service(WAGES)
+        if wages is not None:
+            wages.remove(self._unique_id)
+
     def employ(self, firm_id: int, job_id: int, wage: float) -> None:
         """Employs the worker in the firm if they are currently unemployed."""
         if not self._employed:
@@ -55,18 +100,51 @@ class BaseWorker(Agent, ABC):
             self._firm_id = firm_id
             self._job_id = job_id
             self._wage = wage
+            self.register(firm_id, Relation.Employer)
+
+            aggregates = self._manager.service(AGGREGATES)
+            if aggregates is not None:
+                aggregates.employ(self.skill, wage)
+            wages = self._manager.service(WAGES)
+            if wages is not None:
+                wages.set(self._unique_id, wage)
+            events = self._manager.service(EVENTS)
+            if events is not None:
+                events.log(EventType.Hire, self._unique_id, firm_id, job_id, wage)
 
     def unemploy(self) -> None:
         """Unemploys the worker, setting their reservation wage to the last earned wage."""
         if self._employed:
             self._employed = False
-            self._reservation_wage = self._wage
+            self.deregister(self._firm_id, Relation.Employer)
+
+            aggregates = self._manager.service(AGGREGATES)
+            if aggregates is not None:
+                aggregates.unemploy(self.skill, self._wage)
+            wages = self._manager.service(WAGES)
+            if wages is not None:
+                wages.set(self._unique_id, 0.0)
+            events = self._manager.service(EVENTS)
+            if events is not None:
+                events.log(EventType.Separation, self._unique_id, self._firm_id, self._job_id, self._wage)
+            self._set_reservation_wage(self._wage)
+
+    def _set_reservation_wage(self, reservation_wage: float) -> None:
+        aggregates = self._manager.service(AGGREGATES)
+        if aggregates is not None:
+            aggregates.reservation_wage_changed(self._reservation_wage, reservation_wage)
+        self._reservation_wage = reservation_wage
+
+    def on_relation_killed(self, unique_id: int, relation: Relation) -> None:
+        """Unemploys the worker if their employer is destroyed."""
+        if relation & Relation.Employer and unique_id == self._firm_id:
+            self.unemploy()
 
 
 class JobSearchingWorker(BaseWorker, ABC):
     _job_boards: list[JobBoard]
-    _jobs: dict[JobReference, JobDetails]
-    _seen_jobs: set[JobReference]
+    _jobs: dict[int, None]
+    _seen_jobs: set[int]
     _cached_weights: list[float]
     _search_method: AccessMethod
     _application_method: AccessMethod
@@ -78,6 +156,8 @@ class JobSearchingWorker(BaseWorker, ABC):
     _search_max: int
     _application_rate: float
     _application_max: int
+    _commuting_radius: float | None
+    _commuting_cost: float
 
     def __init__(self, manager, unique_id, household,
                  search_method,
@@ -88,7 +168,9 @@ class JobSearchingWorker(BaseWorker, ABC):
                  pi: float,
                  search_max: int,
                  application_rate: float,
-                 application_max: int):
+                 application_max: int,
+                 commuting_radius: float = None,
+                 commuting_cost: float = 0.0):
 
         super().__init__(manager, unique_id, household, reservation_wage)
         self._job_boards = []
@@ -105,13 +187,45 @@ class JobSearchingWorker(BaseWorker, ABC):
         self._search_max = search_max
         self._application_rate = application_rate
         self._application_max = application_max
+        self._commuting_radius = commuting_radius
+        self._commuting_cost = commuting_cost
+
+    @property
+    def location(self) -> Location | None:
+        return self._household.location
 
     @property
     def jobs(self):
+        """Handles of the vacancies saved for application, in the order they were found."""
         return self._jobs
 
+    @property
+    def job_boards(self) -> list[JobBoard]:
+        return list(self._job_boards)
+
+    @property
+    def search_method(self) -> AccessMethod:
+        return self._search_method
+
+    def hyperparameters(self) -> dict:
+        """The worker's behavioural parameters, by constructor argument name."""
+        return {
+            'search_method': self._search_method,
+            'application_method': self._application_method,
+            'alpha': self._alpha,
+            'search_rate': self._search_rate,
+            'pi': self._pi,
+            'search_max': self._search_max,
+            'application_rate': self._application_rate,
+            'application_max': self._application_max,
+            'commuting_radius': self._commuting_radius,
+            'commuting_cost': self._commuting_cost,
+        }
+
     def add_job_board(self, board: JobBoard):
         """Adds a job board to the worker's list of registered boards."""
+        if board.vacancies is not self._vacancies():
+            raise ValueError("The job board does not post to the manager's vacancy table")
         if board not in self._job_boards:
             self._job_boards.append(board)
             self.update_board_weights()
@@ -158,52 +272,134 @@ class JobSearchingWorker(BaseWorker, ABC):
         if random.random() >= self._application_rate:
             return
 
-        if list(self._jobs.keys()):
+        if self._jobs:
             self._apply_to_job()
 
-    def _add_job(self, job_reference: JobReference, job_details: JobDetails) -> None:
+    def _vacancies(self) -> VacancyTable:
+        """The manager's vacancy table, which resolves the handles of saved jobs."""
+        vacancies = self._manager.service(VACANCIES)
+        if vacancies is None:
+            raise RuntimeError(f"No vacancy table is attached to the manager as the '{VACANCIES}' service")
+        return vacancies
+
+    def _add_job(self, job: int) -> None:
         """Add a job to the application list."""
-        if job_reference not in self._seen_jobs:
-            self._jobs[job_reference] = job_details
-            self._seen_jobs.add(job_reference)
+        if job not in self._seen_jobs:
+            self._jobs[job] = None
+            self._seen_jobs.add(job)
 
-    def _clear_applied(self, refs: list[JobReference]) -> None:
+    def _clear_applied(self, jobs: list[int]) -> None:
         """Remove all jobs the worker has applied to."""
-        for ref in refs:
-            self._seen_jobs.discard(ref)
-            self._jobs.pop(ref, None)
+        for job in jobs:
+            self._seen_jobs.discard(job)
+            self._jobs.pop(job, None)
+
+    def _forget_closed(self, vacancies: VacancyTable) -> None:
+        """Remove saved jobs whose vacancies have since closed."""
+        closed = [job for job in self._jobs if job not in vacancies]
+        if closed:
+            self._clear_applied(closed)
+
+    def _reachable(self, jobs, vacancies: VacancyTable):
+        """Jobs within the worker's commuting radius, or all jobs if the worker has no location or radius."""
+        location = self._household.location
+        if self._commuting_radius is None or location is None or not len(jobs):
+            return jobs
+        within = vacancies.distances(jobs, location) <= self._commuting_radius
+        return [job for job, reachable in zip(jobs, within.tolist()) if reachable]
+
+    def _offers(self, jobs, vacancies: VacancyTable) -> np.ndarray:
+        """Wages of jobs net of the worker's cost of commuting to them."""
+        wages = vacancies.wages(jobs)
+        location = self._household.location
+        if self._commuting_cost and location is not None:
+            wages = wages - self._commuting_cost * vacancies.distances(jobs, location)
+        return wages
 
     def _search_board(self, job_board: JobBoard) -> None:
-        """Search for jobs on a job board."""
-        self._search_count = 0
-        job_references = list(job_board.keys())
-        job_details = list(job_board.values())
-        wages = [value.satisficing_wage for value in job_details]
+        """Search for jobs on a job board, within the worker's commuting radius.
 
-        perm = self._order(job_references, wages)
-        self._search(perm, job_references, job_details)
+        Without a location-dependent radius or commuting cost, every worker sees the same offers, so the board's
+        cached wages (and wage order, on the kernel path) are used instead of being recomputed per worker.
+        """
+        self._search_count = 0
+        location = self._household.location
+        shared = location is None or (self._commuting_radius is None and not self._commuting_cost)
+        if shared:
+            jobs, wages = job_board.handles(), job_board.wages()
+        else:
+            if self._commuting_radius is not None:
+                jobs = job_board.within(location, self._commuting_radius)
+            else:
+                jobs = job_board.handles()
+            wages = self._offers(jobs, job_board.vacancies)
+
+        if not kernels.active():
+            jobs, wages = jobs.tolist(), wages.tolist()
+            perm = self._order(jobs, wages)
+        elif shared and self._search_method is AccessMethod.Ordered:
+            perm = job_board.wage_order()
+        else:
+            perm = self._order(jobs, wages)
+        self._search(perm, jobs, wages)
 
     def _search_network(self) -> None:
         """Search for jobs on the household social network."""
         self._search_count = 0
-        for friend_id in self._household.friends:
-            friend_household = self._manager.get_agent_by_id(friend_id)
-            for worker in friend_household.workers:
-                job_references = list(worker.jobs.keys())
-                job_details = list(worker.jobs.values())
-                wages = [value.satisficing_wage for value in job_details]
+        vacancies = self._vacancies()
+        friends = (self._manager.get_agent_by_id(friend_id) for friend_id in self._household.friends)
+        workers = [worker for friend in friends if friend is not None for worker in friend.workers]
+        if kernels.active() and not any(worker is self for worker in workers):
+            self._search_referrals(
+                [self._reachable(vacancies.live(worker.jobs), vacancies) for worker in workers], vacancies
+            )
+            return
+
+        for worker in workers:
+            jobs = self._reachable(vacancies.live(worker.jobs), vacancies)
+            wages = self._offers(jobs, vacancies)
+            if not kernels.active():
+                wages = wages.tolist()
 
-                perm = self._order(job_references, wages)
-                self._search(perm, job_references, job_details)
+            perm = self._order(jobs, wages)
+            self._search(perm, jobs, wages)
+
+    def _search_referrals(self, groups: list[list[int]], vacancies: VacancyTable) -> None:
+        """Screen the jobs of each friend's worker in turn as a single walk over their concatenation.
+
+        Equivalent to searching the groups one by one: each group is ordered on its own, drawing the same random
+        permutations, and the search budget carries over from one group to the next.
+        """
+        lengths = np.fromiter(map(len, groups), dtype=np.int64, count=len(groups))
+        jobs = np.fromiter(itertools.chain.from_iterable(groups), dtype=np.int64, count=int(lengths.sum()))
+        wages = self._offers(jobs, vacancies)
+        if self._search_method is AccessMethod.Random:
+            starts = (np.cumsum(lengths) - lengths).tolist()
+            perm = np.fromiter(itertools.chain.from_iterable(
+                (start + index for index in random.sample(range(length), k=length))
+                for start, length in zip(starts, lengths.tolist())
+            ), dtype=np.int64, count=len(jobs))
+        elif self._search_method is AccessMethod.Ordered:
+            perm = kernels.order_within(wages, lengths)
+        else:
+            perm = np.arange(len(jobs))
+        self._search(perm, jobs, wages)
+
+    def _search(self, perm: list[int], jobs: list[int], wages: list[float]):
+        if kernels.active():
+            budget = max(self._search_max - self._search_count, 0)
+            selected, self._search_count = kernels.screen(
+                np.asarray(perm[:budget], dtype=np.int64), np.asarray(wages, dtype=np.float64),
+                self._reservation_wage, self._search_count, self._search_max
+            )
+            for job in np.asarray(jobs, dtype=np.int64)[selected].tolist():
+                self._add_job(job)
+            return
 
-    def _search(self, perm: list[int], job_references: list[JobReference], job_details: list[JobDetails]):
         for index in perm:
             if self._search_count < self._search_max:
-                job_reference = job_references[index]
-                job_information = job_details[index]
-                wage = job_information.satisficing_wage
-                if wage >= self._reservation_wage:
-                    self._add_job(job_reference, job_information)
+                if wages[index] >= self._reservation_wage:
+                    self._add_job(jobs[index])
                 self._search_count += 1
             else:
                 break
@@ -213,41 +409,54 @@ class JobSearchingWorker(BaseWorker, ABC):
         applications = 0
         jobs_to_delete = []
 
-        job_references = list(self._jobs.keys())
-        job_details = list(self._jobs.values())
-        wages = [value.satisficing_wage for value in job_details]
+        vacancies = self._vacancies()
+        self._forget_closed(vacancies)
+        jobs = list(self._jobs)
 
-        selection = self._select(job_references, job_details)
-        selected_job_references = [job_references[i] for i in selection]
-        selected_wages = [wages[i] for i in selection]
+        selection = self._select(jobs, vacancies)
+        selected_jobs = [jobs[i] for i in selection]
+        selected_wages = self._offers(selected_jobs, vacancies)
+        if not kernels.active():
+            selected_wages = selected_wages.tolist()
 
-        perm = self._order(selected_job_references, selected_wages)
+        perm = self._order(selected_jobs, selected_wages)
 
         for index in perm:
             if applications < self._application_max:
-                self._apply(selected_job_references[index], self.unique_id)
-                jobs_to_delete.append(selected_job_references[index])
+                self._apply(selected_jobs[index], self.unique_id)
+                jobs_to_delete.append(selected_jobs[index])
                 applications += 1
             else:
                 break
 
         self._clear_applied(jobs_to_delete)
 
-    def _apply(self, job_reference: JobReference, worker_id: int):
-        firm = self._manager.get_agent_by_id(job_reference.firm_id)
-        firm.apply(job_reference.job_id, worker_id)
+    def _apply(self, job: int, worker_id: int):
+        vacancies = self._vacancies()
+        firm_id = vacancies.firm(job)
+        events = self._manager.service(EVENTS)
+        if events is not None:
+            events.log(
+                EventType.Application, worker_id, firm_id, vacancies.job(job),
+                vacancies.wage(job), vacancies.specialisation(job)
+            )
+        firm = self._manager.get_agent_by_id(firm_id)
+        firm.apply(job, worker_id)
 
     @staticmethod
-    def _select(job_references: list[JobReference], job_details: list[JobDetails]) -> list[int]:
-        return list(range(len(job_references)))
+    def _select(jobs: list[int], vacancies: VacancyTable) -> list[int]:
+        return list(range(len(jobs)))
 
-    def _order(self, job_references: list[JobReference], wages: list[float]) -> list[int]:
+    def _order(self, jobs: list[int], wages: list[float]) -> list[int]:
         if self._search_method is AccessMethod.Random:
-            perm = random.sample(range(len(job_references)), k=len(job_references))
+            perm = random.sample(range(len(jobs)), k=len(jobs))
         elif self._search_method is AccessMethod.Ordered:
-            perm = sorted(range(len(wages)), key=lambda k: wages[k], reverse=True)
+            if kernels.active():
+                perm = kernels.order_by_wage(np.asarray(wages, dtype=np.float64)).tolist()
+            else:
+                perm = sorted(range(len(wages)), key=lambda k: wages[k], reverse=True)
         else:
-            perm = list(range(len(job_references)))
+            perm = list(range(len(jobs)))
         return perm
 
 
@@ -261,24 +470,39 @@ class SpecialisingWorker(JobSearchingWorker, ABC):
     _max_general_skill: Skill
     _skill_level: Skill
     _specialisations: set[Specialisation]
+    _specialisation_mask: np.ndarray | None
     _search_history: dict[Specialisation: int]
 
-    def __init__(self, manager, unique_id, household, reservation_wage,
-                 training_rate,
-                 max_general_skill,
-                 unemployment_limit,
+    def __init__(self, manager, unique_id, household,
+                 search_method,
+                 application_method,
+                 reservation_wage,
+                 alpha: float,
+                 search_rate: float,
+                 pi: float,
+                 search_max: int,
+                 application_rate: float,
+                 application_max: int,
+                 training_rate: float,
+                 max_general_skill: Skill,
+                 unemployment_limit: int,
                  skill: Skill,
-                 specialisation: Specialisation):
-        super().__init__(manager, unique_id, household, skill, reservation_wage)
+                 specialisation: Specialisation,
+                 commuting_radius: float = None,
+                 commuting_cost: float = 0.0):
+        super().__init__(manager, unique_id, household, search_method, application_method, reservation_wage,
+                         alpha, search_rate, pi, search_max, application_rate, application_max,
+                         commuting_radius, commuting_cost)
         self._time_unemployed = 0
         self._unemployment_limit = unemployment_limit
         self._is_training = False
-        self._training_rate: training_rate
+        self._training_rate = training_rate
         self._time_training = 0
         self._training_specialisation = None
         self._max_general_skill = max_general_skill
         self._skill_level = skill
         self._specialisations = {specialisation}
+        self._specialisation_mask = None
         self._search_history = {}
 
     @property
@@ -289,9 +513,50 @@ class SpecialisingWorker(JobSearchingWorker, ABC):
     def specialisations(self):
         return self._specialisations
 
+    @property
+    def is_training(self):
+        return self._is_training
+
+    @property
+    def training_specialisation(self) -> Specialisation | None:
+        """The specialisation being trained for, if training."""
+        return self._training_specialisation
+
+    @property
+    def time_training(self) -> int:
+        return self._time_training
+
+    @property
+    def time_unemployed(self) -> int:
+        return self._time_unemployed
+
+    @property
+    def search_history(self) -> dict[Specialisation, int]:
+        """How often jobs of each specialisation outside the worker's skills were found since training last."""
+        return dict(self._search_history)
+
+    def hyperparameters(self) -> dict:
+        parameters = super().hyperparameters()
+        parameters.update(
+            training_rate=self._training_rate,
+            max_general_skill=self._max_general_skill,
+            unemployment_limit=self._unemployment_limit
+        )
+        return parameters
+
     def train(self, specialisation: Specialisation):
+        skill = self._skill_level
         self._specialisations.add(specialisation)
-        self._skill_level = max(self._skill_level, SPECIALISATION_TO_SKILL(specialisation))
+        self._specialisation_mask = None
+        self._skill_level = max(self._skill_level, SPECIALISATION_TO_SKILL[specialisation])
+
+        aggregates = self._manager.service(AGGREGATES)
+        if aggregates is not None:
+            aggregates.reskill(skill, self._skill_level, self._employed, self._wage, self._reservation_wage,
+                               self._is_training)
+        events = self._manager.service(EVENTS)
+        if events is not None:
+            events.log(EventType.TrainingComplete, self._unique_id, specialisation=specialisation)
 
     def start_training(self):
         if self._search_history and random.random() < self._training_rate:
@@ -304,35 +569,65 @@ class SpecialisingWorker(JobSearchingWorker, ABC):
             self._time_training = 0
             self._time_unemployed = 0
 
+            aggregates = self._manager.service(AGGREGATES)
+            if aggregates is not None:
+                aggregates.start_training(self._skill_level)
+            events = self._manager.service(EVENTS)
+            if events is not None:
+                events.log(EventType.TrainingStart, self._unique_id, specialisation=self._training_specialisation)
+
     def stop_training(self):
-        self._is_training = False
+        if self._is_training:
+            self._is_training = False
+
+            aggregates = self._manager.service(AGGREGATES)
+            if aggregates is not None:
+                aggregates.stop_training(self._skill_level)
 
     def find_training_opportunities(self):
         if self._jobs:
-            job_references = list(self._jobs.keys())
-            job_details = list(self._jobs.values())
-
-            selected_job_references = [
-                job_references[index] for index in range(len(job_references))
-                if job_details[index].specialisation not in self.specialisations
-                and SPECIALISATION_TO_SKILL[job_details[index].specialisation] > self._max_general_skill
-            ]
-
-            selected_job_details = [
-                job_details[index] for index in range(len(job_details))
-                if job_details[index].specialisation not in self.specialisations
-                and SPECIALISATION_TO_SKILL[job_details[index].specialisation] > self._max_general_skill
-            ]
-
-            for job_detail in selected_job_details:
-                if job_detail.specialisation in self._search_history.keys():
-                    self._search_history[job_detail.specialisation] += 1
+            vacancies = self._vacancies()
+            self._forget_closed(vacancies)
+            jobs = list(self._jobs)
+
+            if kernels.active():
+                selection = np.flatnonzero(~self._applicable(jobs, vacancies)).tolist()
+                selected_jobs = [jobs[index] for index in selection]
+                selected_specialisations = vacancies.specialisations(selected_jobs)
+            else:
+                specialisations = vacancies.specialisations(jobs)
+                selection = [
+                    index for index in range(len(jobs))
+                    if specialisations[index] not in self.specialisations
+                    and SPECIALISATION_TO_SKILL[specialisations[index]] > self._max_general_skill
+                ]
+                selected_jobs = [jobs[index] for index in selection]
+                selected_specialisations = [specialisations[index] for index in selection]
+
+            for specialisation in selected_specialisations:
+                if specialisation in self._search_history.keys():
+                    self._search_history[specialisation] += 1
                 else:
-                    self._search_history[job_detail.specialisation] = 1
-
-            self._clear_applied(selected_job_references)
-
-    def _select(self, job_references: list[JobReference], job_details: list[JobDetails]) -> list[int]:
-        return [index for index in range(len(job_references))
-                if job_details[index].specialisation in self.specialisations
-                or SPECIALISATION_TO_SKILL[job_details[index].specialisation] <= self._max_general_skill]
+                    self._search_history[specialisation] = 1
+
+            self._clear_applied(selected_jobs)
+
+    def _select(self, jobs: list[int], vacancies: VacancyTable) -> list[int]:
+        if kernels.active():
+            return np.flatnonzero(self._applicable(jobs, vacancies)).tolist()
+        specialisations = vacancies.specialisations(jobs)
+        return [index for index in range(len(jobs))
+                if specialisations[index] in self.specialisations
+                or SPECIALISATION_TO_SKILL[specialisations[index]] <= self._max_general_skill]
+
+    def _applicable(self, jobs: list[int], vacancies: VacancyTable) -> np.ndarray:
+        """Mask of jobs within the worker's specialisations or general skill, computed by the kernels."""
+        return kernels.applicable(
+            vacancies.codes(jobs), self._own_specialisations(), self._max_general_skill
+        )
+
+    def _own_specialisations(self) -> np.ndarray:
+        """Lookup over specialisation codes of the worker's specialisations, kept until they train."""
+        if self._specialisation_mask is None:
+            self._specialisation_mask = kernels.specialisation_mask(self._specialisations)
+        return self._specialisation_mask
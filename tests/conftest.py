@@ -0,0 +1,72 @@
+import os
+import random
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+from firms import Firm  # noqa: E402
+from labourmarket import LabourABM  # noqa: E402
+from skills import Skill, Specialisation  # noqa: E402
+from workers import AccessMethod  # noqa: E402
+
+
+class HiringFirm(Firm):
+    """Hires an unemployed applicant on the spot with a fixed probability, optionally closing the vacancy."""
+
+    def __init__(self, manager, unique_id, board, rate: float, fill: bool = False):
+        super().__init__(manager, unique_id)
+        self.board = board
+        self.rate = rate
+        self.fill = fill
+
+    def apply(self, vacancy: int, worker_id: int, cv=None):
+        worker = self._manager.get_agent_by_id(worker_id)
+        if worker.employed or random.random() >= self.rate:
+            return
+        vacancies = self._manager.service('vacancies')
+        worker.employ(self.unique_id, vacancies.job(vacancy), vacancies.wage(vacancy))
+        if self.fill:
+            self.board.deregister(self.unique_id, vacancies.job(vacancy))
+
+
+def build_market(seed: int, method: AccessMethod = AccessMethod.Ordered, workers: int = 60, vacancies: int = 40,
+                 friends: int = 2, hire_rate: float = None, fill: bool = False) -> LabourABM:
+    """A small labour market: households of two workers with random friends, one firm and one job board.
+
+    With a ``hire_rate`` the firm is a ``HiringFirm``; otherwise it never hires.
+    """
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+    model = LabourABM([{'Name': 'Household', 'Count': workers // 2, 'Parameters': {'size': 2, 'savings': 0.0}}], 1)
+    manager = model.manager
+    households = sorted(manager.get_agents_by_name('Household'), key=lambda household: household.unique_id)
+    for household in households:
+        for friend in random.sample(households, friends):
+            if friend is not household:
+                household.befriend(friend.unique_id)
+
+    board = model.create_job_board(1)
+    firm = Firm(manager, 10 ** 6) if hire_rate is None else HiringFirm(manager, 10 ** 6, board, hire_rate, fill)
+    manager.add(firm)
+    specialisations = list(Specialisation)
+    for job in range(vacancies):
+        board.register(firm.unique_id, job, float(rng.integers(1, 20)),
+                       specialisations[rng.integers(len(specialisations))])
+    for index in range(workers):
+        worker = manager.create(
+            'Worker', household=households[index % len(households)], search_method=method,
+            application_method=method, reservation_wage=float(rng.uniform(5, 15)), alpha=0.5, search_rate=0.7,
+            pi=0.5, search_max=10, application_rate=0.5, application_max=3, training_rate=0.5,
+            max_general_skill=Skill(int(rng.integers(1, 5))), unemployment_limit=15, skill=Skill(1),
+            specialisation=specialisations[rng.integers(len(specialisations))]
+        )
+        worker.add_job_board(board)
+    return model
+
+
+@pytest.fixture
+def market():
+    return build_market
@@ -0,0 +1,39 @@
+import numpy as np
+
+from calibration import Candidate, SuccessiveHalving, TargetMoment
+
+
+class ToyModel:
+    """Produces a noisy series around a level, so only the final checkpoint pins the best level down."""
+
+    def __init__(self, parameters, seed):
+        self.level = parameters['level']
+        self.rng = np.random.default_rng(seed)
+        self.series = []
+
+    def step(self):
+        self.series.append(self.level + self.rng.normal(0.0, 0.05))
+
+    def collect(self):
+        return self
+
+
+def build_toy(parameters, seed):
+    return ToyModel(parameters, seed)
+
+
+def test_halving_keeps_the_best_candidate():
+    levels = [0.9, 0.1, 0.35, 0.5, 0.7, 0.2, 0.3, 0.6, 0.8]
+    candidates = [Candidate({'level': level}, seed) for seed, level in enumerate(levels)]
+    moment = TargetMoment('level', 'series', [0.35] * 90)
+
+    result = SuccessiveHalving(build_toy, [moment], [10, 30, 90], eta=3, processes=2, start_method='fork').run(
+        candidates)
+
+    assert result.best.parameters == {'level': 0.35}
+    assert result.best.steps == 90
+    assert len(result.ranking) == len(levels)
+    assert sorted(candidate.parameters['level'] for candidate in result.ranking) == sorted(levels)
+    assert [candidate.steps for candidate in result.ranking] == [90] + [30] * 2 + [10] * 6
+    assert result.steps_run == 9 * 10 + 3 * 20 + 60
+    assert result.saving > 1
@@ -0,0 +1,71 @@
+from distributed import Mailbox, Partition, PartitionRuntime, Postings, build_partitions
+from firms import Firm
+from jobs import SERVICE_KEY as VACANCIES
+from labourmarket import LabourABM
+from skills import Skill, Specialisation
+from workers import AccessMethod
+
+FIRM = 1000
+HOUSEHOLD = 1
+WORKER = 2
+SPECIALISATION = Specialisation.BusinessProfessional
+
+
+class HiringFirm(Firm):
+    """Hires every applicant at the posted wage in the hire phase."""
+
+    def __init__(self, manager, unique_id):
+        super().__init__(manager, unique_id)
+        self.applications = []
+
+    def apply(self, vacancy, worker_id, cv=None):
+        vacancies = self._manager.service(VACANCIES)
+        self.applications.append((vacancies.job(vacancy), vacancies.wage(vacancy), worker_id))
+
+    def hire(self):
+        for job_id, wage, worker_id in self.applications:
+            self._manager.get_agent_by_id(worker_id).employ(self.unique_id, job_id, wage)
+        self.applications = []
+
+
+def build_partition(partition: Partition) -> LabourABM:
+    """The firm and its posting live in partition 0, the household and its worker in partition 1."""
+    model = LabourABM([], 1)
+    manager = model.manager
+    board = model.create_job_board(1)
+    if partition.index == 0:
+        manager.add(HiringFirm(manager, FIRM))
+        board.register(FIRM, 0, 12.0, SPECIALISATION)
+    else:
+        household = manager.create('Household', unique_id=HOUSEHOLD, size=1, savings=0.0)
+        worker = manager.create(
+            'Worker', unique_id=WORKER, household=household, search_method=AccessMethod.Ordered,
+            application_method=AccessMethod.Ordered, reservation_wage=5.0, alpha=0.5, search_rate=1.0, pi=1.0,
+            search_max=10, application_rate=1.0, application_max=3, training_rate=0.0,
+            max_general_skill=Skill(1), unemployment_limit=100, skill=Skill(1), specialisation=SPECIALISATION
+        )
+        worker.add_job_board(board)
+    return model
+
+
+def test_cross_partition_application_leads_to_hire():
+    partitions = build_partitions({HOUSEHOLD: []}, {HOUSEHOLD: 1}, {FIRM: 0}, 2)
+    firm_side, worker_side = PartitionRuntime(build_partition, partitions, 'fork').run(10)
+
+    unemployment = worker_side.unemployment_rate
+    assert unemployment[0] == 1.0
+    assert unemployment[-1] == 0.0
+    assert len(firm_side) == 10
+
+
+def test_postings_are_mirrored_and_withdrawn():
+    model = LabourABM([], 1)
+    board = model.create_job_board(1)
+    mailbox = Mailbox(Partition(1, [], 2), model.manager, model.job_boards)
+
+    mailbox.deliver([Postings(0, 0, ((FIRM, 0, 12.0, SPECIALISATION, None), (FIRM, 1, 9.0, SPECIALISATION, None)))])
+    assert sorted(board.wages()) == [9.0, 12.0]
+
+    mailbox.deliver([Postings(0, 0, ((FIRM, 1, 9.0, SPECIALISATION, None),))])
+    assert list(board.wages()) == [9.0]
+    assert mailbox.drain() == {}
@@ -0,0 +1,136 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from ensemble import EMPTY, WorkerState
+from equivalence import (
+    COLUMNS, EXACT, Engine, EnsembleEngine, GoldenRun, ModelEngine, OutOfCoreEngine, Tolerance, statistical
+)
+from kernels import SPECIALISATIONS
+from workers import AccessMethod
+
+
+AGGREGATE = Tolerance(0.1, aggregate=True)
+IGNORED = Tolerance(np.inf, aggregate=True)
+HIRE_RATE = 0.2
+# Means over a thousand workers. Saved jobs spread through the network, so their count varies widely from run to
+# run, and training codes and days in training are carried by the few workers training.
+POPULATION = {
+    **statistical(0.05, 0.15),
+    'saved': Tolerance(0.5, 0.15, aggregate=True),
+    'time_training': Tolerance(0.5, 0.2, aggregate=True),
+    'training_code': Tolerance(1.0, 0.25, aggregate=True)
+}
+
+
+def hiring(applicants, vacancies, uniforms):
+    return uniforms < HIRE_RATE
+
+
+def state(employed, wage, saved=None):
+    count = len(employed)
+    specialisations = len(SPECIALISATIONS)
+    return WorkerState(
+        employed=np.array(employed, dtype=np.bool_),
+        wage=np.array(wage, dtype=np.float64),
+        reservation_wage=np.ones(count),
+        skill=np.zeros(count, dtype=np.int64),
+        training=np.zeros(count, dtype=np.bool_),
+        time_training=np.zeros(count, dtype=np.int64),
+        time_unemployed=np.zeros(count, dtype=np.int64),
+        training_code=np.zeros(count, dtype=np.int64),
+        specialisations=np.zeros((count, specialisations), dtype=np.bool_),
+        search_history=np.zeros((count, specialisations), dtype=np.int64),
+        saved=np.array(saved if saved is not None else [[EMPTY, EMPTY]] * count, dtype=np.int64)
+    )
+
+
+class Scripted(Engine):
+    """Replays a fixed worker state for every day."""
+
+    def __init__(self, name, fixed):
+        self.name = name
+        self._state = fixed
+
+    @property
+    def agents(self):
+        return np.arange(len(self._state)) + 100
+
+    def step(self):
+        pass
+
+    def state(self):
+        return self._state
+
+
+def compare(name, reference, alternative, tolerance):
+    """The divergence reported on the first day between two scripted engines, comparing only one column."""
+    run = GoldenRun(lambda seed: None, 0, {column: tolerance if column == name else IGNORED for column in COLUMNS})
+    report = run.compare(
+        1, lambda model: Scripted('alternative', alternative), lambda model: Scripted('reference', reference)
+    )
+    return report.divergence
+
+
+def test_first_divergent_day_and_agent_are_reported():
+    reference = state([True, False], [10.0, np.nan])
+    divergence = compare('wage', reference, state([True, True], [10.0, 12.0]), EXACT)
+    assert (divergence.step, divergence.column, divergence.agent) == (1, 'wage', 101)
+    assert np.isnan(divergence.reference) and divergence.alternative == 12.0
+
+
+def test_aggregate_wages_agree_without_employed_workers():
+    unemployed = state([False, False], [np.nan, np.nan])
+    assert compare('wage', unemployed, unemployed, AGGREGATE) is None
+
+
+def test_aggregate_wages_ignore_unemployed_workers():
+    reference = state([True, False], [10.0, np.nan])
+    assert compare('wage', reference, state([True, False], [10.05, 3.0]), AGGREGATE) is None
+    assert compare('wage', reference, state([True, False], [12.0, 3.0]), AGGREGATE) is not None
+
+
+def test_aggregate_wages_diverge_when_only_one_side_is_employed():
+    divergence = compare('wage', state([True, False], [10.0, np.nan]), state([False, False], [10.0, np.nan]), AGGREGATE)
+    assert divergence is not None and divergence.agent is None
+
+
+def test_aggregate_saved_jobs_are_compared_by_count():
+    reference = state([False, False], [np.nan, np.nan], [[1, EMPTY], [2, 3]])
+    assert compare('saved', reference, state([False, False], [np.nan, np.nan], [[4, 5], [6, EMPTY]]), AGGREGATE) is None
+
+
+def test_exact_saved_jobs_are_compared_as_sets():
+    reference = state([False], [np.nan], [[1, 2]])
+    assert compare('saved', reference, state([False], [np.nan], [[2, 1]]), EXACT) is None
+    divergence = compare('saved', reference, state([False], [np.nan], [[2, EMPTY]]), EXACT)
+    assert divergence.reference == [2, 1] and divergence.alternative == [2]
+
+
+@pytest.mark.parametrize('method', [AccessMethod.Ordered, AccessMethod.Random])
+def test_numpy_kernels_reproduce_the_model(market, method):
+    builder = partial(market, method=method, hire_rate=HIRE_RATE, fill=True)
+    report = GoldenRun(builder, 5).compare(40, partial(ModelEngine, backend='numpy'))
+    assert report.equivalent, str(report)
+    assert report.steps == 40 and report.reference_seconds > 0 and report.alternative_seconds > 0
+
+
+@pytest.mark.parametrize('method', [AccessMethod.Ordered, AccessMethod.Random])
+@pytest.mark.parametrize('fill', [False, True])
+def test_ensemble_follows_the_model(market, method, fill):
+    builder = partial(market, method=method, workers=1000, vacancies=300, friends=3, hire_rate=HIRE_RATE, fill=fill)
+    report = GoldenRun(builder, 3, POPULATION).compare(
+        30, lambda model: EnsembleEngine(model, 3, hiring, fill=fill)
+    )
+    assert report.equivalent, str(report)
+
+
+@pytest.mark.parametrize('method', [AccessMethod.Ordered, AccessMethod.Random])
+@pytest.mark.parametrize('fill', [False, True])
+def test_out_of_core_market_follows_the_model(market, tmp_path, method, fill):
+    builder = partial(market, method=method, workers=1000, vacancies=300, friends=3, hire_rate=HIRE_RATE, fill=fill)
+    report = GoldenRun(builder, 3, POPULATION).compare(
+        30, lambda model: OutOfCoreEngine(model, str(tmp_path), 1 << 16, 3, hiring, fill=fill)
+    )
+    assert report.equivalent, str(report)
@@ -0,0 +1,98 @@
+import numpy as np
+
+from households import HouseholdBudget
+from relations import Relation
+
+
+def test_friends_are_relations(market):
+    model = market(0)
+    household = model.manager.get_agents_by_name('Household')[0]
+    friend_id = next(other.unique_id for other in model.manager.get_agents_by_name('Household')
+                     if other is not household and other.unique_id not in household.friends)
+    household.befriend(friend_id)
+    assert friend_id in household.friends
+    assert model.manager.relations.has(household.unique_id, friend_id, Relation.Friend)
+    household.unfriend(friend_id)
+    assert friend_id not in household.friends
+
+
+def test_destroying_a_household_removes_it_from_friends(market):
+    model = market(1)
+    manager = model.manager
+    befriended = next(household for household in manager.get_agents_by_name('Household')
+                      if manager.relations.dependants(household.unique_id, Relation.Friend))
+    befrienders = manager.relations.dependants(befriended.unique_id, Relation.Friend)
+    for worker in list(befriended.workers):
+        manager.destroy(worker.unique_id)
+    manager.destroy(befriended.unique_id)
+
+    for befriender in befrienders:
+        assert befriended.unique_id not in manager.get_agent_by_id(befriender).friends
+    for _ in range(10):
+        model.step()
+
+
+def test_destroy_many_recovers_ids(market):
+    model = market(2)
+    manager = model.manager
+    households = sorted(household.unique_id for household in manager.get_agents_by_name('Household'))[:2]
+    manager.destroy_many(households)
+    assert sorted([manager.create('Household', size=1, savings=0.0).unique_id for _ in households]) == households
+
+
+def budget(**kwargs):
+    # Households of two, one and no workers over a wage column of three slots.
+    return HouseholdBudget(np.array([0, 2, 3, 3]), np.array([0, 2, 1]), np.array([2, 1, 1]),
+                           np.array([0.0, 5.0, 1.0]), **kwargs)
+
+
+def test_budget_income_is_the_sum_of_member_wages():
+    kernel = budget()
+    kernel.step(np.array([10.0, 4.0, 6.0]))
+    assert kernel.income.tolist() == [16.0, 4.0, 0.0]
+
+
+def test_budget_savings_keep_income_above_consumption():
+    kernel = budget(subsistence=3.0, consumption_rate=0.5)
+    kernel.step(np.array([10.0, 4.0, 6.0]))
+    assert kernel.consumption.tolist() == [11.0, 3.5, 1.0]
+    assert kernel.savings.tolist() == [5.0, 5.5, 0.0]
+
+
+def test_budget_flags_households_below_the_poverty_line():
+    kernel = budget(poverty_line=np.array([9.0, 5.0, 0.5]))
+    kernel.step(np.array([10.0, 4.0, 6.0]))
+    assert kernel.poor.tolist() == [True, True, True]
+    kernel.step(np.array([20.0, 6.0, 6.0]))
+    assert kernel.poor.tolist() == [False, False, True]
+    assert kernel.poverty_rate == 1 / 3
+
+
+def test_consume_phase_matches_households_consuming_one_by_one(market):
+    batched, single = market(3), market(3)
+    for model in (batched, single):
+        for worker in model.manager.get_agents_by_name('Worker')[::3]:
+            worker.employ(10 ** 6, worker.unique_id, 2.0 + worker.unique_id % 5)
+
+    for _ in range(30):
+        batched.step()
+    for household in single.manager.get_agents_by_name('Household'):
+        household.consume()
+
+    by_id = {household.unique_id: household for household in single.manager.get_agents_by_name('Household')}
+    for household in batched.manager.get_agents_by_name('Household'):
+        expected = by_id[household.unique_id]
+        assert household.income > 0 or not any(worker.employed for worker in household.workers)
+        assert (household.income, household.savings, household.consumption, household.poor) == \
+               (expected.income, expected.savings, expected.consumption, expected.poor)
+
+
+def test_wage_column_follows_hires_and_separations(market):
+    model = market(4)
+    worker = model.manager.get_agents_by_name('Worker')[0]
+    worker.employ(10 ** 6, 0, 7.5)
+    assert model.wages.of([worker.unique_id]).tolist() == [7.5]
+    worker.unemploy()
+    assert model.wages.of([worker.unique_id]).tolist() == [0.0]
+    model.manager.destroy(worker.unique_id)
+    assert worker.unique_id not in model.wages
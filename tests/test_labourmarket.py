@@ -0,0 +1,21 @@
+import warnings
+
+import matplotlib
+import numpy as np
+
+from labourmarket import MarketData, plot_history
+from skills import Skill
+
+matplotlib.use('Agg')
+
+
+def test_plot_history_without_wages_does_not_warn():
+    data = MarketData()
+    for _ in range(5):
+        data.record(1.0, 3, 0.0, 10.0, {})
+    assert all(np.isnan(data.wage_quantiles(skill)).all() for skill in Skill)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        figure = plot_history(data)
+    assert figure.axes[2].get_legend() is None
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from labourmarket import LabourABM
+from population import CsvColumns, NpyColumns, Population, SampledColumns
+from skills import Skill
+
+
+def _rows(population, count):
+    """All rows of a population without reference columns, concatenated by column."""
+    columns = {}
+    for chunk in population.chunks(count, None):
+        for name, column in chunk.items():
+            columns.setdefault(name, []).append(column)
+    return {name: np.concatenate(parts) for name, parts in columns.items()}
+
+
+def test_csv_columns_stream_in_chunks(tmp_path):
+    path = tmp_path / 'workers.csv'
+    path.write_text('wage,skill,label\n' + ''.join(f'{i}.5,{i % 3 + 1},w{i}\n' for i in range(10)))
+
+    chunks = list(CsvColumns(str(path), ['wage', 'skill']).chunks(7, 3))
+    assert [len(chunk['wage']) for chunk in chunks] == [3, 3, 1]
+    assert set(chunks[0]) == {'wage', 'skill'}
+    assert chunks[0]['wage'].dtype == np.float64 and chunks[0]['skill'].dtype == np.int64
+
+    rows = _rows(Population(CsvColumns(str(path)), chunk_size=4), 10)
+    assert rows['skill'].tolist() == [Skill(i % 3 + 1) for i in range(10)]
+    assert rows['label'][-1] == 'w9'
+
+
+def test_npy_columns_are_memory_mapped_from_files_or_a_directory(tmp_path):
+    np.save(tmp_path / 'wage.npy', np.arange(10, dtype=np.float64))
+    np.save(tmp_path / 'age.npy', np.arange(10, 20))
+
+    mapped = NpyColumns({'wage': str(tmp_path / 'wage.npy')})
+    assert [chunk['wage'].tolist() for chunk in mapped.chunks(5, 2)] == [[0.0, 1.0], [2.0, 3.0], [4.0]]
+
+    rows = _rows(Population(NpyColumns(str(tmp_path)), chunk_size=3), 10)
+    assert rows['age'].tolist() == list(range(10, 20))
+    assert rows['wage'].tolist() == list(range(10))
+
+
+def test_npy_columns_reject_archives(tmp_path):
+    np.savez(tmp_path / 'columns.npz', wage=np.arange(3))
+    with pytest.raises(ValueError):
+        NpyColumns(str(tmp_path / 'columns.npz'))
+    with pytest.raises(ValueError):
+        NpyColumns({'wage': str(tmp_path / 'columns.npz')})
+
+
+def test_sampled_columns_are_seeded():
+    declaration = {'wage': {'Distribution': 'uniform', 'low': 5.0, 'high': 15.0},
+                   'skill': {'Distribution': 'integers', 'low': 1, 'high': 4}}
+    first = _rows(Population(SampledColumns(declaration, seed=3), chunk_size=4), 9)
+    second = _rows(Population(SampledColumns(declaration, seed=3), chunk_size=4), 9)
+    assert np.array_equal(first['wage'], second['wage'])
+    assert len(first['skill']) == 9 and all(isinstance(skill, Skill) for skill in first['skill'])
+    assert ((first['wage'] >= 5.0) & (first['wage'] < 15.0)).all()
+
+
+def test_short_source_raises(tmp_path):
+    path = tmp_path / 'short.csv'
+    path.write_text('wage\n1.0\n2.0\n3.0\n')
+    sampled = SampledColumns({'age': {'Distribution': 'integers', 'low': 20, 'high': 60}}, seed=0)
+
+    with pytest.raises(ValueError):
+        _rows(Population(sampled, CsvColumns(str(path)), chunk_size=2), 5)
+    with pytest.raises(ValueError):
+        _rows(Population(CsvColumns(str(path)), chunk_size=2), 5)
+    assert len(_rows(Population(sampled, CsvColumns(str(path)), chunk_size=2), 3)['wage']) == 3
+
+
+def test_reference_columns_resolve_to_agents():
+    households = Population(SampledColumns({'savings': {'Distribution': 'uniform', 'low': 0.0, 'high': 1.0}}, seed=1))
+    model = LabourABM([{'Name': 'Household', 'Count': 4, 'Columns': households, 'Parameters': {'size': 1}}], 1)
+    manager = model.manager
+    population = Population(SampledColumns({'household': {'Distribution': 'integers', 'low': 0, 'high': 4}}, seed=2),
+                            references={'household': 'Household'})
+
+    loaded = manager.loaded_ids('Household')
+    for chunk in population.chunks(6, manager):
+        assert all(household.unique_id in loaded for household in chunk['household'])
@@ -0,0 +1,103 @@
+import os
+import random
+
+from runcache import INDEX_FILE, RunCache
+
+
+class Walk:
+    """A random walk whose output depends on the whole history of the random state."""
+
+    def __init__(self, configuration, seed):
+        self.step_size = configuration['step']
+        self.path = []
+
+    def step(self):
+        previous = self.path[-1] if self.path else 0.0
+        self.path.append(previous + self.step_size * random.uniform(-1.0, 1.0))
+
+    def collect(self):
+        return list(self.path)
+
+
+def build_walk(configuration, seed):
+    return Walk(configuration, seed)
+
+
+CONFIGURATION = {'step': 0.5}
+
+
+def test_identical_run_is_a_hit(tmp_path):
+    cache = RunCache(str(tmp_path), version='test')
+    first = cache.run(build_walk, CONFIGURATION, 1, 20)
+    second = cache.run(build_walk, CONFIGURATION, 1, 20)
+
+    assert second == first
+    assert cache.statistics['hits'] == 1 and cache.statistics['misses'] == 1
+    assert RunCache(str(tmp_path), version='test').get(CONFIGURATION, 1, 20) == first
+    assert RunCache(str(tmp_path), version='other').get(CONFIGURATION, 1, 20) is None
+
+
+def test_resumed_run_equals_a_fresh_run(tmp_path):
+    cache = RunCache(str(tmp_path / 'resumed'), version='test')
+    cache.run(build_walk, CONFIGURATION, 2, 15)
+    resumed = cache.run(build_walk, CONFIGURATION, 2, 40)
+    fresh = RunCache(str(tmp_path / 'fresh'), version='test').run(build_walk, CONFIGURATION, 2, 40)
+
+    assert cache.statistics['resumed'] == 1
+    assert resumed == fresh
+
+
+def test_corrupt_files_are_evicted(tmp_path):
+    cache = RunCache(str(tmp_path), version='test')
+    expected = cache.run(build_walk, CONFIGURATION, 3, 10)
+    key = cache.key(CONFIGURATION, 3, 10)
+    with open(os.path.join(str(tmp_path), f'{key}.data'), 'r+b') as file:
+        file.write(b'garbage')
+
+    assert cache.get(CONFIGURATION, 3, 10) is None
+    assert key not in cache and cache.statistics['corrupt'] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), f'{key}.checkpoint'))
+    assert cache.run(build_walk, CONFIGURATION, 3, 10) == expected
+
+
+def test_corrupt_index_starts_an_empty_cache(tmp_path):
+    RunCache(str(tmp_path), version='test').run(build_walk, CONFIGURATION, 4, 10)
+    with open(os.path.join(str(tmp_path), INDEX_FILE), 'r+') as file:
+        file.truncate(10)
+
+    cache = RunCache(str(tmp_path), version='test')
+    assert len(cache) == 0 and cache.statistics['corrupt'] == 1
+    cache.run(build_walk, CONFIGURATION, 4, 10)
+    assert len(RunCache(str(tmp_path), version='test')) == 1
+
+
+def test_least_recently_used_runs_are_evicted_to_the_bound(tmp_path):
+    probe = RunCache(str(tmp_path / 'probe'), version='test')
+    probe.run(build_walk, CONFIGURATION, 0, 10)
+    entry = probe.size
+
+    cache = RunCache(str(tmp_path / 'bounded'), max_bytes=2 * entry + entry // 2, version='test')
+    cache.run(build_walk, CONFIGURATION, 0, 10)
+    cache.run(build_walk, CONFIGURATION, 1, 10)
+    cache.get(CONFIGURATION, 0, 10)
+    cache.run(build_walk, CONFIGURATION, 2, 10)
+
+    assert len(cache) == 2 and cache.size <= 2 * entry + entry // 2
+    assert cache.key(CONFIGURATION, 1, 10) not in cache
+    assert cache.key(CONFIGURATION, 0, 10) in cache and cache.key(CONFIGURATION, 2, 10) in cache
+
+
+def test_new_run_is_kept_or_not_stored(tmp_path):
+    probe = RunCache(str(tmp_path / 'probe'), version='test')
+    probe.run(build_walk, CONFIGURATION, 0, 10)
+    entry = probe.size
+
+    cache = RunCache(str(tmp_path / 'bounded'), max_bytes=entry + entry // 2, version='test')
+    cache.run(build_walk, CONFIGURATION, 0, 10)
+    cache.run(build_walk, CONFIGURATION, 0, 11)
+    assert len(cache) == 1 and cache.key(CONFIGURATION, 0, 11) in cache
+
+    tiny = RunCache(str(tmp_path / 'tiny'), max_bytes=entry // 2, version='test')
+    data = tiny.run(build_walk, CONFIGURATION, 0, 10)
+    assert len(data) == 10 and len(tiny) == 0
+    assert os.listdir(str(tmp_path / 'tiny')) == []